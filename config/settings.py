@@ -2,7 +2,7 @@
 
 import os
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 try:
     from pydantic_settings import BaseSettings
 except ImportError:
@@ -29,20 +29,64 @@ class Settings(BaseSettings):
     log_level: str = Field(default="INFO")
     max_clone_workers: int = Field(default=5, ge=1, le=10)
     clone_timeout: int = Field(default=60, ge=10, le=300)
-    gemini_request_delay: int = Field(default=60, ge=0, le=300)
+    clone_strategy: str = Field(default="sparse", pattern="^(full|sparse)$")
+    analysis_mode: str = Field(default="worktree", pattern="^(worktree|objects)$")
+    analysis_workers: int = Field(default=0, ge=0, le=64)
+    analysis_exclude_globs: str = Field(default="__pycache__,.venv,venv,env,.git,node_modules")
+    analysis_respect_gitignore: bool = Field(default=False)
+    repo_cache_enabled: bool = Field(default=True)
+    repo_cache_max_mb: int = Field(default=2048, ge=100)
+    grade_cache_enabled: bool = Field(default=True)
+    ledger_enabled: bool = Field(default=True)
+    checkpoint_enabled: bool = Field(default=True)
+    checkpoint_compact_every: int = Field(default=200, ge=0)
+    gemini_requests_per_minute: int = Field(default=10, ge=1, le=10000)
+    gemini_min_requests_per_minute: int = Field(default=1, ge=1, le=10000)
+    gemini_max_requests_per_minute: int = Field(default=600, ge=1, le=10000)
+    gemini_tokens_per_minute: int = Field(default=250000, ge=0)
+    gemini_max_attempts: int = Field(default=5, ge=1, le=20)
+    gemini_requests_per_day: int = Field(default=0, ge=0)
+    gemini_batch_size: int = Field(default=10, ge=1, le=50)
+    gemini_max_workers: int = Field(default=4, ge=1, le=32)
+    feedback_cache_enabled: bool = Field(default=True)
+    feedback_cache_bucket_width: float = Field(default=0, ge=0, le=100)
+    feedback_cache_pool_size: int = Field(default=3, ge=1, le=50)
+    feedback_cache_ttl_hours: float = Field(default=720, ge=0)
+    feedback_cache_max_entries: int = Field(default=10000, ge=0)
+    run_all_mode: str = Field(default="sequential", pattern="^(sequential|streaming)$")
+    pipeline_queue_size: int = Field(default=20, ge=1, le=1000)
+    pipeline_draft_workers: int = Field(default=2, ge=1, le=16)
+    gmail_fetch_workers: int = Field(default=8, ge=1, le=32)
+    gmail_quota_units_per_second: int = Field(default=250, ge=0)
+    gmail_page_size: int = Field(default=100, ge=1, le=500)
+    draft_workers: int = Field(default=4, ge=1, le=16)
+    draft_max_attempts: int = Field(default=4, ge=1, le=10)
+    gmail_http_pool_size: int = Field(default=16, ge=1, le=64)
+    gmail_batch_mode: bool = Field(default=False)
+    gmail_batch_size: int = Field(default=50, ge=1, le=100)
+    gmail_metadata_first: bool = Field(default=True)
+    gmail_incremental_sync: bool = Field(default=False)
 
     # File Paths
     data_dir: str = Field(default="./data")
     output_dir: str = Field(default="./data/output")
     temp_dir: str = Field(default="./tmp")
+    repo_cache_dir: str = Field(default="./tmp/repo_cache")
     log_dir: str = Field(default="./logs")
     students_mapping_file: str = Field(default="./data/students_mapping.xlsx")
+    gmail_sync_state_file: str = Field(default="./data/gmail_sync_state.json")
+    gmail_discovery_cache_file: str = Field(default="./data/gmail_v1_discovery.json")
+    grade_cache_file: str = Field(default="./data/grade_cache.sqlite")
+    feedback_cache_file: str = Field(default="./data/feedback_cache.sqlite")
+    ledger_file: str = Field(default="./data/ledger.sqlite")
+    checkpoint_dir: str = Field(default="./data/checkpoints")
 
     # Processing Limits
     max_batch_size: int = Field(default=100, ge=1, le=1000)
     default_batch_size: int = Field(default=10, ge=1, le=100)
 
-    # Excel File Names
+    # Step File Names (the suffix follows intermediate_format)
+    intermediate_format: str = Field(default="parquet", pattern="^(xlsx|parquet|arrow)$")
     file_1_2_name: str = Field(default="file_1_2.xlsx")
     file_2_3_name: str = Field(default="file_2_3.xlsx")
     file_3_4_name: str = Field(default="file_3_4.xlsx")
@@ -56,6 +100,18 @@ class Settings(BaseSettings):
         """Get full path for output file."""
         return Path(self.output_dir) / filename
 
+    def get_stage_path(self, filename: str) -> Path:
+        """Get full path for a step file in the configured intermediate format."""
+        return self.get_output_path(filename).with_suffix(f".{self.intermediate_format}")
+
+    def get_checkpoint_path(self, step: str) -> Path:
+        """Get the checkpoint journal path of a step ('grade' or 'feedback')."""
+        return Path(self.checkpoint_dir) / f"{step}.jsonl"
+
+    def get_analysis_exclude_globs(self) -> List[str]:
+        """Get the comma-separated exclude globs as a list."""
+        return [glob.strip() for glob in self.analysis_exclude_globs.split(',') if glob.strip()]
+
     def ensure_directories(self):
         """Create necessary directories if they don't exist."""
         Path(self.data_dir).mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,114 @@
+"""Cold-start import budget check for src.main.
+
+Imports src.main in fresh interpreters under ``python -X importtime`` and
+fails if one of the heavy dependencies that the steps import on demand is
+loaded at startup, or if the median cumulative import time exceeds the
+budget. The heavy-module check is the main gate; the default budget leaves
+headroom for settings and logging (pydantic_settings alone takes ~200 ms on
+a cold start) and catches regressions of a similar size.
+
+Usage:
+    python scripts/bench_import_time.py [--budget-ms 1000] [--runs 5] [--top 10]
+
+Exit codes: 0 within budget, 1 over budget or heavy module imported,
+2 src.main could not be imported.
+"""
+
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Modules that must only be imported by the step that needs them
+DEFERRED_MODULES = [
+    'pandas',
+    'openpyxl',
+    'pyarrow',
+    'googleapiclient',
+    'google.generativeai',
+    'git',
+    'httplib2',
+]
+
+
+def measure_once(module: str) -> Tuple[Dict[str, int], int]:
+    """
+    Import a module in a fresh interpreter with -X importtime.
+
+    Args:
+        module: Module to import
+
+    Returns:
+        Tuple of cumulative microseconds per imported module and the
+        cumulative microseconds of the module itself
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [str(ROOT), env.get('PYTHONPATH')]))
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed")
+
+    cumulative: Dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        # "import time:   self [us] | cumulative | imported package"
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        cumulative[name.strip()] = int(cumulative_us)
+
+    return cumulative, cumulative.get(module, 0)
+
+
+def main() -> int:
+    """Run the benchmark and compare it with the budget."""
+    parser = argparse.ArgumentParser(description="Check the cold-start import time of src.main")
+    parser.add_argument('--module', default='src.main', help="Module to import (default: src.main)")
+    parser.add_argument('--budget-ms', type=float, default=1000,
+                        help="Allowed median import time (default: 1000)")
+    parser.add_argument('--runs', type=int, default=5, help="Fresh interpreters to measure (default: 5)")
+    parser.add_argument('--top', type=int, default=10, help="Slowest imports to list (default: 10)")
+    args = parser.parse_args()
+
+    totals: List[int] = []
+    cumulative: Dict[str, int] = {}
+    for _ in range(max(1, args.runs)):
+        try:
+            cumulative, total = measure_once(args.module)
+        except RuntimeError as e:
+            print(f"Could not import {args.module}: {e}")
+            return 2
+        totals.append(total)
+
+    median_ms = statistics.median(totals) / 1000
+    print(f"{args.module}: median {median_ms:.1f} ms over {len(totals)} run(s) (budget {args.budget_ms:.0f} ms)")
+
+    # Top-level packages are the ones that dominate the cumulative times
+    top_level = {name: us for name, us in cumulative.items() if '.' not in name and name != args.module}
+    print("\nSlowest top-level imports (last run):")
+    for name, us in sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    failed = False
+    eager = [name for name in DEFERRED_MODULES if name in cumulative]
+    if eager:
+        print(f"\nFAIL: imported at startup: {', '.join(eager)}")
+        failed = True
+    if median_ms > args.budget_ms:
+        print(f"\nFAIL: {median_ms:.1f} ms exceeds the {args.budget_ms:.0f} ms budget")
+        failed = True
+
+    if not failed:
+        print("\nOK")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
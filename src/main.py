@@ -1,23 +1,26 @@
-"""Main application with interactive menu system."""
+"""Main application with interactive menu system and command-line interface."""
 
 import sys
+import json
 import shutil
+import signal
+import argparse
+import threading
+import contextlib
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional
 import time
 
 from colorama import Fore, Style, init
 
 from config.settings import settings
 from src.utils.logger import setup_logger, logger
-from src.services.gmail_service import GmailService
-from src.services.gemini_service import GeminiService
-from src.services.git_service import GitService
-from src.modules.email_processor import EmailProcessor
-from src.modules.repo_analyzer import RepoAnalyzer
-from src.modules.feedback_generator import FeedbackGenerator
-from src.modules.draft_creator import DraftCreator
-from src.modules.data_manager import DataManager
+from src.utils.rate_limiter import AdaptiveRateController, RateLimiter, TokenBucketLimiter
+from src.modules.ledger import SubmissionLedger
+
+# Step modules and API clients pull in pandas, googleapiclient, google.generativeai
+# and gitpython, so they are imported by the actions that use them. This keeps the
+# menu, Reset and the command line fast to start (see scripts/bench_import_time.py).
 
 # Initialize colorama
 init(autoreset=True)
@@ -26,8 +29,15 @@ init(autoreset=True)
 class HomeworkGradingSystem:
     """Main application class."""
 
-    def __init__(self):
-        """Initialize the homework grading system."""
+    def __init__(self, interactive: bool = True):
+        """
+        Initialize the homework grading system.
+
+        Args:
+            interactive: Wait for Enter after each step; False for the
+                command-line and watch modes
+        """
+        self.interactive = interactive
         self.mode = None
         self.mode_limit = None
 
@@ -36,19 +46,35 @@ class HomeworkGradingSystem:
         self._gemini_service = None
         self._git_service = None
 
+        # Per-submission state of every step, so reruns skip finished work
+        self.ledger = SubmissionLedger(settings.ledger_file) if settings.ledger_enabled else None
+
+        # Daily Gemini quota, shared by every Step 3 run of this session
+        self.gemini_daily_limiter = None
+        if settings.gemini_requests_per_day:
+            self.gemini_daily_limiter = RateLimiter(settings.gemini_requests_per_day, 24 * 60 * 60, name="Gemini daily")
+
         # File paths
-        self.file_1_2 = settings.get_output_path(settings.file_1_2_name)
-        self.file_2_3 = settings.get_output_path(settings.file_2_3_name)
-        self.file_3_4 = settings.get_output_path(settings.file_3_4_name)
+        self.file_1_2 = settings.get_stage_path(settings.file_1_2_name)
+        self.file_2_3 = settings.get_stage_path(settings.file_2_3_name)
+        self.file_3_4 = settings.get_stage_path(settings.file_3_4_name)
 
     @property
     def gmail_service(self):
         """Lazy-load Gmail service."""
         if self._gmail_service is None:
             try:
+                from src.services.gmail_service import GmailService
+
+                rate_limiter = None
+                if settings.gmail_quota_units_per_second:
+                    rate_limiter = RateLimiter(settings.gmail_quota_units_per_second, 1, name="Gmail")
                 self._gmail_service = GmailService(
                     settings.gmail_credentials_path,
-                    settings.gmail_token_path
+                    settings.gmail_token_path,
+                    rate_limiter=rate_limiter,
+                    http_pool_size=settings.gmail_http_pool_size,
+                    discovery_cache_path=settings.gmail_discovery_cache_file
                 )
             except Exception as e:
                 logger.error(f"Failed to initialize Gmail service: {e}")
@@ -63,7 +89,22 @@ class HomeworkGradingSystem:
             try:
                 if not settings.gemini_api_key:
                     raise ValueError("Gemini API key not configured")
-                self._gemini_service = GeminiService(settings.gemini_api_key)
+                from src.services.gemini_service import GeminiService
+
+                rate_controller = AdaptiveRateController(
+                    TokenBucketLimiter(
+                        settings.gemini_requests_per_minute,
+                        settings.gemini_tokens_per_minute or None
+                    ),
+                    min_rpm=settings.gemini_min_requests_per_minute,
+                    max_rpm=settings.gemini_max_requests_per_minute,
+                    max_concurrency=settings.gemini_max_workers
+                )
+                self._gemini_service = GeminiService(
+                    settings.gemini_api_key,
+                    rate_controller=rate_controller,
+                    max_attempts=settings.gemini_max_attempts
+                )
             except Exception as e:
                 logger.error(f"Failed to initialize Gemini service: {e}")
                 print(f"{Fore.RED}Error: Failed to initialize Gemini API. Please check API key.{Style.RESET_ALL}")
@@ -132,11 +173,12 @@ class HomeworkGradingSystem:
             print(f"{Fore.GREEN}3.{Style.RESET_ALL} Generate Feedback          - Execute Step 3 only")
             print(f"{Fore.GREEN}4.{Style.RESET_ALL} Create Email Drafts        - Execute Step 4 only")
             print(f"{Fore.GREEN}5.{Style.RESET_ALL} Run All Steps (1-4)        - Execute complete workflow")
-            print(f"{Fore.GREEN}6.{Style.RESET_ALL} Reset                      - Delete all generated files")
-            print(f"{Fore.GREEN}7.{Style.RESET_ALL} Change Mode                - Return to mode selection")
-            print(f"{Fore.GREEN}8.{Style.RESET_ALL} Exit\n")
+            print(f"{Fore.GREEN}6.{Style.RESET_ALL} Export Excel Report        - Write the step files as .xlsx")
+            print(f"{Fore.GREEN}7.{Style.RESET_ALL} Reset                      - Delete all generated files")
+            print(f"{Fore.GREEN}8.{Style.RESET_ALL} Change Mode                - Return to mode selection")
+            print(f"{Fore.GREEN}9.{Style.RESET_ALL} Exit\n")
 
-            choice = input(f"{Fore.YELLOW}Enter your choice (1-8): {Style.RESET_ALL}").strip()
+            choice = input(f"{Fore.YELLOW}Enter your choice (1-9): {Style.RESET_ALL}").strip()
 
             if choice == '1':
                 self.run_step_1()
@@ -149,28 +191,39 @@ class HomeworkGradingSystem:
             elif choice == '5':
                 self.run_all_steps()
             elif choice == '6':
-                self.reset()
+                self.export_excel_report()
             elif choice == '7':
-                self.show_mode_selection_menu()
+                self.reset()
             elif choice == '8':
+                self.show_mode_selection_menu()
+            elif choice == '9':
                 print(f"{Fore.CYAN}Exiting...{Style.RESET_ALL}")
                 sys.exit(0)
             else:
                 print(f"{Fore.RED}Invalid choice. Please try again.{Style.RESET_ALL}")
                 input("Press Enter to continue...")
 
-    def run_step_1(self):
-        """Execute Step 1: Email Search."""
+    def run_step_1(self) -> Optional[Dict]:
+        """
+        Execute Step 1: Email Search.
+
+        Returns:
+            Dictionary with 'processed' count, or None if the step failed
+        """
+        summary = None
         print(f"\n{Fore.CYAN}{'='*60}")
         print(f"{Fore.CYAN}Step 1: Searching Emails")
         print(f"{Fore.CYAN}{'='*60}{Style.RESET_ALL}\n")
 
         try:
-            processor = EmailProcessor(self.gmail_service)
+            from src.modules.email_processor import EmailProcessor
+
+            processor = EmailProcessor(self.gmail_service, self.ledger)
             result = processor.process_emails(limit=self.mode_limit)
+            summary = {'processed': result['processed']}
 
             if result['processed'] > 0:
-                processor.save_to_excel(result['data'], str(self.file_1_2))
+                processor.save_results(result['data'], str(self.file_1_2))
                 print(f"\n{Fore.GREEN}✓ Success: Processed {result['processed']} email(s)")
                 print(f"  Output: {self.file_1_2}{Style.RESET_ALL}")
             else:
@@ -180,10 +233,17 @@ class HomeworkGradingSystem:
             logger.error(f"Step 1 failed: {e}")
             print(f"\n{Fore.RED}✗ Error: {e}{Style.RESET_ALL}")
 
-        input(f"\n{Fore.YELLOW}Press Enter to continue...{Style.RESET_ALL}")
+        self._pause()
+        return summary
+
+    def run_step_2(self) -> Optional[Dict]:
+        """
+        Execute Step 2: Clone and Grade Repositories.
 
-    def run_step_2(self):
-        """Execute Step 2: Clone and Grade Repositories."""
+        Returns:
+            Dictionary with 'graded' and 'failed' counts, or None if the step failed
+        """
+        result = None
         print(f"\n{Fore.CYAN}{'='*60}")
         print(f"{Fore.CYAN}Step 2: Cloning and Grading Repositories")
         print(f"{Fore.CYAN}{'='*60}{Style.RESET_ALL}\n")
@@ -191,11 +251,13 @@ class HomeworkGradingSystem:
         # Check dependency
         if not self.file_1_2.exists():
             print(f"{Fore.RED}✗ Error: {self.file_1_2.name} not found. Please run Step 1 first.{Style.RESET_ALL}")
-            input(f"\n{Fore.YELLOW}Press Enter to continue...{Style.RESET_ALL}")
-            return
+            self._pause()
+            return None
 
         try:
-            analyzer = RepoAnalyzer()
+            from src.modules.repo_analyzer import RepoAnalyzer
+
+            analyzer = RepoAnalyzer(self.ledger)
             result = analyzer.analyze_repositories(
                 str(self.file_1_2),
                 str(self.file_2_3),
@@ -210,11 +272,19 @@ class HomeworkGradingSystem:
         except Exception as e:
             logger.error(f"Step 2 failed: {e}")
             print(f"\n{Fore.RED}✗ Error: {e}{Style.RESET_ALL}")
+            result = None
 
-        input(f"\n{Fore.YELLOW}Press Enter to continue...{Style.RESET_ALL}")
+        self._pause()
+        return result
 
-    def run_step_3(self):
-        """Execute Step 3: Generate Feedback."""
+    def run_step_3(self) -> Optional[Dict]:
+        """
+        Execute Step 3: Generate Feedback.
+
+        Returns:
+            Dictionary with 'generated' and 'failed' counts, or None if the step failed
+        """
+        result = None
         print(f"\n{Fore.CYAN}{'='*60}")
         print(f"{Fore.CYAN}Step 3: Generating AI Feedback")
         print(f"{Fore.CYAN}{'='*60}{Style.RESET_ALL}\n")
@@ -222,11 +292,13 @@ class HomeworkGradingSystem:
         # Check dependency
         if not self.file_2_3.exists():
             print(f"{Fore.RED}✗ Error: {self.file_2_3.name} not found. Please run Step 2 first.{Style.RESET_ALL}")
-            input(f"\n{Fore.YELLOW}Press Enter to continue...{Style.RESET_ALL}")
-            return
+            self._pause()
+            return None
 
         try:
-            generator = FeedbackGenerator(self.gemini_service)
+            from src.modules.feedback_generator import FeedbackGenerator
+
+            generator = FeedbackGenerator(self.gemini_service, self.gemini_daily_limiter, self.ledger)
             result = generator.generate_all_feedback(
                 str(self.file_2_3),
                 str(self.file_3_4)
@@ -240,11 +312,19 @@ class HomeworkGradingSystem:
         except Exception as e:
             logger.error(f"Step 3 failed: {e}")
             print(f"\n{Fore.RED}✗ Error: {e}{Style.RESET_ALL}")
+            result = None
 
-        input(f"\n{Fore.YELLOW}Press Enter to continue...{Style.RESET_ALL}")
+        self._pause()
+        return result
 
-    def run_step_4(self):
-        """Execute Step 4: Create Email Drafts."""
+    def run_step_4(self) -> Optional[Dict]:
+        """
+        Execute Step 4: Create Email Drafts.
+
+        Returns:
+            Dictionary with 'created' and 'failed' counts, or None if the step failed
+        """
+        result = None
         print(f"\n{Fore.CYAN}{'='*60}")
         print(f"{Fore.CYAN}Step 4: Creating Email Drafts")
         print(f"{Fore.CYAN}{'='*60}{Style.RESET_ALL}\n")
@@ -252,16 +332,18 @@ class HomeworkGradingSystem:
         # Check dependencies
         if not self.file_3_4.exists():
             print(f"{Fore.RED}✗ Error: {self.file_3_4.name} not found. Please run Step 3 first.{Style.RESET_ALL}")
-            input(f"\n{Fore.YELLOW}Press Enter to continue...{Style.RESET_ALL}")
-            return
+            self._pause()
+            return None
 
         if not self.file_1_2.exists():
             print(f"{Fore.RED}✗ Error: {self.file_1_2.name} not found. Please run Step 1 first.{Style.RESET_ALL}")
-            input(f"\n{Fore.YELLOW}Press Enter to continue...{Style.RESET_ALL}")
-            return
+            self._pause()
+            return None
 
         try:
-            creator = DraftCreator(self.gmail_service)
+            from src.modules.draft_creator import DraftCreator
+
+            creator = DraftCreator(self.gmail_service, self.ledger)
             result = creator.create_all_drafts(
                 str(self.file_3_4),
                 str(self.file_1_2),
@@ -276,34 +358,54 @@ class HomeworkGradingSystem:
         except Exception as e:
             logger.error(f"Step 4 failed: {e}")
             print(f"\n{Fore.RED}✗ Error: {e}{Style.RESET_ALL}")
+            result = None
+
+        self._pause()
+        return result
 
-        input(f"\n{Fore.YELLOW}Press Enter to continue...{Style.RESET_ALL}")
+    def run_all_steps(self) -> Optional[Dict]:
+        """
+        Execute all steps sequentially.
 
-    def run_all_steps(self):
-        """Execute all steps sequentially."""
+        Returns:
+            Dictionary with 'processed', 'graded', 'generated' and 'created'
+            counts, or None if the workflow failed
+        """
         print(f"\n{Fore.CYAN}{'='*60}")
         print(f"{Fore.CYAN}Running All Steps (Complete Workflow)")
         print(f"{Fore.CYAN}{'='*60}{Style.RESET_ALL}\n")
 
         start_time = time.time()
 
+        if settings.run_all_mode == 'streaming':
+            return self.run_all_steps_streaming(start_time)
+
+        summary = None
         try:
+            from src.modules.email_processor import EmailProcessor
+            from src.modules.repo_analyzer import RepoAnalyzer
+            from src.modules.feedback_generator import FeedbackGenerator
+            from src.modules.draft_creator import DraftCreator
+
             # Step 1
             print(f"{Fore.CYAN}▶ Step 1: Searching emails...{Style.RESET_ALL}")
-            processor = EmailProcessor(self.gmail_service)
+            processor = EmailProcessor(self.gmail_service, self.ledger)
             result1 = processor.process_emails(limit=self.mode_limit)
 
-            if result1['processed'] == 0:
+            if result1['processed'] > 0:
+                processor.save_results(result1['data'], str(self.file_1_2))
+                print(f"{Fore.GREEN}✓ Step 1 complete: {result1['processed']} email(s) processed{Style.RESET_ALL}\n")
+            elif self._has_pending_work():
+                # Earlier runs left submissions in Steps 2-4
+                print(f"{Fore.YELLOW}⚠ No new emails, resuming pending submissions{Style.RESET_ALL}\n")
+            else:
                 print(f"{Fore.YELLOW}⚠ No emails found. Workflow stopped.{Style.RESET_ALL}")
-                input(f"\n{Fore.YELLOW}Press Enter to continue...{Style.RESET_ALL}")
-                return
-
-            processor.save_to_excel(result1['data'], str(self.file_1_2))
-            print(f"{Fore.GREEN}✓ Step 1 complete: {result1['processed']} email(s) processed{Style.RESET_ALL}\n")
+                self._pause()
+                return {'processed': 0, 'graded': 0, 'generated': 0, 'created': 0}
 
             # Step 2
             print(f"{Fore.CYAN}▶ Step 2: Cloning and grading repositories...{Style.RESET_ALL}")
-            analyzer = RepoAnalyzer()
+            analyzer = RepoAnalyzer(self.ledger)
             result2 = analyzer.analyze_repositories(
                 str(self.file_1_2),
                 str(self.file_2_3),
@@ -313,7 +415,7 @@ class HomeworkGradingSystem:
 
             # Step 3
             print(f"{Fore.CYAN}▶ Step 3: Generating AI feedback...{Style.RESET_ALL}")
-            generator = FeedbackGenerator(self.gemini_service)
+            generator = FeedbackGenerator(self.gemini_service, self.gemini_daily_limiter, self.ledger)
             result3 = generator.generate_all_feedback(
                 str(self.file_2_3),
                 str(self.file_3_4)
@@ -322,7 +424,7 @@ class HomeworkGradingSystem:
 
             # Step 4
             print(f"{Fore.CYAN}▶ Step 4: Creating email drafts...{Style.RESET_ALL}")
-            creator = DraftCreator(self.gmail_service)
+            creator = DraftCreator(self.gmail_service, self.ledger)
             result4 = creator.create_all_drafts(
                 str(self.file_3_4),
                 str(self.file_1_2),
@@ -331,35 +433,147 @@ class HomeworkGradingSystem:
             print(f"{Fore.GREEN}✓ Step 4 complete: {result4['created']} draft(s) created{Style.RESET_ALL}\n")
 
             # Summary
-            elapsed = time.time() - start_time
-            minutes = int(elapsed // 60)
-            seconds = int(elapsed % 60)
-
-            print(f"\n{Fore.CYAN}{'='*60}")
-            print(f"{Fore.CYAN}         Workflow Completion Summary")
-            print(f"{Fore.CYAN}{'='*60}{Style.RESET_ALL}\n")
-
-            mode_display = f"Test" if self.mode == 'test' else f"Batch({self.mode_limit})" if self.mode == 'batch' else "Full"
-            print(f"{Fore.YELLOW}Mode:{Style.RESET_ALL} {mode_display}")
-            print(f"{Fore.YELLOW}Execution Time:{Style.RESET_ALL} {minutes}m {seconds}s\n")
+            self._print_workflow_summary(start_time, result1['processed'], result2['graded'],
+                                         result3['generated'], result4['created'])
+            summary = {
+                'processed': result1['processed'],
+                'graded': result2['graded'],
+                'generated': result3['generated'],
+                'created': result4['created']
+            }
 
-            print(f"{Fore.GREEN}✓ Step 1 - Email Search:        {result1['processed']} email(s) processed")
-            print(f"✓ Step 2 - Clone & Grade:       {result2['graded']} repository analyzed")
-            print(f"✓ Step 3 - Generate Feedback:   {result3['generated']} feedback generated")
-            print(f"✓ Step 4 - Create Drafts:       {result4['created']} draft created{Style.RESET_ALL}\n")
+        except Exception as e:
+            logger.error(f"Workflow failed: {e}")
+            print(f"\n{Fore.RED}✗ Workflow failed: {e}{Style.RESET_ALL}")
 
-            print(f"{Fore.CYAN}Files Created:")
-            print(f"  - {self.file_1_2}")
-            print(f"  - {self.file_2_3}")
-            print(f"  - {self.file_3_4}{Style.RESET_ALL}\n")
+        self._pause()
+        return summary
+
+    def _has_pending_work(self) -> bool:
+        """
+        Check whether earlier runs left work for Steps 2-4.
+
+        Returns:
+            True if the ledger has pending rows or an interrupted step left
+            a checkpoint to resume
+        """
+        if self.ledger and any(self.ledger.pending(step) for step in ('grade', 'feedback', 'draft')):
+            return True
+        return settings.checkpoint_enabled and self.file_1_2.exists() and any(
+            settings.get_checkpoint_path(step).exists() for step in ('grade', 'feedback')
+        )
+
+    def run_all_steps_streaming(self, start_time: float) -> Optional[Dict]:
+        """
+        Execute all steps as a streaming pipeline.
+
+        Args:
+            start_time: Workflow start time (time.time())
+
+        Returns:
+            Pipeline result counts, or None if the workflow failed
+        """
+        result = None
+        try:
+            from src.modules.pipeline import StreamingPipeline
+
+            print(f"{Fore.CYAN}▶ Streaming emails through Steps 1-4...{Style.RESET_ALL}")
+            pipeline = StreamingPipeline(
+                self.gmail_service,
+                self.gemini_service,
+                self.gemini_daily_limiter,
+                self.ledger
+            )
+            result = pipeline.run(
+                str(self.file_1_2),
+                str(self.file_2_3),
+                str(self.file_3_4),
+                settings.students_mapping_file,
+                limit=self.mode_limit
+            )
 
-            print(f"{Fore.GREEN}Drafts: Check your Gmail drafts folder{Style.RESET_ALL}")
+            if result['processed'] == 0:
+                print(f"{Fore.YELLOW}⚠ No emails found. Workflow stopped.{Style.RESET_ALL}")
+            else:
+                self._print_workflow_summary(start_time, result['processed'], result['graded'],
+                                             result['generated'], result['created'])
+                if result['first_draft_seconds'] is not None:
+                    print(f"{Fore.YELLOW}First draft after:{Style.RESET_ALL} {result['first_draft_seconds']:.1f}s\n")
 
         except Exception as e:
             logger.error(f"Workflow failed: {e}")
             print(f"\n{Fore.RED}✗ Workflow failed: {e}{Style.RESET_ALL}")
+            result = None
+
+        self._pause()
+        return result
+
+    def _print_workflow_summary(self, start_time: float, processed: int, graded: int,
+                                generated: int, created: int):
+        """
+        Print the completion summary of a full workflow run.
+
+        Args:
+            start_time: Workflow start time (time.time())
+            processed: Emails processed in Step 1
+            graded: Repositories graded in Step 2
+            generated: Feedback texts generated in Step 3
+            created: Drafts created in Step 4
+        """
+        elapsed = time.time() - start_time
+        minutes = int(elapsed // 60)
+        seconds = int(elapsed % 60)
+
+        print(f"\n{Fore.CYAN}{'='*60}")
+        print(f"{Fore.CYAN}         Workflow Completion Summary")
+        print(f"{Fore.CYAN}{'='*60}{Style.RESET_ALL}\n")
+
+        mode_display = f"Test" if self.mode == 'test' else f"Batch({self.mode_limit})" if self.mode == 'batch' else "Full"
+        print(f"{Fore.YELLOW}Mode:{Style.RESET_ALL} {mode_display}")
+        print(f"{Fore.YELLOW}Execution Time:{Style.RESET_ALL} {minutes}m {seconds}s\n")
 
-        input(f"\n{Fore.YELLOW}Press Enter to continue...{Style.RESET_ALL}")
+        print(f"{Fore.GREEN}✓ Step 1 - Email Search:        {processed} email(s) processed")
+        print(f"✓ Step 2 - Clone & Grade:       {graded} repository analyzed")
+        print(f"✓ Step 3 - Generate Feedback:   {generated} feedback generated")
+        print(f"✓ Step 4 - Create Drafts:       {created} draft created{Style.RESET_ALL}\n")
+
+        print(f"{Fore.CYAN}Files Created:")
+        print(f"  - {self.file_1_2}")
+        print(f"  - {self.file_2_3}")
+        print(f"  - {self.file_3_4}{Style.RESET_ALL}\n")
+
+        print(f"{Fore.GREEN}Drafts: Check your Gmail drafts folder{Style.RESET_ALL}")
+
+    def export_excel_report(self) -> Dict:
+        """
+        Export the step files to Excel workbooks.
+
+        Returns:
+            Dictionary with the 'exported' workbook paths
+        """
+        exported = []
+        print(f"\n{Fore.CYAN}{'='*60}")
+        print(f"{Fore.CYAN}Exporting Excel Report")
+        print(f"{Fore.CYAN}{'='*60}{Style.RESET_ALL}\n")
+
+        from src.modules.data_manager import DataManager
+
+        data_manager = DataManager()
+        for file_path in (self.file_1_2, self.file_2_3, self.file_3_4):
+            if not file_path.exists():
+                print(f"{Fore.YELLOW}✗ {file_path.name} (not found){Style.RESET_ALL}")
+                continue
+
+            try:
+                excel_path = data_manager.export_to_excel(str(file_path))
+                exported.append(str(excel_path))
+                print(f"{Fore.GREEN}✓ {excel_path}{Style.RESET_ALL}")
+            except Exception as e:
+                logger.error(f"Excel export of {file_path} failed: {e}")
+                print(f"{Fore.RED}✗ {file_path.name}: {e}{Style.RESET_ALL}")
+
+        self._pause()
+        return {'exported': exported}
 
     def reset(self):
         """Delete all generated files."""
@@ -372,7 +586,17 @@ class HomeworkGradingSystem:
         files_to_delete = [
             self.file_1_2,
             self.file_2_3,
-            self.file_3_4
+            self.file_3_4,
+            Path(settings.gmail_sync_state_file),
+            Path(settings.ledger_file)
+        ]
+        # SQLite WAL side files of the ledger
+        files_to_delete += [Path(f"{settings.ledger_file}{suffix}") for suffix in ('-wal', '-shm')]
+        # Excel reports exported from the step files
+        files_to_delete += [
+            file_path.with_suffix('.xlsx')
+            for file_path in (self.file_1_2, self.file_2_3, self.file_3_4)
+            if file_path.suffix != '.xlsx'
         ]
 
         for file_path in files_to_delete:
@@ -381,18 +605,29 @@ class HomeworkGradingSystem:
             else:
                 print(f"{Fore.YELLOW}✗ {file_path.name} (not found){Style.RESET_ALL}")
 
-        repos_dir = Path(settings.temp_dir) / 'homework_repos'
-        if repos_dir.exists():
-            print(f"{Fore.GREEN}✓ Cloned repositories in {repos_dir}{Style.RESET_ALL}")
-        else:
-            print(f"{Fore.YELLOW}✗ Cloned repositories (not found){Style.RESET_ALL}")
+        dirs_to_delete = [
+            ("Cloned repositories", Path(settings.temp_dir) / 'homework_repos'),
+            ("Clone cache", Path(settings.repo_cache_dir)),
+            ("Git object store", Path(settings.temp_dir) / 'homework_objects'),
+            ("Step checkpoints", Path(settings.checkpoint_dir)),
+        ]
+
+        for label, dir_path in dirs_to_delete:
+            if dir_path.exists():
+                print(f"{Fore.GREEN}✓ {label} in {dir_path}{Style.RESET_ALL}")
+            else:
+                print(f"{Fore.YELLOW}✗ {label} (not found){Style.RESET_ALL}")
 
         confirmation = input(f"\n{Fore.RED}Are you sure you want to continue? (yes/no): {Style.RESET_ALL}").strip().lower()
 
         if confirmation == 'yes':
             print(f"\n{Fore.CYAN}Deleting files...{Style.RESET_ALL}\n")
 
-            # Delete Excel files
+            # The ledger is reopened on a fresh database afterwards
+            if self.ledger:
+                self.ledger.close()
+
+            # Delete step files and reports
             for file_path in files_to_delete:
                 if file_path.exists():
                     try:
@@ -401,19 +636,57 @@ class HomeworkGradingSystem:
                     except Exception as e:
                         print(f"{Fore.RED}✗ Failed to delete {file_path.name}: {e}{Style.RESET_ALL}")
 
-            # Delete repositories directory
-            if repos_dir.exists():
-                try:
-                    shutil.rmtree(repos_dir)
-                    print(f"{Fore.GREEN}✓ Deleted: Cloned repositories{Style.RESET_ALL}")
-                except Exception as e:
-                    print(f"{Fore.RED}✗ Failed to delete repositories: {e}{Style.RESET_ALL}")
+            # Delete repository directories
+            for label, dir_path in dirs_to_delete:
+                if dir_path.exists():
+                    try:
+                        shutil.rmtree(dir_path)
+                        print(f"{Fore.GREEN}✓ Deleted: {label}{Style.RESET_ALL}")
+                    except Exception as e:
+                        print(f"{Fore.RED}✗ Failed to delete {label.lower()}: {e}{Style.RESET_ALL}")
+
+            if self.ledger:
+                self.ledger = SubmissionLedger(settings.ledger_file)
 
             print(f"\n{Fore.GREEN}Reset complete!{Style.RESET_ALL}")
         else:
             print(f"\n{Fore.YELLOW}Reset cancelled.{Style.RESET_ALL}")
 
-        input(f"\n{Fore.YELLOW}Press Enter to continue...{Style.RESET_ALL}")
+        self._pause()
+
+    def watch(self, interval: float, stop: threading.Event, on_cycle=None):
+        """
+        Run all steps repeatedly until stopped.
+
+        The Gmail and Gemini clients, rate limiters and ledger of this
+        instance are reused by every cycle, so authentication happens once.
+
+        Args:
+            interval: Seconds between the start of two cycles
+            stop: Event ending the loop once set (checked between cycles)
+            on_cycle: Optional callback receiving each cycle's summary
+        """
+        cycle = 0
+        while not stop.is_set():
+            cycle += 1
+            started = time.monotonic()
+            logger.info(f"Watch cycle {cycle} started")
+
+            summary = self.run_all_steps()
+            if on_cycle:
+                on_cycle({'cycle': cycle, 'ok': summary is not None, 'result': summary,
+                          'elapsed_seconds': round(time.monotonic() - started, 1)})
+
+            wait = max(0.0, interval - (time.monotonic() - started))
+            logger.info(f"Watch cycle {cycle} finished, next in {wait:.0f}s")
+            stop.wait(wait)
+
+        logger.info(f"Watch mode stopped after {cycle} cycle(s)")
+
+    def _pause(self):
+        """Wait for Enter before returning to the menu (interactive mode only)."""
+        if self.interactive:
+            input(f"\n{Fore.YELLOW}Press Enter to continue...{Style.RESET_ALL}")
 
     @staticmethod
     def clear_screen():
@@ -422,12 +695,129 @@ class HomeworkGradingSystem:
         os.system('cls' if os.name == 'nt' else 'clear')
 
 
+# Subcommand -> (HomeworkGradingSystem method, setting overridden by --workers)
+COMMANDS = {
+    'search': ('run_step_1', 'gmail_fetch_workers'),
+    'grade': ('run_step_2', 'max_clone_workers'),
+    'feedback': ('run_step_3', 'gemini_max_workers'),
+    'drafts': ('run_step_4', 'draft_workers'),
+    'run-all': ('run_all_steps', None),
+    'export': ('export_excel_report', None),
+}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Build the command-line parser.
+
+    Returns:
+        Argument parser; without a subcommand the interactive menu is shown
+    """
+    parser = argparse.ArgumentParser(
+        description="Homework grading system. Run without a command for the interactive menu."
+    )
+    subparsers = parser.add_subparsers(dest='command')
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--limit', type=int, default=None,
+                        help="Maximum number of emails to process (default: all)")
+    common.add_argument('--json', action='store_true',
+                        help="Print a JSON summary on stdout (progress goes to stderr)")
+
+    helps = {
+        'search': "Step 1: search emails",
+        'grade': "Step 2: clone and grade repositories",
+        'feedback': "Step 3: generate feedback",
+        'drafts': "Step 4: create email drafts",
+        'run-all': "Steps 1-4",
+        'export': "Export the step files as Excel workbooks",
+    }
+    for command, (_, workers_setting) in COMMANDS.items():
+        subparser = subparsers.add_parser(command, parents=[common], help=helps[command])
+        if workers_setting:
+            subparser.add_argument('--workers', type=int, default=None,
+                                   help=f"Concurrent workers (default: {workers_setting.upper()})")
+
+    watch = subparsers.add_parser('watch', parents=[common],
+                                  help="Run Steps 1-4 every --interval seconds until stopped")
+    watch.add_argument('--interval', type=float, default=300,
+                       help="Seconds between cycles (default: 300)")
+
+    return parser
+
+
+def run_command(args: argparse.Namespace) -> int:
+    """
+    Run one subcommand without prompts.
+
+    Args:
+        args: Parsed command-line arguments
+
+    Returns:
+        Process exit code
+    """
+    if args.limit is not None and args.limit < 1:
+        print("--limit must be at least 1", file=sys.stderr)
+        return 2
+
+    app = HomeworkGradingSystem(interactive=False)
+    app.mode = 'full' if args.limit is None else 'batch'
+    app.mode_limit = args.limit
+
+    # With --json only the summary goes to stdout
+    output = sys.stdout
+    human = contextlib.redirect_stdout(sys.stderr) if args.json else contextlib.nullcontext()
+
+    if args.command == 'watch':
+        stop = threading.Event()
+
+        def request_stop(signum, frame):
+            # First signal finishes the current cycle, a second one aborts it
+            if stop.is_set():
+                raise KeyboardInterrupt
+            logger.info("Stop requested, finishing the current cycle")
+            stop.set()
+
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, request_stop)
+
+        def on_cycle(summary: Dict):
+            if args.json:
+                print(json.dumps(summary), file=output, flush=True)
+
+        with human:
+            app.watch(args.interval, stop, on_cycle)
+        return 0
+
+    method, workers_setting = COMMANDS[args.command]
+    if workers_setting and args.workers is not None:
+        setattr(settings, workers_setting, args.workers)
+
+    started = time.monotonic()
+    with human:
+        result = getattr(app, method)()
+
+    if args.json:
+        print(json.dumps({
+            'command': args.command,
+            'ok': result is not None,
+            'result': result,
+            'elapsed_seconds': round(time.monotonic() - started, 1)
+        }), file=output)
+    return 0 if result is not None else 1
+
+
 def main():
     """Main entry point."""
+    args = build_parser().parse_args()
+
     try:
         # Setup logger
         setup_logger(log_level=settings.log_level)
 
+        if args.command:
+            sys.exit(run_command(args))
+
         # Create application instance
         app = HomeworkGradingSystem()
 
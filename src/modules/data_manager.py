@@ -1,15 +1,81 @@
-"""Data manager for Excel file operations."""
+"""Data manager for intermediate and Excel file operations."""
 
 from pathlib import Path
 from typing import List, Dict, Any
 import pandas as pd
-from openpyxl import Workbook, load_workbook
 
+from src.modules.storage import get_backend_for_path
 from src.utils.logger import logger
 
 
 class DataManager:
-    """Manages Excel file operations."""
+    """Manages intermediate and Excel file operations."""
+
+    @staticmethod
+    def write_table(data: List[Dict[str, Any]], output_path: str):
+        """
+        Write step data in the format given by the file suffix.
+
+        Args:
+            data: List of dictionaries to write
+            output_path: Output file path (.parquet, .arrow or .xlsx)
+        """
+        try:
+            if not data:
+                logger.warning(f"No data to write to {output_path}")
+            df = pd.DataFrame(data)
+
+            path = Path(output_path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            get_backend_for_path(output_path).write(df, path)
+
+            logger.info(f"Wrote {len(data)} row(s) to {output_path}")
+
+        except Exception as e:
+            logger.error(f"Failed to write {output_path}: {e}")
+            raise
+
+    @staticmethod
+    def read_table(input_path: str) -> pd.DataFrame:
+        """
+        Read step data in the format given by the file suffix.
+
+        Args:
+            input_path: Input file path (.parquet, .arrow or .xlsx)
+
+        Returns:
+            DataFrame with data
+        """
+        try:
+            if not Path(input_path).exists():
+                raise FileNotFoundError(f"File not found: {input_path}")
+
+            df = get_backend_for_path(input_path).read(Path(input_path))
+            logger.debug(f"Read {len(df)} row(s) from {input_path}")
+            return df
+
+        except Exception as e:
+            logger.error(f"Failed to read {input_path}: {e}")
+            raise
+
+    @classmethod
+    def export_to_excel(cls, input_path: str) -> Path:
+        """
+        Export a step file to an Excel workbook next to it.
+
+        Args:
+            input_path: Step file path
+
+        Returns:
+            Path of the written .xlsx file
+        """
+        output_path = Path(input_path).with_suffix('.xlsx')
+        if Path(input_path) == output_path:
+            return output_path
+
+        df = cls.read_table(input_path)
+        cls.write_to_excel(df.to_dict('records'), str(output_path))
+        return output_path
 
     @staticmethod
     def write_to_excel(data: List[Dict[str, Any]], output_path: str, sheet_name: str = 'Data'):
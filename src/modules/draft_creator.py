@@ -1,10 +1,14 @@
 """Draft email creation module - Step 4."""
 
-from typing import Dict
-import pandas as pd
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
 
 from src.services.gmail_service import GmailService
 from src.modules.data_manager import DataManager
+from src.modules.ledger import SubmissionLedger
 from src.utils.logger import logger
 from config.settings import settings
 
@@ -12,87 +16,105 @@ from config.settings import settings
 class DraftCreator:
     """Handles email draft creation - Step 4."""
 
-    def __init__(self, gmail_service: GmailService):
+    # file_1_2 columns needed to build a draft
+    EMAIL_COLUMNS = ['repo_url', 'sender_email', 'thread_id', 'email_subject']
+
+    # Full-jitter backoff between draft attempts: uniform(0, min(max, base * 2^n))
+    RETRY_BASE_SECONDS = 1.0
+    RETRY_MAX_SECONDS = 30.0
+
+    def __init__(self, gmail_service: GmailService, ledger: Optional[SubmissionLedger] = None):
         """
         Initialize draft creator.
 
         Args:
             gmail_service: Gmail service instance
+            ledger: Submission ledger; when set, pending rows are read from it
+                and created drafts are recorded so reruns skip them
         """
         self.gmail_service = gmail_service
+        self.ledger = ledger
         self.data_manager = DataManager()
+        self.max_attempts = settings.draft_max_attempts
+        self._thread_drafts: Optional[Dict[str, str]] = None
+        self._drafts_listed_at: Optional[float] = None
+        self._drafts_lock = threading.Lock()
 
     def create_all_drafts(self, file_3_4: str, file_1_2: str, mapping_file: str):
         """
         Create email drafts for all students.
 
         Args:
-            file_3_4: Path to file_3_4.xlsx (feedback data)
-            file_1_2: Path to file_1_2.xlsx (email metadata)
+            file_3_4: Path to file_3_4 (feedback data)
+            file_1_2: Path to file_1_2 (email metadata)
             mapping_file: Path to students_mapping.xlsx
         """
         try:
             logger.info("Starting draft creation")
 
-            # Load feedback data
-            feedback_df = self.data_manager.read_from_excel(file_3_4)
-            ready_feedback_df = self.data_manager.filter_ready_rows(feedback_df)
-
-            if ready_feedback_df.empty:
-                logger.warning("No 'Ready' rows found in feedback file")
-                return {'created': 0, 'failed': 0}
-
-            # Load email metadata
-            email_df = self.data_manager.read_from_excel(file_1_2)
-
             # Load student mapping
             student_mapping = self.data_manager.load_student_mapping(mapping_file)
 
-            logger.info(f"Creating drafts for {len(ready_feedback_df)} students")
+            if self.ledger:
+                # Rows with feedback and no draft yet, already joined with their email data
+                rows = self.ledger.pending('draft')
+                failed = 0
+            else:
+                rows, failed = self._join_feedback_with_emails(file_3_4, file_1_2)
 
-            created = 0
-            failed = 0
-
-            for _, feedback_row in ready_feedback_df.iterrows():
-                try:
-                    email_id = feedback_row['email_id']
-                    reply = feedback_row['reply']
-
-                    # Find corresponding email metadata
-                    email_row = email_df[email_df['email_id'] == email_id]
-                    if email_row.empty:
-                        logger.error(f"Email metadata not found for {email_id}")
-                        failed += 1
-                        continue
-
-                    email_row = email_row.iloc[0]
-
-                    # Get data from email metadata
-                    repo_url = email_row['repo_url']
-                    sender_email = email_row['sender_email']
-                    thread_id = email_row['thread_id']
-                    subject = email_row['email_subject']
-
-                    # Get student name from mapping
-                    student_name = student_mapping.get(sender_email.lower(), "Student")
-
-                    # Compose draft
-                    draft_body = self.compose_draft(student_name, reply, repo_url)
-
-                    # Create draft in Gmail
-                    draft_id = self.gmail_service.create_draft(
-                        to=sender_email,
-                        subject=f"Re: {subject}",
-                        body=draft_body,
-                        thread_id=thread_id
-                    )
+            if not rows:
+                logger.warning("No 'Ready' rows left without a draft")
+                return {'created': 0, 'failed': failed}
 
-                    created += 1
-                    logger.info(f"Draft created for {email_id} (draft_id: {draft_id}, name: {student_name})")
+            logger.info(f"Creating drafts for {len(rows)} students")
+            drafts = list(self.iter_drafts(rows, student_mapping))
+            failed += len(rows) - len(drafts)
+            created = 0
 
-                except Exception as e:
-                    logger.error(f"Failed to create draft for {email_id}: {e}")
+            # Rows sharing a thread get that thread's single draft
+            first_in_thread: Dict[str, int] = {}
+            duplicate_of: Dict[int, int] = {}
+            for position, draft in enumerate(drafts):
+                thread_id = draft['thread_id']
+                if thread_id in first_in_thread:
+                    duplicate_of[position] = first_in_thread[thread_id]
+                elif thread_id:
+                    first_in_thread[thread_id] = position
+            if duplicate_of:
+                logger.info(f"{len(duplicate_of)} row(s) share a thread with another row, creating one draft per thread")
+            unique = [position for position in range(len(drafts)) if position not in duplicate_of]
+
+            if settings.gmail_batch_mode:
+                created_ids = self._create_drafts_batched([drafts[position] for position in unique])
+            else:
+                # Gmail quota is shared through the service's rate limiter
+                workers = min(settings.draft_workers, len(unique)) or 1
+                logger.debug(f"Creating drafts with {workers} worker(s)")
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    created_ids = list(executor.map(self.create_draft, [drafts[position] for position in unique]))
+
+            results = [None] * len(drafts)
+            for position, draft_id in zip(unique, created_ids):
+                results[position] = draft_id
+            for position, first in duplicate_of.items():
+                results[position] = results[first]
+
+            for draft, draft_id in zip(drafts, results):
+                if self.ledger:
+                    if isinstance(draft_id, Exception):
+                        self.ledger.record_draft(draft['email_id'], None, draft_id)
+                    else:
+                        self.ledger.record_draft(draft['email_id'], draft_id)
+
+                if isinstance(draft_id, Exception):
+                    logger.error(f"Failed to create draft for {draft['email_id']}: {draft_id}")
                     failed += 1
+                else:
+                    created += 1
+                    logger.info(
+                        f"Draft created for {draft['email_id']} "
+                        f"(draft_id: {draft_id}, name: {draft['student_name']})"
+                    )
 
             logger.info(f"Draft creation complete: {created} created, {failed} failed")
 
@@ -105,6 +127,204 @@ class DraftCreator:
             logger.error(f"Draft creation failed: {e}")
             raise
 
+    def _join_feedback_with_emails(self, file_3_4: str, file_1_2: str) -> Tuple[List[Dict], int]:
+        """
+        Join the Ready feedback rows with their email metadata.
+
+        One hash merge on email_id replaces a scan of the email data per
+        feedback row.
+
+        Args:
+            file_3_4: Path to file_3_4 (feedback data)
+            file_1_2: Path to file_1_2 (email metadata)
+
+        Returns:
+            Tuple of joined rows in feedback order and the number of feedback
+            rows without email metadata
+        """
+        feedback_df = self.data_manager.filter_ready_rows(self.data_manager.read_table(file_3_4))
+        if feedback_df.empty:
+            return [], 0
+
+        email_df = self.data_manager.read_table(file_1_2)
+        email_df = email_df[['email_id'] + self.EMAIL_COLUMNS].drop_duplicates('email_id')
+
+        missing = ~feedback_df['email_id'].isin(email_df['email_id'])
+        for email_id in feedback_df.loc[missing, 'email_id']:
+            logger.error(f"Email metadata not found for {email_id}")
+
+        # Inner merge keeps the order of the feedback rows
+        joined = feedback_df.loc[~missing, ['email_id', 'reply']].merge(email_df, on='email_id', how='inner')
+        return joined.to_dict('records'), int(missing.sum())
+
+    def iter_drafts(self, rows: Iterable[Mapping], student_mapping: Dict[str, str]) -> Iterator[Dict]:
+        """
+        Build draft payloads lazily from joined rows.
+
+        Rows whose draft cannot be built are logged and skipped.
+
+        Args:
+            rows: Rows with 'reply' and the email columns used by build_draft
+            student_mapping: Email address to student name mapping
+
+        Yields:
+            Draft payloads
+        """
+        for row in rows:
+            try:
+                yield self.build_draft(row, row['reply'], student_mapping)
+            except Exception as e:
+                logger.error(f"Failed to prepare draft for {row['email_id']}: {e}")
+
+    def build_draft(self, email_row: Mapping, reply: str, student_mapping: Dict[str, str]) -> Dict:
+        """
+        Build the draft payload for one student.
+
+        Args:
+            email_row: file_1_2 row with 'email_id', 'repo_url', 'sender_email',
+                'thread_id' and 'email_subject'
+            reply: Feedback text
+            student_mapping: Email address to student name mapping
+
+        Returns:
+            Draft payload with 'email_id', 'student_name', 'to', 'subject',
+            'body' and 'thread_id'
+        """
+        # Get data from email metadata
+        repo_url = email_row['repo_url']
+        sender_email = email_row['sender_email']
+        thread_id = email_row['thread_id']
+        subject = email_row['email_subject']
+
+        # Get student name from mapping
+        student_name = student_mapping.get(sender_email.lower(), "Student")
+
+        return {
+            'email_id': email_row['email_id'],
+            'student_name': student_name,
+            'to': sender_email,
+            'subject': f"Re: {subject}",
+            'body': self.compose_draft(student_name, reply, repo_url),
+            'thread_id': thread_id
+        }
+
+    def _create_drafts_batched(self, drafts: List[Dict]) -> List[Union[str, Exception]]:
+        """
+        Create drafts with batch HTTP requests.
+
+        Threads that already hold a draft are not sent. Items failing with a
+        retryable error are retried one by one through create_draft(), which
+        first lists the drafts again in case the batched request landed.
+
+        Args:
+            drafts: Draft payloads, at most one per thread
+
+        Returns:
+            List aligned with drafts holding the draft ID or the exception
+        """
+        results: List[Union[str, Exception, None]] = [
+            self.find_existing_draft(draft['thread_id']) for draft in drafts
+        ]
+        to_send = [position for position, draft_id in enumerate(results) if not draft_id]
+        sent = self.gmail_service.create_drafts_batch(
+            [drafts[position] for position in to_send],
+            batch_size=settings.gmail_batch_size
+        )
+        failed_at = time.monotonic()
+
+        for position, result in zip(to_send, sent):
+            draft = drafts[position]
+            if isinstance(result, Exception) and GmailService.is_retryable_error(result):
+                logger.warning(f"Draft for {draft['email_id']} failed in batch, retrying: {result}")
+                result = self.create_draft(draft, failed_at=failed_at)
+            elif not isinstance(result, Exception):
+                self._remember_draft(draft['thread_id'], result)
+            results[position] = result
+        return results
+
+    def create_draft(self, draft: Dict, failed_at: Optional[float] = None) -> Union[str, Exception]:
+        """
+        Create one draft, returning the error instead of raising.
+
+        Rate limits and transient errors are retried with jittered backoff.
+        Before every attempt the thread is checked for an existing draft, so
+        a retry after a request that did reach Gmail never creates a duplicate.
+        A retry only lists the drafts again when no listing started after its
+        failed attempt, so retries failing together share one listing.
+
+        Args:
+            draft: Draft payload with 'to', 'subject', 'body' and 'thread_id'
+            failed_at: time.monotonic() of an earlier failed attempt made
+                elsewhere (e.g. in a batch), so the first check lists drafts again
+
+        Returns:
+            Draft ID (of the existing draft if the thread already had one),
+            or the exception raised by the Gmail API
+        """
+        thread_id = draft['thread_id']
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                existing = self.find_existing_draft(thread_id, listed_after=failed_at)
+                if existing:
+                    logger.info(f"Draft {existing} already exists in thread {thread_id}, skipping")
+                    return existing
+
+                draft_id = self.gmail_service.create_draft(
+                    to=draft['to'],
+                    subject=draft['subject'],
+                    body=draft['body'],
+                    thread_id=thread_id
+                )
+            except Exception as e:
+                if attempt == self.max_attempts or not GmailService.is_retryable_error(e):
+                    return e
+                failed_at = time.monotonic()
+
+                delay = random.uniform(0, min(self.RETRY_MAX_SECONDS, self.RETRY_BASE_SECONDS * 2 ** attempt))
+                logger.warning(
+                    f"Draft for {draft['email_id']} failed (attempt {attempt}/{self.max_attempts}), "
+                    f"retrying in {delay:.1f}s: {e}"
+                )
+                time.sleep(delay)
+                continue
+
+            self._remember_draft(thread_id, draft_id)
+            return draft_id
+
+    def _remember_draft(self, thread_id: Optional[str], draft_id: str):
+        """Add a draft created here to the listed drafts."""
+        if not thread_id:
+            return
+        with self._drafts_lock:
+            if self._thread_drafts is not None:
+                self._thread_drafts[thread_id] = draft_id
+
+    def find_existing_draft(self, thread_id: Optional[str],
+                            listed_after: Optional[float] = None) -> Optional[str]:
+        """
+        Find a draft already present in a thread.
+
+        The mailbox's drafts are listed once and then kept up to date with
+        the drafts created here.
+
+        Args:
+            thread_id: Thread ID (None for drafts outside a thread)
+            listed_after: time.monotonic() value the listing must not be
+                older than; the drafts are listed again if it is
+
+        Returns:
+            Draft ID, or None if the thread has no draft
+        """
+        if not thread_id:
+            return None
+        with self._drafts_lock:
+            if (self._thread_drafts is None
+                    or (listed_after is not None and self._drafts_listed_at < listed_after)):
+                listed_at = time.monotonic()
+                self._thread_drafts = self.gmail_service.list_thread_drafts()
+                self._drafts_listed_at = listed_at
+            return self._thread_drafts.get(thread_id)
+
     def compose_draft(self, name: str, reply: str, repo_url: str) -> str:
         """
         Compose draft email body.
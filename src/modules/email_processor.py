@@ -1,15 +1,20 @@
 """Email processing module - Step 1."""
 
 import re
+import json
 from datetime import datetime
-from typing import List, Dict, Optional
+from pathlib import Path
+from typing import List, Dict, Optional, Iterable, Tuple
 from email.utils import parsedate_to_datetime
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 from src.services.gmail_service import GmailService
 from src.modules.data_manager import DataManager
+from src.modules.ledger import SubmissionLedger
 from src.utils.hash_utils import generate_email_id, hash_email
 from src.utils.validators import extract_github_url, validate_github_url
 from src.utils.logger import logger
+from config.settings import settings
 
 
 class EmailProcessor:
@@ -20,14 +25,18 @@ class EmailProcessor:
         re.IGNORECASE
     )
 
-    def __init__(self, gmail_service: GmailService):
+    SEARCH_QUERY = 'is:unread subject:"self check of homework"'
+
+    def __init__(self, gmail_service: GmailService, ledger: Optional[SubmissionLedger] = None):
         """
         Initialize email processor.
 
         Args:
             gmail_service: Gmail service instance
+            ledger: Submission ledger recording processed emails
         """
         self.gmail_service = gmail_service
+        self.ledger = ledger
         self.data_manager = DataManager()
 
     def matches_pattern(self, subject: str) -> bool:
@@ -59,89 +68,107 @@ class EmailProcessor:
         # If no brackets, assume it's just the email
         return from_header.strip().lower()
 
-    def process_emails(self, limit: Optional[int] = None) -> Dict:
+    def process_emails(self, limit: Optional[int] = None, max_workers: Optional[int] = None,
+                       batch_mode: Optional[bool] = None, incremental: Optional[bool] = None) -> Dict:
         """
         Search and process emails.
 
+        Message IDs are streamed page by page from the search and fed into a
+        bounded worker pool that fetches message details concurrently. In
+        batch mode each worker fetches a whole chunk of messages with a
+        single batch HTTP request.
+
+        In incremental mode only messages added since the last recorded
+        Gmail history ID are processed. The first incremental run (or a run
+        whose history ID has expired) falls back to the full search.
+
         Args:
             limit: Maximum number of emails to process
+            max_workers: Number of concurrent fetch workers
+                (defaults to settings.gmail_fetch_workers)
+            batch_mode: Fetch messages with batch HTTP requests
+                (defaults to settings.gmail_batch_mode)
+            incremental: Only process messages added since the last sync
+                (defaults to settings.gmail_incremental_sync)
 
         Returns:
             Dictionary with processing results
         """
         try:
-            logger.info(f"Starting email search (limit: {limit or 'unlimited'})")
-
-            # Search for unread emails with "self check of homework" in subject
-            query = 'is:unread subject:"self check of homework"'
-            messages = self.gmail_service.search_emails(query, max_results=limit)
+            max_workers = max_workers or settings.gmail_fetch_workers
+            if batch_mode is None:
+                batch_mode = settings.gmail_batch_mode
+            batch_size = settings.gmail_batch_size if batch_mode else None
+            logger.info(
+                f"Starting email search (limit: {limit or 'unlimited'}, workers: {max_workers}, "
+                f"batch size: {batch_size or 'off'})"
+            )
+
+            if incremental is None:
+                incremental = settings.gmail_incremental_sync
+
+            messages = None
+            latest_history_id = None
+            complete = True
+            truncated = {}
+
+            if incremental:
+                start_history_id = self._load_history_id()
+                history = None
+                if start_history_id:
+                    history = self.gmail_service.list_history_messages(start_history_id)
+
+                if history is not None:
+                    added, latest_history_id = history
+                    messages = [
+                        message for message in added
+                        if 'UNREAD' in message.get('labelIds', [])
+                        and 'DRAFT' not in message.get('labelIds', [])
+                    ]
+                    if limit is not None and len(messages) > limit:
+                        messages = messages[:limit]
+                        complete = False
+                else:
+                    # Record the cursor before searching so nothing added meanwhile is missed
+                    latest_history_id = self.gmail_service.get_history_id()
+
+            if messages is None:
+                # Search for unread emails with "self check of homework" in subject.
+                # One result beyond the limit tells whether the search was cut off.
+                messages = self.gmail_service.iter_messages(
+                    self.SEARCH_QUERY,
+                    max_results=None if limit is None else limit + 1,
+                    page_size=settings.gmail_page_size
+                )
+                if limit is not None:
+                    messages = self._take(messages, limit, truncated)
+
+            found, failed, processed_data = self._process_concurrently(messages, max_workers, batch_size)
+
+            if truncated:
+                complete = False
+
+            if incremental:
+                if failed:
+                    logger.warning(
+                        f"{failed} email(s) could not be fetched, keeping previous history ID so they are retried next run"
+                    )
+                elif complete:
+                    self._save_history_id(latest_history_id)
+                else:
+                    logger.info("Limit reached, keeping previous history ID so remaining emails are synced next run")
 
-            if not messages:
+            if not found:
                 logger.warning("No matching emails found")
                 return {
                     'processed': 0,
                     'data': []
                 }
 
-            processed_data = []
-            for msg_info in messages:
-                try:
-                    # Get full email details
-                    message = self.gmail_service.get_email_details(msg_info['id'])
-                    email_data = self.gmail_service.extract_email_data(message)
-
-                    # Check if subject matches pattern
-                    if not self.matches_pattern(email_data['subject']):
-                        logger.debug(f"Subject doesn't match pattern: {email_data['subject']}")
-                        continue
-
-                    # Extract sender email
-                    sender_email = self.extract_sender_email(email_data['from'])
-
-                    # Parse datetime
-                    try:
-                        email_datetime = parsedate_to_datetime(email_data['date'])
-                    except:
-                        # Fallback to internal date
-                        internal_timestamp = int(email_data['internal_date']) / 1000
-                        email_datetime = datetime.fromtimestamp(internal_timestamp)
-
-                    # Generate email_id
-                    email_id = generate_email_id(
-                        sender_email,
-                        email_data['subject'],
-                        email_datetime.isoformat()
-                    )
-
-                    # Extract GitHub URL from body
-                    repo_url = extract_github_url(email_data['body'])
-
-                    # Validate and prepare data
-                    row_data = {
-                        'email_id': email_id,
-                        'email_datetime': email_datetime.isoformat(),
-                        'email_subject': email_data['subject'],
-                        'repo_url': repo_url if repo_url else None,
-                        'hashed_email_address': hash_email(sender_email),
-                        'sender_email': sender_email,  # Store for draft creation
-                        'thread_id': email_data['thread_id'],  # Store for reply threading
-                        'status': self._determine_status({
-                            'email_id': email_id,
-                            'email_datetime': email_datetime,
-                            'email_subject': email_data['subject'],
-                            'repo_url': repo_url,
-                            'hashed_email_address': hash_email(sender_email)
-                        })
-                    }
-
-                    processed_data.append(row_data)
-                    logger.info(f"Processed: {email_data['subject']} (status: {row_data['status']})")
-
-                except Exception as e:
-                    logger.error(f"Error processing email {msg_info['id']}: {e}")
-                    continue
+            if self.ledger:
+                self.ledger.record_emails(processed_data)
 
-            logger.info(f"Email processing complete: {len(processed_data)} email(s) processed")
+            logger.info(f"Email processing complete: {len(processed_data)} of {found} email(s) processed")
 
             return {
                 'processed': len(processed_data),
@@ -152,6 +179,291 @@ class EmailProcessor:
             logger.error(f"Email processing failed: {e}")
             raise
 
+    @staticmethod
+    def _take(messages: Iterable[Dict], limit: int, truncated: Dict) -> Iterable[Dict]:
+        """
+        Lazily yield at most limit messages.
+
+        Args:
+            messages: Search results
+            limit: Maximum number of messages to yield
+            truncated: Set to {'truncated': True} if more messages were left
+
+        Yields:
+            Message dictionaries
+        """
+        for count, message in enumerate(messages):
+            if count >= limit:
+                truncated['truncated'] = True
+                return
+            yield message
+
+    def _load_history_id(self) -> Optional[str]:
+        """
+        Load the history ID recorded by the last incremental sync.
+
+        Returns:
+            History ID, or None if no sync state exists
+        """
+        state_path = Path(settings.gmail_sync_state_file)
+        if not state_path.exists():
+            return None
+
+        try:
+            with open(state_path, 'r', encoding='utf-8') as f:
+                return json.load(f).get('history_id')
+        except Exception as e:
+            logger.warning(f"Failed to load sync state {state_path}: {e}")
+            return None
+
+    def _save_history_id(self, history_id: Optional[str]):
+        """
+        Record the history ID for the next incremental sync.
+
+        Args:
+            history_id: Latest mailbox history ID
+        """
+        if not history_id:
+            return
+
+        state_path = Path(settings.gmail_sync_state_file)
+        state_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(state_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'history_id': history_id,
+                'synced_at': datetime.now().isoformat()
+            }, f)
+        logger.debug(f"Saved history ID {history_id}")
+
+    def _process_concurrently(self, messages: Iterable[Dict], max_workers: int,
+                              batch_size: Optional[int] = None) -> Tuple[int, int, List[Dict]]:
+        """
+        Fetch and parse messages with a bounded worker pool.
+
+        At most ``max_workers * 2`` work items are in flight at any time, so
+        the search keeps paging while earlier messages are being downloaded.
+        A work item is a single message, or a chunk of ``batch_size``
+        messages when batch mode is enabled.
+
+        Args:
+            messages: Iterable of message dictionaries from the search
+            max_workers: Number of concurrent fetch workers
+            batch_size: Messages per batch request (None disables batching)
+
+        Returns:
+            Tuple of (messages found, messages that failed, processed rows
+            in search order)
+        """
+        results = {}
+        in_flight = {}
+        found = 0
+        failed = 0
+
+        def collect(done):
+            nonlocal failed
+            for future in done:
+                index, message_ids = in_flight.pop(future)
+                try:
+                    rows = future.result()
+                    for offset, row_data in enumerate(rows):
+                        if isinstance(row_data, Exception):
+                            failed += 1
+                        elif row_data is not None:
+                            results[(index, offset)] = row_data
+                except Exception as e:
+                    logger.error(f"Error processing email(s) {', '.join(message_ids)}: {e}")
+                    failed += len(message_ids)
+
+        def submit(executor, index, message_ids):
+            if len(in_flight) >= max_workers * 2:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
+
+            worker = self._process_message_batch if batch_size else self._process_message_list
+            future = executor.submit(worker, message_ids)
+            in_flight[future] = (index, message_ids)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            chunk = []
+            for msg_info in messages:
+                found += 1
+                chunk.append(msg_info['id'])
+                if len(chunk) >= (batch_size or 1):
+                    submit(executor, found, chunk)
+                    chunk = []
+            if chunk:
+                submit(executor, found, chunk)
+
+        # Executor shutdown waits for the remaining fetches
+        collect(list(in_flight))
+
+        return found, failed, [results[key] for key in sorted(results)]
+
+    def _process_message_list(self, message_ids: List[str]) -> List[Optional[Dict]]:
+        """
+        Fetch and parse emails one request at a time.
+
+        Args:
+            message_ids: Gmail message IDs
+
+        Returns:
+            List aligned with message_ids holding row data or None
+        """
+        return [self.process_message(message_id) for message_id in message_ids]
+
+    def _process_message_batch(self, message_ids: List[str]) -> List[Optional[Dict]]:
+        """
+        Fetch and parse a chunk of emails with batch HTTP requests.
+
+        With metadata-first fetching, one batch downloads the headers of
+        the whole chunk and a second batch downloads bodies only for the
+        emails whose subject matches.
+
+        Args:
+            message_ids: Gmail message IDs
+
+        Returns:
+            List aligned with message_ids holding row data, the exception
+            of messages that failed, or None for messages that don't match
+            the subject pattern
+        """
+        if settings.gmail_metadata_first:
+            messages = self.gmail_service.get_email_metadata_batch(message_ids, batch_size=len(message_ids))
+        else:
+            messages = self.gmail_service.get_email_details_batch(message_ids, batch_size=len(message_ids))
+
+        rows = [None] * len(message_ids)
+        candidates = {}
+        for index, (message_id, message) in enumerate(zip(message_ids, messages)):
+            if isinstance(message, Exception):
+                logger.error(f"Error processing email {message_id}: {message}")
+                rows[index] = message
+                continue
+            try:
+                email_data = self.gmail_service.extract_email_data(message)
+                if self._is_homework_email(email_data):
+                    candidates[index] = email_data
+            except Exception as e:
+                logger.error(f"Error processing email {message_id}: {e}")
+                rows[index] = e
+
+        if settings.gmail_metadata_first and candidates:
+            bodies = self.gmail_service.get_email_body_batch(
+                [message_ids[index] for index in candidates],
+                batch_size=len(candidates)
+            )
+            for index, body in zip(list(candidates), bodies):
+                if isinstance(body, Exception):
+                    logger.error(f"Error processing email {message_ids[index]}: {body}")
+                    rows[index] = body
+                    del candidates[index]
+                else:
+                    candidates[index]['body'] = body
+
+        for index, email_data in candidates.items():
+            try:
+                rows[index] = self._build_row(email_data)
+            except Exception as e:
+                logger.error(f"Error processing email {message_ids[index]}: {e}")
+                rows[index] = e
+        return rows
+
+    def process_message(self, message_id: str) -> Optional[Dict]:
+        """
+        Fetch and parse a single email.
+
+        With metadata-first fetching the headers are checked against
+        SUBJECT_PATTERN before the body is downloaded.
+
+        Args:
+            message_id: Gmail message ID
+
+        Returns:
+            Row data dictionary, or None if the subject doesn't match
+        """
+        if settings.gmail_metadata_first:
+            message = self.gmail_service.get_email_metadata(message_id)
+        else:
+            # Get full email details
+            message = self.gmail_service.get_email_details(message_id)
+
+        email_data = self.gmail_service.extract_email_data(message)
+        if not self._is_homework_email(email_data):
+            return None
+
+        if settings.gmail_metadata_first:
+            email_data['body'] = self.gmail_service.get_email_body(message_id)
+
+        return self._build_row(email_data)
+
+    def _is_homework_email(self, email_data: Dict) -> bool:
+        """
+        Check whether extracted email data is a homework submission.
+
+        Args:
+            email_data: Dictionary returned by GmailService.extract_email_data
+
+        Returns:
+            True if the subject matches the pattern
+        """
+        # Check if subject matches pattern
+        if not self.matches_pattern(email_data['subject']):
+            logger.debug(f"Subject doesn't match pattern: {email_data['subject']}")
+            return False
+        return True
+
+    def _build_row(self, email_data: Dict) -> Dict:
+        """
+        Build a file_1_2 row from extracted email data.
+
+        Args:
+            email_data: Dictionary returned by GmailService.extract_email_data
+
+        Returns:
+            Row data dictionary
+        """
+        # Extract sender email
+        sender_email = self.extract_sender_email(email_data['from'])
+
+        # Parse datetime
+        try:
+            email_datetime = parsedate_to_datetime(email_data['date'])
+        except:
+            # Fallback to internal date
+            internal_timestamp = int(email_data['internal_date']) / 1000
+            email_datetime = datetime.fromtimestamp(internal_timestamp)
+
+        # Generate email_id
+        email_id = generate_email_id(
+            sender_email,
+            email_data['subject'],
+            email_datetime.isoformat()
+        )
+
+        # Extract GitHub URL from body
+        repo_url = extract_github_url(email_data['body'])
+
+        # Validate and prepare data
+        row_data = {
+            'email_id': email_id,
+            'email_datetime': email_datetime.isoformat(),
+            'email_subject': email_data['subject'],
+            'repo_url': repo_url if repo_url else None,
+            'hashed_email_address': hash_email(sender_email),
+            'sender_email': sender_email,  # Store for draft creation
+            'thread_id': email_data['thread_id'],  # Store for reply threading
+            'status': self._determine_status({
+                'email_id': email_id,
+                'email_datetime': email_datetime,
+                'email_subject': email_data['subject'],
+                'repo_url': repo_url,
+                'hashed_email_address': hash_email(sender_email)
+            })
+        }
+
+        logger.info(f"Processed: {email_data['subject']} (status: {row_data['status']})")
+        return row_data
+
     def _determine_status(self, data: Dict) -> str:
         """
         Determine row status based on field completeness.
@@ -179,18 +491,18 @@ class EmailProcessor:
             return f"Missing: {', '.join(missing)}"
         return "Ready"
 
-    def save_to_excel(self, data: List[Dict], output_path: str):
+    def save_results(self, data: List[Dict], output_path: str):
         """
-        Save processed email data to Excel.
+        Save processed email data for the next steps.
 
         Args:
             data: List of email data dictionaries
             output_path: Output file path
         """
         # Keep all fields including sender_email and thread_id for later steps
-        excel_data = []
+        rows = []
         for row in data:
-            excel_row = {
+            rows.append({
                 'email_id': row['email_id'],
                 'email_datetime': row['email_datetime'],
                 'email_subject': row['email_subject'],
@@ -199,7 +511,6 @@ class EmailProcessor:
                 'hashed_email_address': row['hashed_email_address'],
                 'sender_email': row['sender_email'],
                 'thread_id': row['thread_id']
-            }
-            excel_data.append(excel_row)
+            })
 
-        self.data_manager.write_to_excel(excel_data, output_path)
+        self.data_manager.write_table(rows, output_path)
@@ -0,0 +1,235 @@
+"""Persistent cache of generated feedback texts."""
+
+import re
+import time
+import random
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+from src.utils.logger import logger
+
+
+class FeedbackCache:
+    """
+    SQLite cache mapping a prompt hash to a pool of generated feedback texts.
+
+    Each key holds up to pool_size distinct generations. A lookup only hits
+    once the pool is full and then returns a random member, so students
+    sharing a prompt still get varied feedback. Texts are stored with the
+    grade replaced by a placeholder, which lets a bucket of nearby grades
+    share one pool. Texts that mention the grade in any other form are not
+    cached. Entries expire after ttl_seconds (expired rows are purged on
+    open and every PURGE_INTERVAL_SECONDS) and the least recently used ones
+    are evicted beyond max_entries.
+    """
+
+    GRADE_PLACEHOLDER = "{{GRADE}}"
+
+    # Minimum time between purges of expired rows
+    PURGE_INTERVAL_SECONDS = 300
+
+    def __init__(self, db_path: str, pool_size: int = 1, ttl_seconds: float = 0,
+                 max_entries: int = 0):
+        """
+        Initialize feedback cache.
+
+        Args:
+            db_path: Path to the SQLite database file
+            pool_size: Distinct texts generated per key before reusing them
+            ttl_seconds: Age after which texts expire (0 for no expiry)
+            max_entries: Maximum stored texts (0 for no limit)
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.pool_size = max(1, pool_size)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS feedback (
+                cache_key TEXT NOT NULL,
+                variant INTEGER NOT NULL,
+                template TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (cache_key, variant)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS feedback_last_used ON feedback (last_used)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS feedback_created_at ON feedback (created_at)")
+        self._conn.commit()
+
+        self._last_purge = 0.0
+        with self._lock:
+            self._purge_expired(time.time())
+
+    @staticmethod
+    def make_key(prompt: str) -> str:
+        """
+        Hash a prompt into a cache key.
+
+        Args:
+            prompt: Prompt text
+
+        Returns:
+            Hex digest of the prompt
+        """
+        return hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+    def get(self, key: str, grade: float) -> Optional[str]:
+        """
+        Look up a feedback text.
+
+        Args:
+            key: Cache key
+            grade: Grade to fill into the cached text
+
+        Returns:
+            Feedback text, or None until the key's pool is full
+        """
+        with self._lock:
+            now = time.time()
+            if now - self._last_purge >= self.PURGE_INTERVAL_SECONDS:
+                self._purge_expired(now)
+
+            # Rows expired since the last purge are ignored
+            oldest = now - self.ttl_seconds if self.ttl_seconds else 0
+            rows = self._conn.execute(
+                "SELECT variant, template FROM feedback WHERE cache_key = ? AND created_at >= ?",
+                (key, oldest)
+            ).fetchall()
+
+            if len(rows) < self.pool_size:
+                self.misses += 1
+                self._conn.commit()
+                return None
+
+            variant, template = random.choice(rows)
+            self._conn.execute(
+                "UPDATE feedback SET last_used = ? WHERE cache_key = ? AND variant = ?",
+                (now, key, variant)
+            )
+            self._conn.commit()
+            self.hits += 1
+
+        logger.debug(f"Feedback cache hit: {key[:12]} (variant {variant})")
+        return template.replace(self.GRADE_PLACEHOLDER, f"{grade:.1f}")
+
+    def put(self, key: str, grade: float, text: str):
+        """
+        Add a generated text to the key's pool.
+
+        Args:
+            key: Cache key
+            grade: Grade the text was generated for
+            text: Feedback text
+        """
+        template = self._to_template(text, grade)
+        if self._mentions_grade(template, grade):
+            # e.g. "57.3 percent" would be served unchanged for other grades
+            logger.debug(f"Not caching feedback for {key[:12]}: grade mentioned outside a percentage")
+            return
+
+        with self._lock:
+            now = time.time()
+            if self.ttl_seconds:
+                # Expired rows not purged yet must not fill the pool, since get() ignores them
+                self._conn.execute(
+                    "DELETE FROM feedback WHERE cache_key = ? AND created_at < ?",
+                    (key, now - self.ttl_seconds)
+                )
+            rows = self._conn.execute(
+                "SELECT variant, template FROM feedback WHERE cache_key = ?", (key,)
+            ).fetchall()
+            if len(rows) >= self.pool_size or any(row[1] == template for row in rows):
+                self._conn.commit()
+                return
+
+            variant = max((row[0] for row in rows), default=-1) + 1
+            self._conn.execute(
+                "INSERT INTO feedback (cache_key, variant, template, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, variant, template, now, now)
+            )
+
+            if self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM feedback WHERE rowid IN ("
+                    "SELECT rowid FROM feedback ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+            self._conn.commit()
+
+    def _to_template(self, text: str, grade: float) -> str:
+        """
+        Replace mentions of the grade with the placeholder.
+
+        Args:
+            text: Feedback text
+            grade: Grade the text was generated for
+
+        Returns:
+            Text with '<grade>%' mentions replaced
+        """
+        pattern = r'(?<![\d.])(?:' + self._grade_forms(grade) + r')(?=\s*%)'
+        return re.sub(pattern, self.GRADE_PLACEHOLDER, text)
+
+    @staticmethod
+    def _grade_forms(grade: float) -> str:
+        """Build a regex alternation of the ways a grade is written."""
+        forms = {f"{grade:.2f}", f"{grade:.1f}", f"{grade:.0f}", f"{grade:g}"}
+        # Longest first, so '57.3' is matched before '57'
+        return '|'.join(re.escape(form) for form in sorted(forms, key=len, reverse=True))
+
+    def _mentions_grade(self, template: str, grade: float) -> bool:
+        """
+        Check whether a template still contains the grade as a number.
+
+        Args:
+            template: Text returned by _to_template
+            grade: Grade the text was generated for
+
+        Returns:
+            True if the grade appears outside the placeholder
+        """
+        pattern = r'(?<![\d.])(?:' + self._grade_forms(grade) + r')(?!\d|\.\d)'
+        return re.search(pattern, template) is not None
+
+    def _purge_expired(self, now: float):
+        """Delete expired rows (lock held)."""
+        self._last_purge = now
+        if not self.ttl_seconds:
+            return
+        deleted = self._conn.execute(
+            "DELETE FROM feedback WHERE created_at < ?", (now - self.ttl_seconds,)
+        ).rowcount
+        self._conn.commit()
+        if deleted:
+            logger.debug(f"Purged {deleted} expired feedback text(s)")
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Get hit/miss metrics of this session.
+
+        Returns:
+            Dictionary with 'hits', 'misses' and 'hit_rate'
+        """
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
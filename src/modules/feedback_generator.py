@@ -1,10 +1,15 @@
 """Feedback generation module - Step 3."""
 
-import time
-from typing import List, Dict
+import math
+from typing import List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
 
-from src.services.gemini_service import GeminiService, RateLimiter
+from src.services.gemini_service import GeminiService
 from src.modules.data_manager import DataManager
+from src.modules.feedback_cache import FeedbackCache
+from src.modules.ledger import SubmissionLedger
+from src.utils.checkpoint import CheckpointJournal
+from src.utils.rate_limiter import RateLimiter
 from src.utils.logger import logger
 from config.settings import settings
 
@@ -12,96 +17,135 @@ from config.settings import settings
 class FeedbackGenerator:
     """Handles AI-powered feedback generation - Step 3."""
 
-    def __init__(self, gemini_service: GeminiService):
+    def __init__(self, gemini_service: GeminiService, rate_limiter: Optional[RateLimiter] = None,
+                 ledger: Optional[SubmissionLedger] = None):
         """
         Initialize feedback generator.
 
         Args:
             gemini_service: Gemini service instance
+            rate_limiter: Shared limiter for request quotas beyond the per-minute
+                rate (e.g. requests per day)
+            ledger: Submission ledger; when set, pending rows are read from it
+                instead of the input file
         """
         self.gemini_service = gemini_service
+        self.rate_limiter = rate_limiter
+        self.ledger = ledger
         self.data_manager = DataManager()
-        self.rate_limiter = RateLimiter(max_calls=60, time_window=60)
+
+        self.feedback_cache = None
+        if settings.feedback_cache_enabled:
+            self.feedback_cache = FeedbackCache(
+                settings.feedback_cache_file,
+                pool_size=settings.feedback_cache_pool_size,
+                ttl_seconds=settings.feedback_cache_ttl_hours * 3600,
+                max_entries=settings.feedback_cache_max_entries
+            )
 
     def generate_all_feedback(self, input_file: str, output_file: str):
         """
         Generate feedback for all students.
 
         Args:
-            input_file: Path to file_2_3.xlsx
-            output_file: Path to file_3_4.xlsx
+            input_file: Path to file_2_3
+            output_file: Path to file_3_4
         """
         try:
             logger.info("Starting feedback generation")
 
-            # Read input file
-            df = self.data_manager.read_from_excel(input_file)
+            # Results journaled by an interrupted run are not generated again
+            journal = None
+            completed: Dict[str, Dict] = {}
+            if settings.checkpoint_enabled:
+                journal = CheckpointJournal(
+                    settings.get_checkpoint_path('feedback'),
+                    compact_every=settings.checkpoint_compact_every
+                )
+                completed = journal.load(status='Ready')
+                if completed:
+                    logger.info(f"Resuming: {len(completed)} students already have feedback")
+                    if self.ledger:
+                        self.ledger.record_feedback(completed.values())
+
+            if self.ledger:
+                # Graded students without feedback yet
+                students = self.ledger.pending('feedback')
+            else:
+                # Read input file
+                df = self.data_manager.read_table(input_file)
+
+                # Filter rows with status='Ready'
+                students = self.data_manager.filter_ready_rows(df).to_dict('records')
 
-            # Filter rows with status='Ready'
-            ready_df = self.data_manager.filter_ready_rows(df)
+            remaining = [student for student in students if student['email_id'] not in completed]
 
-            if ready_df.empty:
-                logger.warning("No 'Ready' rows found in input file")
-                self.data_manager.write_to_excel([], output_file)
+            if not remaining:
+                logger.warning("No 'Ready' rows left for feedback")
+                if self.ledger:
+                    self.data_manager.write_table(self.ledger.step_rows('feedback'), output_file)
+                else:
+                    self.data_manager.write_table(
+                        [completed[student['email_id']] for student in students], output_file
+                    )
+                if journal:
+                    journal.remove()
                 return {'generated': 0, 'failed': 0}
 
-            students = ready_df.to_dict('records')
-            logger.info(f"Generating feedback for {len(students)} students")
-
-            results = []
-            successful = 0
-            failed = 0
-
-            for student in students:
-                try:
-                    # Rate limiting
-                    self.rate_limiter.wait_if_needed()
-                    time.sleep(settings.gemini_request_delay)
-
-                    # Determine style based on grade
-                    grade = float(student['grade'])
-                    style = self.get_style(grade)
-
-                    logger.debug(f"Generating feedback for {student['email_id']} (grade: {grade}, style: {style})")
-
-                    # Generate feedback
-                    reply = self.gemini_service.generate_feedback(grade, style)
-
-                    # Check if feedback was generated successfully
-                    if reply and len(reply) >= 50:
-                        results.append({
-                            'email_id': student['email_id'],
-                            'reply': reply,
-                            'status': 'Ready'
-                        })
-                        successful += 1
-                        logger.info(f"Feedback generated for {student['email_id']}")
-                    else:
-                        if reply:
-                            logger.warning(f"Feedback too short ({len(reply)} chars) for {student['email_id']}")
-                        else:
-                            logger.warning(f"No feedback generated for {student['email_id']}")
-
-                        results.append({
-                            'email_id': student['email_id'],
-                            'reply': None,
-                            'status': 'Missing: reply'
-                        })
-                        failed += 1
-
-                except Exception as e:
-                    logger.error(f"Failed to generate feedback for {student['email_id']}: {e}")
-                    failed += 1
-                    results.append({
-                        'email_id': student['email_id'],
-                        'reply': None,
-                        'status': 'Missing: reply'
-                    })
+            batch_size = settings.gemini_batch_size
+            batches = [remaining[i:i + batch_size] for i in range(0, len(remaining), batch_size)]
+            max_workers = min(settings.gemini_max_workers, len(batches))
+            logger.info(
+                f"Generating feedback for {len(remaining)} students in {len(batches)} request(s) "
+                f"(workers: {max_workers})"
+            )
+
+            def generate_batch(batch: List[Dict]) -> List[Dict]:
+                batch_results = self.generate_for_batch(batch)
+                if journal:
+                    journal.append(batch_results)
+                return batch_results
+
+            # Generate concurrently; results keep the input order
+            executor = ThreadPoolExecutor(max_workers=max_workers)
+            try:
+                generated = {
+                    result['email_id']: result
+                    for batch_results in executor.map(generate_batch, batches)
+                    for result in batch_results
+                }
+            except BaseException:
+                # Ctrl-C: stop queued batches, the journal keeps finished ones
+                executor.shutdown(wait=True, cancel_futures=True)
+                raise
+            executor.shutdown()
+
+            results = list(generated.values())
+
+            successful = sum(1 for result in results if result['status'] == 'Ready')
+            failed = len(results) - successful
 
             # Save results
-            self.data_manager.write_to_excel(results, output_file)
+            if self.ledger:
+                self.ledger.record_feedback(results)
+                self.data_manager.write_table(self.ledger.step_rows('feedback'), output_file)
+            else:
+                self.data_manager.write_table(
+                    [completed.get(student['email_id']) or generated[student['email_id']] for student in students],
+                    output_file
+                )
+            if journal:
+                journal.remove()
 
             logger.info(f"Feedback generation complete: {successful} generated, {failed} failed")
+            if self.gemini_service.rate_controller:
+                logger.info(f"Gemini rate settled at {self.gemini_service.rate_controller.describe()}")
+            if self.feedback_cache:
+                stats = self.feedback_cache.stats()
+                logger.info(
+                    f"Feedback cache: {stats['hits']} hits, {stats['misses']} misses "
+                    f"({stats['hit_rate']:.0%} hit rate)"
+                )
 
             return {
                 'generated': successful,
@@ -112,6 +156,169 @@ class FeedbackGenerator:
             logger.error(f"Feedback generation failed: {e}")
             raise
 
+    def generate_for_student(self, student: Dict) -> Dict:
+        """
+        Generate feedback for one student.
+
+        Rate limiting and retries on quota errors are handled by GeminiService.
+
+        Args:
+            student: Row with 'email_id' and 'grade'
+
+        Returns:
+            Result row with 'email_id', 'reply' and 'status'
+        """
+        try:
+            # Determine style based on grade
+            grade = float(student['grade'])
+            style = self.get_style(grade)
+
+            rate_controller = self.gemini_service.rate_controller
+            rate_info = f", rate: {rate_controller.current_rate:.1f}/min" if rate_controller else ""
+            cached = self._get_cached_reply(grade, style)
+            if cached:
+                return self._build_result(student, cached)
+
+            logger.debug(f"Generating feedback for {student['email_id']} (grade: {grade}, style: {style}{rate_info})")
+
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+
+            # Generate feedback
+            reply = self.gemini_service.generate_feedback(grade, style)
+            self._cache_reply(grade, style, reply)
+            return self._build_result(student, reply)
+
+        except Exception as e:
+            logger.error(f"Failed to generate feedback for {student['email_id']}: {e}")
+            return self._build_result(student, None)
+
+    def generate_for_batch(self, students: List[Dict]) -> List[Dict]:
+        """
+        Generate feedback for several students with one Gemini request.
+
+        Args:
+            students: Rows with 'email_id' and 'grade'
+
+        Returns:
+            Result rows aligned with students
+        """
+        try:
+            results: List[Optional[Dict]] = [None] * len(students)
+            pending = []
+            items = []
+            for index, student in enumerate(students):
+                grade = float(student['grade'])
+                style = self.get_style(grade)
+                cached = self._get_cached_reply(grade, style)
+                if cached:
+                    results[index] = self._build_result(student, cached)
+                else:
+                    pending.append(index)
+                    items.append((grade, style))
+
+            if items:
+                logger.debug(f"Generating feedback for {len(items)} students in one request")
+
+                if self.rate_limiter:
+                    self.rate_limiter.acquire()
+
+                replies = self.gemini_service.generate_feedback_batch(items)
+                for index, (grade, style), reply in zip(pending, items, replies):
+                    if reply is None and len(items) > 1:
+                        # Generate the item on its own; every extra request counts against the quotas
+                        logger.debug(f"Generating feedback for {students[index]['email_id']} individually")
+                        if self.rate_limiter:
+                            self.rate_limiter.acquire()
+                        reply = self.gemini_service.generate_feedback(grade, style)
+                    self._cache_reply(grade, style, reply)
+                    results[index] = self._build_result(students[index], reply)
+
+            return results
+
+        except Exception as e:
+            logger.error(f"Failed to generate feedback batch: {e}")
+            return [self._build_result(student, None) for student in students]
+
+    def _cache_key(self, grade: float, style: str) -> str:
+        """
+        Get the feedback cache key for a grade and style.
+
+        With a bucket width configured, all grades in the same bucket share
+        the key of the bucket's lower bound.
+
+        Args:
+            grade: Student grade
+            style: Feedback style
+
+        Returns:
+            Cache key
+        """
+        width = settings.feedback_cache_bucket_width
+        if not width:
+            return self.feedback_cache.make_key(self.gemini_service.get_prompt(grade, style))
+
+        bucket = math.floor(grade / width) * width
+        return self.feedback_cache.make_key(f"bucket:{width}\n{self.gemini_service.get_prompt(bucket, style)}")
+
+    def _get_cached_reply(self, grade: float, style: str) -> Optional[str]:
+        """
+        Look up cached feedback for a grade and style.
+
+        Args:
+            grade: Student grade
+            style: Feedback style
+
+        Returns:
+            Cached feedback text, or None on a miss or with the cache disabled
+        """
+        if not self.feedback_cache:
+            return None
+        return self.feedback_cache.get(self._cache_key(grade, style), grade)
+
+    def _cache_reply(self, grade: float, style: str, reply: Optional[str]):
+        """
+        Store generated feedback if it passes validation.
+
+        Args:
+            grade: Student grade
+            style: Feedback style
+            reply: Generated feedback text, or None
+        """
+        if self.feedback_cache and reply and len(reply) >= 50:
+            self.feedback_cache.put(self._cache_key(grade, style), grade, reply)
+
+    def _build_result(self, student: Dict, reply: Optional[str]) -> Dict:
+        """
+        Build the output row for a student, validating the reply.
+
+        Args:
+            student: Row with 'email_id'
+            reply: Generated feedback text, or None
+
+        Returns:
+            Result row with 'email_id', 'reply' and 'status'
+        """
+        # Check if feedback was generated successfully
+        if reply and len(reply) >= 50:
+            logger.info(f"Feedback generated for {student['email_id']}")
+            return {
+                'email_id': student['email_id'],
+                'reply': reply,
+                'status': 'Ready'
+            }
+
+        if reply:
+            logger.warning(f"Feedback too short ({len(reply)} chars) for {student['email_id']}")
+        else:
+            logger.warning(f"No feedback generated for {student['email_id']}")
+
+        return {
+            'email_id': student['email_id'],
+            'reply': None,
+            'status': 'Missing: reply'
+        }
+
     def get_style(self, grade: float) -> str:
         """
         Determine feedback style based on grade.
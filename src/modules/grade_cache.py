@@ -0,0 +1,96 @@
+"""Persistent cache of repository grades."""
+
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+from src.utils.logger import logger
+
+
+class GradeCache:
+    """
+    SQLite cache mapping (repo_url, commit SHA, rule version) to a grade.
+
+    A commit's content never changes, so a grade computed once under the
+    same grading rules can be reused on every rerun of Step 2.
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Initialize grade cache.
+
+        Args:
+            db_path: Path to the SQLite database file
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS grades (
+                repo_url TEXT NOT NULL,
+                commit_sha TEXT NOT NULL,
+                rule_version TEXT NOT NULL,
+                grade REAL NOT NULL,
+                file_counts TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                PRIMARY KEY (repo_url, commit_sha, rule_version)
+            )
+        """)
+        self._conn.commit()
+
+    def get(self, repo_url: str, commit_sha: str, rule_version: str) -> Optional[Dict]:
+        """
+        Look up a cached grade.
+
+        Args:
+            repo_url: Repository URL
+            commit_sha: Commit the grade was computed for
+            rule_version: Grading rule version
+
+        Returns:
+            Dictionary with 'grade' and 'file_counts', or None on a miss
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT grade, file_counts FROM grades "
+                "WHERE repo_url = ? AND commit_sha = ? AND rule_version = ?",
+                (repo_url, commit_sha, rule_version)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        logger.debug(f"Grade cache hit: {repo_url} @ {commit_sha[:12]}")
+        return {'grade': row[0], 'file_counts': json.loads(row[1])}
+
+    def put(self, repo_url: str, commit_sha: str, rule_version: str,
+            grade: float, file_counts: Dict[str, int]):
+        """
+        Store a computed grade.
+
+        Args:
+            repo_url: Repository URL
+            commit_sha: Commit the grade was computed for
+            rule_version: Grading rule version
+            grade: Calculated grade
+            file_counts: Line count per Python file path
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO grades "
+                "(repo_url, commit_sha, rule_version, grade, file_counts, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (repo_url, commit_sha, rule_version, grade,
+                 json.dumps(file_counts), datetime.now().isoformat())
+            )
+            self._conn.commit()
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,221 @@
+"""Transactional ledger of submission states across all steps."""
+
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from src.utils.logger import logger
+
+
+class SubmissionLedger:
+    """
+    SQLite ledger keyed by email_id recording each submission's state per step.
+
+    Every step reads the rows that are ready for it but not yet done with an
+    indexed query, and records its results in one transaction. Reruns
+    therefore only process what is left: a crash in Step 3 does not require
+    redoing Steps 1-2, and drafts already created are never created twice.
+    The database runs in WAL mode so readers never block the writer.
+    """
+
+    EMAIL_COLUMNS = [
+        'email_datetime', 'email_subject', 'repo_url',
+        'hashed_email_address', 'sender_email', 'thread_id'
+    ]
+
+    # Step -> SQL condition selecting its pending rows
+    PENDING_CONDITIONS = {
+        'grade': "email_status = 'Ready' AND (grade_status IS NULL OR grade_status != 'Ready')",
+        'feedback': "grade_status = 'Ready' AND (feedback_status IS NULL OR feedback_status != 'Ready')",
+        'draft': "feedback_status = 'Ready' AND (draft_status IS NULL OR draft_status != 'Created')",
+    }
+
+    def __init__(self, db_path: str):
+        """
+        Initialize submission ledger.
+
+        Args:
+            db_path: Path to the SQLite database file
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS submissions (
+                email_id TEXT PRIMARY KEY,
+                email_datetime TEXT,
+                email_subject TEXT,
+                repo_url TEXT,
+                hashed_email_address TEXT,
+                sender_email TEXT,
+                thread_id TEXT,
+                email_status TEXT NOT NULL,
+                grade REAL,
+                grade_status TEXT,
+                reply TEXT,
+                feedback_status TEXT,
+                draft_id TEXT,
+                draft_status TEXT,
+                updated_at TEXT NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_grade_pending ON submissions (email_status, grade_status)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_feedback_pending ON submissions (grade_status, feedback_status)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_draft_pending ON submissions (feedback_status, draft_status)")
+        self._conn.commit()
+
+    def record_emails(self, rows: Iterable[Dict]):
+        """
+        Record Step 1 results.
+
+        Emails seen before keep the state of their later steps.
+
+        Args:
+            rows: Email rows with 'email_id', 'status' and EMAIL_COLUMNS
+        """
+        now = datetime.now().isoformat()
+        columns = ', '.join(self.EMAIL_COLUMNS)
+        placeholders = ', '.join('?' for _ in self.EMAIL_COLUMNS)
+        updates = ', '.join(f"{column} = excluded.{column}" for column in self.EMAIL_COLUMNS)
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT INTO submissions (email_id, {columns}, email_status, updated_at) "
+                f"VALUES (?, {placeholders}, ?, ?) "
+                f"ON CONFLICT (email_id) DO UPDATE SET {updates}, "
+                f"email_status = excluded.email_status, updated_at = excluded.updated_at",
+                [
+                    (row['email_id'], *(row.get(column) for column in self.EMAIL_COLUMNS), row['status'], now)
+                    for row in rows
+                ]
+            )
+
+    def record_grades(self, results: Iterable[Dict]):
+        """
+        Record Step 2 results.
+
+        Args:
+            results: Rows with 'email_id', 'grade' and 'status'
+        """
+        self._update(
+            "UPDATE submissions SET grade = ?, grade_status = ?, updated_at = ? WHERE email_id = ?",
+            [(result['grade'], result['status']) + (result['email_id'],) for result in results]
+        )
+
+    def record_feedback(self, results: Iterable[Dict]):
+        """
+        Record Step 3 results.
+
+        Args:
+            results: Rows with 'email_id', 'reply' and 'status'
+        """
+        self._update(
+            "UPDATE submissions SET reply = ?, feedback_status = ?, updated_at = ? WHERE email_id = ?",
+            [(result['reply'], result['status']) + (result['email_id'],) for result in results]
+        )
+
+    def record_draft(self, email_id: str, draft_id: Optional[str], error: Optional[Exception] = None):
+        """
+        Record a Step 4 result.
+
+        Args:
+            email_id: Email ID
+            draft_id: Created draft ID (None if creation failed)
+            error: Error raised when creating the draft
+        """
+        status = 'Created' if error is None else f"Failed: {error}"
+        self._update(
+            "UPDATE submissions SET draft_id = ?, draft_status = ?, updated_at = ? WHERE email_id = ?",
+            [(draft_id, status, email_id)]
+        )
+
+    def _update(self, sql: str, params: List[tuple]):
+        """
+        Run an UPDATE for several rows in one transaction.
+
+        Args:
+            sql: Statement whose last two parameters are updated_at and email_id
+            params: Parameters per row without updated_at
+        """
+        now = datetime.now().isoformat()
+        with self._lock, self._conn:
+            self._conn.executemany(sql, [values[:-1] + (now, values[-1]) for values in params])
+
+    def pending(self, step: str) -> List[Dict]:
+        """
+        Get the rows a step still has to process.
+
+        Args:
+            step: 'grade', 'feedback' or 'draft'
+
+        Returns:
+            Full submission rows in insertion order
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM submissions WHERE {self.PENDING_CONDITIONS[step]} ORDER BY rowid"
+            ).fetchall()
+        logger.debug(f"Ledger: {len(rows)} row(s) pending for {step}")
+        return [dict(row) for row in rows]
+
+    def get(self, email_id: str) -> Optional[Dict]:
+        """
+        Get the recorded state of one submission.
+
+        Args:
+            email_id: Email ID
+
+        Returns:
+            Full submission row, or None if the email was never recorded
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM submissions WHERE email_id = ?", (email_id,)
+            ).fetchone()
+        return dict(row) if row is not None else None
+
+    def is_draft_created(self, email_id: str) -> bool:
+        """
+        Check whether a draft was already created for an email.
+
+        Args:
+            email_id: Email ID
+
+        Returns:
+            True if the draft exists
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM submissions WHERE email_id = ? AND draft_status = 'Created'", (email_id,)
+            ).fetchone()
+        return row is not None
+
+    def step_rows(self, step: str) -> List[Dict]:
+        """
+        Get all recorded results of a step, in the layout of its output file.
+
+        Args:
+            step: 'grade' or 'feedback'
+
+        Returns:
+            Rows with 'email_id', the step's value and 'status'
+        """
+        value = {'grade': 'grade', 'feedback': 'reply'}[step]
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT email_id, {value}, {step}_status AS status FROM submissions "
+                f"WHERE {step}_status IS NOT NULL ORDER BY rowid"
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
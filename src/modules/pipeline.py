@@ -0,0 +1,328 @@
+"""Streaming pipeline running Steps 1-4 per submission."""
+
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from src.services.gmail_service import GmailService
+from src.services.gemini_service import GeminiService
+from src.modules.email_processor import EmailProcessor
+from src.modules.repo_analyzer import RepoAnalyzer
+from src.modules.feedback_generator import FeedbackGenerator
+from src.modules.draft_creator import DraftCreator
+from src.modules.data_manager import DataManager
+from src.modules.ledger import SubmissionLedger
+from src.utils.rate_limiter import RateLimiter
+from src.utils.logger import logger
+from config.settings import settings
+
+# Queue marker telling stage workers that upstream is finished
+_DONE = object()
+
+
+class StreamingPipeline:
+    """
+    Runs Steps 1-4 as a streaming pipeline.
+
+    Each submission moves to the next stage as soon as its current stage
+    finishes: fetch -> clone/grade -> feedback -> draft. Stages are
+    connected by bounded asyncio queues and run their blocking work on a
+    shared thread pool with a per-stage worker count, so total wall time
+    approaches that of the slowest stage instead of the sum of all stages.
+    With a ledger, each stage first checks what an earlier run already
+    recorded: graded submissions are not cloned again and submissions
+    with Ready feedback are not sent to Gemini again. The stage output
+    files are written once the pipeline drains.
+    """
+
+    def __init__(self, gmail_service: GmailService, gemini_service: GeminiService,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 ledger: Optional[SubmissionLedger] = None):
+        """
+        Initialize streaming pipeline.
+
+        Args:
+            gmail_service: Gmail service instance
+            gemini_service: Gemini service instance
+            rate_limiter: Shared Gemini request limiter passed to FeedbackGenerator
+            ledger: Submission ledger recording every stage result; stages
+                already completed for an email are not run again
+        """
+        self.gmail_service = gmail_service
+        self.ledger = ledger
+        self.email_processor = EmailProcessor(gmail_service)
+        self.repo_analyzer = RepoAnalyzer()
+        self.feedback_generator = FeedbackGenerator(gemini_service, rate_limiter)
+        self.draft_creator = DraftCreator(gmail_service)
+        self.data_manager = DataManager()
+
+        self.fetch_workers = settings.gmail_fetch_workers
+        self.grade_workers = settings.max_clone_workers
+        self.feedback_workers = settings.gemini_max_workers
+        self.draft_workers = settings.pipeline_draft_workers
+        self.queue_size = settings.pipeline_queue_size
+
+    def run(self, file_1_2: str, file_2_3: str, file_3_4: str, mapping_file: str,
+            limit: Optional[int] = None) -> Dict:
+        """
+        Run the pipeline to completion.
+
+        Args:
+            file_1_2: Output path of the email data
+            file_2_3: Output path of the grades
+            file_3_4: Output path of the feedback
+            mapping_file: Path to students_mapping.xlsx
+            limit: Maximum number of emails to process
+
+        Returns:
+            Dictionary with 'processed', 'graded', 'generated' and 'created' counts
+        """
+        return asyncio.run(self.run_async(file_1_2, file_2_3, file_3_4, mapping_file, limit))
+
+    async def run_async(self, file_1_2: str, file_2_3: str, file_3_4: str, mapping_file: str,
+                        limit: Optional[int] = None) -> Dict:
+        """
+        Async variant of run().
+
+        Args:
+            file_1_2: Output path of the email data
+            file_2_3: Output path of the grades
+            file_3_4: Output path of the feedback
+            mapping_file: Path to students_mapping.xlsx
+            limit: Maximum number of emails to process
+
+        Returns:
+            Dictionary with 'processed', 'graded', 'generated' and 'created' counts
+
+        Raises:
+            Exception: Listing the emails failed (after the listed emails were processed)
+        """
+        logger.info(
+            f"Starting streaming pipeline (limit: {limit or 'unlimited'}, workers: "
+            f"fetch {self.fetch_workers}, grade {self.grade_workers}, "
+            f"feedback {self.feedback_workers}, draft {self.draft_workers})"
+        )
+
+        start = time.monotonic()
+        loop = asyncio.get_running_loop()
+        total_workers = (1 + self.fetch_workers + self.grade_workers
+                         + self.feedback_workers + self.draft_workers)
+        executor = ThreadPoolExecutor(max_workers=total_workers)
+
+        def blocking(func, *args):
+            return loop.run_in_executor(executor, func, *args)
+
+        # Stage outputs keyed by search position, so files keep the search order
+        email_rows: Dict[int, Dict] = {}
+        grade_rows: Dict[int, Dict] = {}
+        feedback_rows: Dict[int, Dict] = {}
+        stats = {'created': 0, 'draft_failed': 0, 'first_draft': None}
+
+        id_queue = asyncio.Queue(maxsize=self.queue_size)
+        grade_queue = asyncio.Queue(maxsize=self.queue_size)
+        feedback_queue = asyncio.Queue(maxsize=self.queue_size)
+        draft_queue = asyncio.Queue(maxsize=self.queue_size)
+
+        student_mapping = await blocking(self.data_manager.load_student_mapping, mapping_file)
+
+        async def list_messages():
+            messages = self.gmail_service.iter_messages(
+                EmailProcessor.SEARCH_QUERY,
+                max_results=limit,
+                page_size=settings.gmail_page_size
+            )
+            index = 0
+            while True:
+                message = await blocking(next, messages, None)
+                if message is None:
+                    break
+                await id_queue.put((index, message['id']))
+                index += 1
+
+        async def fetch(item):
+            index, message_id = item
+            row = await blocking(self.email_processor.process_message, message_id)
+            if row is None:
+                return
+            email_rows[index] = row
+            if self.ledger:
+                if self.ledger.is_draft_created(row['email_id']):
+                    logger.info(f"Draft already created for {row['email_id']}, skipping")
+                    return
+                self.ledger.record_emails([row])
+            if row['status'] == 'Ready':
+                await grade_queue.put((index, row))
+
+        async def grade(item):
+            index, row = item
+            state = self.ledger.get(row['email_id']) if self.ledger else None
+            if state and state['grade_status'] == 'Ready':
+                logger.info(f"Already graded {row['email_id']}, skipping")
+                result = {'email_id': row['email_id'], 'grade': state['grade'], 'status': 'Ready'}
+            else:
+                result = await blocking(self.repo_analyzer.analyze_repository, row)
+                if self.ledger:
+                    self.ledger.record_grades([result])
+            grade_rows[index] = result
+            if result['status'] == 'Ready':
+                await feedback_queue.put((index, row, result))
+
+        async def generate(items):
+            results = [None] * len(items)
+            for position, (_, _, grade_result) in enumerate(items):
+                state = self.ledger.get(grade_result['email_id']) if self.ledger else None
+                if state and state['feedback_status'] == 'Ready':
+                    logger.info(f"Feedback already generated for {grade_result['email_id']}, skipping")
+                    results[position] = {
+                        'email_id': grade_result['email_id'],
+                        'reply': state['reply'],
+                        'status': 'Ready'
+                    }
+
+            todo = [position for position, result in enumerate(results) if result is None]
+            if todo:
+                students = [items[position][2] for position in todo]
+                generated = await blocking(self.feedback_generator.generate_for_batch, students)
+                if self.ledger:
+                    self.ledger.record_feedback(generated)
+                for position, result in zip(todo, generated):
+                    results[position] = result
+
+            for (index, row, _), result in zip(items, results):
+                feedback_rows[index] = result
+                if result['status'] == 'Ready':
+                    await draft_queue.put((index, row, result['reply']))
+
+        async def create_draft(item):
+            _, row, reply = item
+            draft = self.draft_creator.build_draft(row, reply, student_mapping)
+            draft_id = await blocking(self.draft_creator.create_draft, draft)
+            if isinstance(draft_id, Exception):
+                logger.error(f"Failed to create draft for {draft['email_id']}: {draft_id}")
+                stats['draft_failed'] += 1
+                if self.ledger:
+                    self.ledger.record_draft(draft['email_id'], None, draft_id)
+                return
+
+            if self.ledger:
+                self.ledger.record_draft(draft['email_id'], draft_id)
+
+            stats['created'] += 1
+            if stats['first_draft'] is None:
+                stats['first_draft'] = time.monotonic() - start
+                logger.info(f"First draft created after {stats['first_draft']:.1f}s")
+            logger.info(
+                f"Draft created for {draft['email_id']} "
+                f"(draft_id: {draft_id}, name: {draft['student_name']})"
+            )
+
+        try:
+            # Stages drain even if listing fails; its error is raised below
+            outcomes = await asyncio.gather(
+                self._run_producer(list_messages, id_queue),
+                self._run_stage("fetch", id_queue, grade_queue, self.fetch_workers, fetch),
+                self._run_stage("grade", grade_queue, feedback_queue, self.grade_workers, grade),
+                self._run_stage("feedback", feedback_queue, draft_queue, self.feedback_workers,
+                                generate, batch_size=settings.gemini_batch_size),
+                self._run_stage("draft", draft_queue, None, self.draft_workers, create_draft),
+                return_exceptions=True
+            )
+        finally:
+            executor.shutdown(wait=True)
+
+        if email_rows:
+            self.email_processor.save_results([email_rows[i] for i in sorted(email_rows)], file_1_2)
+            if self.ledger:
+                # Like the sequential steps, include results recorded by earlier runs
+                self.data_manager.write_table(self.ledger.step_rows('grade'), file_2_3)
+                self.data_manager.write_table(self.ledger.step_rows('feedback'), file_3_4)
+            else:
+                self.data_manager.write_table([grade_rows[i] for i in sorted(grade_rows)], file_2_3)
+                self.data_manager.write_table([feedback_rows[i] for i in sorted(feedback_rows)], file_3_4)
+
+        for outcome in outcomes:
+            if isinstance(outcome, BaseException):
+                raise outcome
+
+        graded = sum(1 for row in grade_rows.values() if row['status'] == 'Ready')
+        generated = sum(1 for row in feedback_rows.values() if row['status'] == 'Ready')
+        logger.info(
+            f"Streaming pipeline complete in {time.monotonic() - start:.1f}s: "
+            f"{len(email_rows)} processed, {graded} graded, {generated} feedback, "
+            f"{stats['created']} drafts ({stats['draft_failed']} failed)"
+        )
+
+        return {
+            'processed': len(email_rows),
+            'graded': graded,
+            'generated': generated,
+            'created': stats['created'],
+            'first_draft_seconds': stats['first_draft']
+        }
+
+    @staticmethod
+    async def _run_producer(produce, outbox: asyncio.Queue):
+        """
+        Run the source of the pipeline and signal completion downstream.
+
+        The completion marker is sent even if listing fails, so the stages
+        finish the emails already listed before the error is raised.
+
+        Args:
+            produce: Coroutine function filling outbox
+            outbox: Queue of the first stage
+        """
+        try:
+            await produce()
+        except Exception as e:
+            logger.error(f"Listing emails failed: {e}")
+            raise
+        finally:
+            await outbox.put(_DONE)
+
+    @staticmethod
+    async def _run_stage(name: str, inbox: asyncio.Queue, outbox: Optional[asyncio.Queue],
+                         workers: int, handle, batch_size: int = 1):
+        """
+        Run one pipeline stage until its input is exhausted.
+
+        A worker that receives the completion marker puts it back for its
+        siblings; once all workers have stopped, the marker is passed on to
+        the next stage.
+
+        Args:
+            name: Stage name used in log messages
+            inbox: Queue the stage consumes
+            outbox: Queue of the next stage (None for the last stage)
+            workers: Number of concurrent workers
+            handle: Coroutine function processing one item, or a list of
+                items when batch_size > 1
+            batch_size: Maximum items handed to one call; items already
+                waiting in the queue are grouped, nothing waits for a full batch
+        """
+        async def worker():
+            done = False
+            while not done:
+                item = await inbox.get()
+                if item is _DONE:
+                    await inbox.put(_DONE)
+                    break
+
+                items = [item]
+                while batch_size > 1 and len(items) < batch_size and not inbox.empty():
+                    item = inbox.get_nowait()
+                    if item is _DONE:
+                        await inbox.put(_DONE)
+                        done = True
+                        break
+                    items.append(item)
+
+                try:
+                    await handle(items if batch_size > 1 else items[0])
+                except Exception as e:
+                    logger.error(f"Pipeline stage '{name}' failed for {len(items)} item(s): {e}")
+
+        await asyncio.gather(*(worker() for _ in range(max(1, workers))))
+        if outbox is not None:
+            await outbox.put(_DONE)
@@ -1,12 +1,21 @@
 """Repository analysis module - Step 2."""
 
+import os
+import hashlib
+import multiprocessing
 from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional, Iterator
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 
 from src.services.git_service import GitService
+from src.services.repo_cache import RepoCache
 from src.modules.data_manager import DataManager
+from src.modules.grade_cache import GradeCache
+from src.modules.ledger import SubmissionLedger
+from src.utils.checkpoint import CheckpointJournal
+from src.utils.file_walker import PathFilter, iter_python_files
+from src.utils.line_counter import count_file_lines, count_sources
 from src.utils.logger import logger
 from config.settings import settings
 
@@ -14,42 +23,101 @@ from config.settings import settings
 class RepoAnalyzer:
     """Handles repository cloning and analysis - Step 2."""
 
-    def __init__(self):
-        """Initialize repository analyzer."""
-        self.git_service = GitService()
+    # Files with more non-blank, non-comment lines than this count as "large"
+    LARGE_FILE_THRESHOLD = 150
+
+    # Bump whenever a change to file discovery or line counting can change grades,
+    # so grades cached under the old rules are not reused
+    GRADING_RULE_VERSION = "1"
+
+    def __init__(self, ledger: Optional[SubmissionLedger] = None):
+        """
+        Initialize repository analyzer.
+
+        Args:
+            ledger: Submission ledger; when set, pending rows are read from it
+                instead of the input file
+        """
+        self.ledger = ledger
+        self.git_service = GitService(clone_strategy=settings.clone_strategy)
         self.data_manager = DataManager()
+        self.repo_cache = None
+        if settings.repo_cache_enabled:
+            self.repo_cache = RepoCache(
+                settings.repo_cache_dir,
+                settings.repo_cache_max_mb,
+                git_service=self.git_service
+            )
+        self.grade_cache = None
+        if settings.grade_cache_enabled:
+            self.grade_cache = GradeCache(settings.grade_cache_file)
+        self._object_locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
 
     def analyze_repositories(self, input_file: str, output_file: str, max_workers: int = 5):
         """
         Analyze repositories from input file.
 
         Args:
-            input_file: Path to file_1_2.xlsx
-            output_file: Path to file_2_3.xlsx
+            input_file: Path to file_1_2
+            output_file: Path to file_2_3
             max_workers: Number of concurrent workers
         """
         try:
             logger.info(f"Starting repository analysis (max_workers: {max_workers})")
 
-            # Read input file
-            df = self.data_manager.read_from_excel(input_file)
-
-            # Filter rows with status='Ready'
-            ready_df = self.data_manager.filter_ready_rows(df)
-
-            if ready_df.empty:
-                logger.warning("No 'Ready' rows found in input file")
-                self.data_manager.write_to_excel([], output_file)
+            # Grades journaled by an interrupted run are not computed again
+            journal = None
+            completed: Dict[str, Dict] = {}
+            if settings.checkpoint_enabled:
+                journal = CheckpointJournal(
+                    settings.get_checkpoint_path('grade'),
+                    compact_every=settings.checkpoint_compact_every
+                )
+                completed = journal.load(status='Ready')
+                if completed:
+                    logger.info(f"Resuming: {len(completed)} repositories already graded")
+                    if self.ledger:
+                        self.ledger.record_grades(completed.values())
+
+            if self.ledger:
+                # Emails that are Ready and not yet graded
+                repos = self.ledger.pending('grade')
+            else:
+                # Read input file
+                df = self.data_manager.read_table(input_file)
+
+                # Filter rows with status='Ready'
+                repos = self.data_manager.filter_ready_rows(df).to_dict('records')
+
+            # Journal rows of emails outside this input (e.g. from an earlier file) are dropped
+            email_ids = {repo['email_id'] for repo in repos}
+            completed = {email_id: row for email_id, row in completed.items() if email_id in email_ids}
+            remaining = [repo for repo in repos if repo['email_id'] not in completed]
+
+            if not remaining:
+                logger.warning("No 'Ready' rows left to grade")
+                if self.ledger:
+                    self.data_manager.write_table(self.ledger.step_rows('grade'), output_file)
+                else:
+                    self.data_manager.write_table(list(completed.values()), output_file)
+                if journal:
+                    journal.remove()
                 return {'graded': 0, 'failed': 0}
 
-            repos = ready_df.to_dict('records')
-            logger.info(f"Processing {len(repos)} repositories")
+            logger.info(f"Processing {len(remaining)} repositories")
 
             # Clone and analyze in parallel
-            results = self._clone_and_analyze_parallel(repos, max_workers)
+            results = self._clone_and_analyze_parallel(remaining, max_workers, journal)
 
             # Save results
-            self.data_manager.write_to_excel(results['data'], output_file)
+            if self.ledger:
+                self.ledger.record_grades(results['data'])
+                self.data_manager.write_table(self.ledger.step_rows('grade'), output_file)
+            else:
+                self.data_manager.write_table(list(completed.values()) + results['data'], output_file)
+            if journal:
+                journal.remove()
 
             logger.info(f"Repository analysis complete: {results['successful']} graded, {results['failed']} failed")
 
@@ -62,13 +130,20 @@ class RepoAnalyzer:
             logger.error(f"Repository analysis failed: {e}")
             raise
 
-    def _clone_and_analyze_parallel(self, repos: List[Dict], max_workers: int) -> Dict:
+    def _clone_and_analyze_parallel(self, repos: List[Dict], max_workers: int,
+                                    journal: Optional[CheckpointJournal] = None) -> Dict:
         """
         Clone and analyze repositories in parallel.
 
+        Cloning and counting run as separate stages: a thread pool performs
+        the network-bound clones and a process pool (settings.analysis_workers,
+        defaulting to the number of cores) counts lines, so counting is not
+        serialized behind the GIL. Stage results are joined by email_id.
+
         Args:
             repos: List of repository data
-            max_workers: Number of concurrent workers
+            max_workers: Number of concurrent clone workers
+            journal: Checkpoint journal receiving each result as it completes
 
         Returns:
             Dictionary with results
@@ -79,36 +154,86 @@ class RepoAnalyzer:
             'data': []
         }
 
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # Submit all tasks
-            future_to_repo = {
-                executor.submit(self._clone_and_analyze_single, repo): repo
+        def record(email_id: str, result: Optional[Dict], error: Optional[Exception] = None):
+            if error is not None:
+                logger.error(f"Failed to process {email_id}: {error}")
+                result = self._failed_result(email_id)
+            results['data'].append(result)
+            if journal:
+                journal.append([result])
+            if result['grade'] is not None:
+                results['successful'] += 1
+            else:
+                results['failed'] += 1
+
+        analysis_workers = settings.analysis_workers or os.cpu_count() or 1
+        if analysis_workers <= 1:
+            # Count in the clone threads
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                future_to_repo = {
+                    executor.submit(self.analyze_repository, repo): repo
+                    for repo in repos
+                }
+                for future in as_completed(future_to_repo):
+                    repo = future_to_repo[future]
+                    try:
+                        record(repo['email_id'], future.result())
+                    except Exception as e:
+                        record(repo['email_id'], None, e)
+            return results
+
+        logger.debug(f"Counting lines with {analysis_workers} process(es)")
+        # Workers are started while clone threads run git; a forked worker could
+        # inherit a clone's half-open exec pipe and hang it, so never fork here
+        start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        with ThreadPoolExecutor(max_workers=max_workers) as clone_pool, \
+                ProcessPoolExecutor(max_workers=analysis_workers,
+                                    mp_context=multiprocessing.get_context(start_method)) as count_pool:
+            # Stage 1: clone / fetch
+            clone_futures = {
+                clone_pool.submit(self._prepare_single, repo): repo
                 for repo in repos
             }
 
-            # Process completed tasks
-            for future in as_completed(future_to_repo):
-                repo = future_to_repo[future]
+            # Stage 2: count each repository as soon as it is on disk
+            count_futures = {}
+            for future in as_completed(clone_futures):
+                repo = clone_futures[future]
                 try:
-                    result = future.result()
-                    results['data'].append(result)
-                    if result['grade'] is not None:
-                        results['successful'] += 1
-                    else:
-                        results['failed'] += 1
+                    prepared = future.result()
+                except Exception as e:
+                    record(repo['email_id'], None, e)
+                    continue
+
+                if prepared['result'] is not None:
+                    record(repo['email_id'], prepared['result'])
+                    continue
 
+                try:
+                    count_future = count_pool.submit(count_sources, prepared['sources'])
+                except Exception as e:
+                    self._release(prepared)
+                    record(repo['email_id'], None, e)
+                    continue
+                # Release the checkout as soon as it is counted: a clone thread checking
+                # out a newer commit of the same repository waits for this lease
+                count_future.add_done_callback(lambda _, prepared=prepared: self._release(prepared))
+                count_futures[count_future] = prepared
+
+            # Join counts with their clone results
+            for future in as_completed(count_futures):
+                prepared = count_futures[future]
+                try:
+                    file_counts, errors = future.result()
+                    for error in errors:
+                        logger.warning(f"Error reading {error}")
+                    record(prepared['email_id'], self._finish_single(prepared, file_counts, errors))
                 except Exception as e:
-                    logger.error(f"Failed to process {repo['email_id']}: {e}")
-                    results['failed'] += 1
-                    results['data'].append({
-                        'email_id': repo['email_id'],
-                        'grade': None,
-                        'status': 'Missing: grade'
-                    })
+                    record(prepared['email_id'], None, e)
 
         return results
 
-    def _clone_and_analyze_single(self, repo: Dict) -> Dict:
+    def analyze_repository(self, repo: Dict) -> Dict:
         """
         Clone and analyze a single repository.
 
@@ -120,47 +245,290 @@ class RepoAnalyzer:
         """
         thread_id = threading.get_ident()
         email_id = repo['email_id']
+
+        try:
+            prepared = self._prepare_single(repo)
+            if prepared['result'] is not None:
+                return prepared['result']
+
+            try:
+                file_counts, errors = count_sources(prepared['sources'])
+            finally:
+                self._release(prepared)
+            for error in errors:
+                logger.warning(f"[Thread {thread_id}] Error reading {error}")
+            return self._finish_single(prepared, file_counts, errors)
+
+        except Exception as e:
+            logger.error(f"[Thread {thread_id}] Error analyzing {email_id}: {e}")
+            return self._failed_result(email_id)
+
+    def _prepare_single(self, repo: Dict) -> Dict:
+        """
+        Clone stage: resolve cached grades and fetch repository sources.
+
+        Args:
+            repo: Repository data dictionary
+
+        Returns:
+            Dictionary with 'email_id', 'repo_url', 'commit', and either a
+            final 'result' (cache hit or error) or the 'sources' to count.
+            'leased' is set when the sources live in a cached checkout that
+            must be handed back with _release() once they are counted.
+        """
+        thread_id = threading.get_ident()
+        email_id = repo['email_id']
         repo_url = repo['repo_url']
 
         logger.debug(f"[Thread {thread_id}] Processing {email_id}")
 
+        prepared = {
+            'email_id': email_id,
+            'repo_url': repo_url,
+            'commit': None,
+            'result': None,
+            'sources': None,
+            'leased': False
+        }
+
         try:
-            # Create target directory
-            target_dir = Path(settings.temp_dir) / 'homework_repos' / email_id
-            target_dir.mkdir(parents=True, exist_ok=True)
+            remote_head = None
+            if self.grade_cache:
+                # Skip cloning entirely when this commit was already graded
+                remote_head = self.git_service.get_remote_head(repo_url, timeout=settings.clone_timeout)
+                cached = self.grade_cache.get(repo_url, remote_head, self.grading_rule_key())
+                if cached is not None:
+                    logger.info(f"[Thread {thread_id}] Using cached grade for {repo_url} @ {remote_head[:12]}")
+                    prepared['result'] = {
+                        'email_id': email_id,
+                        'grade': round(cached['grade'], 2),
+                        'status': 'Ready'
+                    }
+                    return prepared
+
+            if settings.analysis_mode == 'objects':
+                commit, sources = self._collect_objects(repo_url, remote_head)
+            else:
+                commit, sources = self._collect_worktree(repo_url, email_id, remote_head)
+                prepared['leased'] = self.repo_cache is not None
+            logger.debug(f"[Thread {thread_id}] Found {len(sources)} Python files")
+
+            prepared['commit'] = commit
+            prepared['sources'] = sources
+            return prepared
+
+        except Exception as e:
+            logger.error(f"[Thread {thread_id}] Error analyzing {email_id}: {e}")
+            prepared['result'] = self._failed_result(email_id)
+            return prepared
+
+    def _finish_single(self, prepared: Dict, file_counts: Dict[str, int],
+                       errors: Optional[List[str]] = None) -> Dict:
+        """
+        Grade stage: turn line counts into a result and cache the grade.
+
+        A grade computed while some files could not be read is returned but
+        not cached, so the next run counts the commit again.
+
+        Args:
+            prepared: Dictionary returned by _prepare_single
+            file_counts: Line count per file path
+            errors: Files that could not be read while counting
+
+        Returns:
+            Analysis result dictionary
+        """
+        if not file_counts:
+            logger.warning(f"No Python files found in {prepared['repo_url']}")
+            grade = 0.0
+        else:
+            grade = self.grade_from_counts(file_counts)
+            logger.debug(f"Calculated grade for {prepared['email_id']}: {grade:.2f}")
+
+        if errors:
+            logger.warning(
+                f"Not caching grade for {prepared['repo_url']}: {len(errors)} file(s) could not be read"
+            )
+        elif self.grade_cache:
+            self.grade_cache.put(
+                prepared['repo_url'],
+                prepared['commit'],
+                self.grading_rule_key(),
+                grade,
+                file_counts
+            )
+
+        return {
+            'email_id': prepared['email_id'],
+            'grade': round(grade, 2),
+            'status': 'Ready'
+        }
+
+    def _release(self, prepared: Dict):
+        """Hand a cached checkout back once its files have been counted."""
+        if prepared.get('leased'):
+            prepared['leased'] = False
+            self.repo_cache.release(prepared['repo_url'])
+
+    @staticmethod
+    def _failed_result(email_id: str) -> Dict:
+        """Build the result row of a repository that could not be graded."""
+        return {
+            'email_id': email_id,
+            'grade': None,
+            'status': 'Missing: grade'
+        }
+
+    def _collect_worktree(self, repo_url: str, email_id: str,
+                          remote_head: Optional[str] = None) -> Tuple[Optional[str], List[Tuple[str, str]]]:
+        """
+        Check out a repository and list its Python files.
+
+        A cached checkout stays leased after this returns, so the caller
+        must release it once the listed files have been read.
+
+        Args:
+            repo_url: Repository URL
+            email_id: Email ID (names the clone directory when the cache is off)
+            remote_head: Remote HEAD commit if already resolved
 
-            # Clone repository
-            logger.debug(f"[Thread {thread_id}] Cloning {repo_url}")
-            self.git_service.clone_repository(
+        Returns:
+            Tuple of (checked out commit, list of (relative path, file path))
+        """
+        if self.repo_cache:
+            # Reuse or incrementally update a cached checkout
+            logger.debug(f"Checking out {repo_url} from clone cache")
+            target_dir, commit = self.repo_cache.checkout(
                 repo_url,
-                str(target_dir),
-                timeout=settings.clone_timeout
+                timeout=settings.clone_timeout,
+                remote_head=remote_head
             )
+            logger.debug(f"Using {target_dir} @ {commit[:12]}")
+            try:
+                return commit, self._list_sources(target_dir)
+            except Exception:
+                self.repo_cache.release(repo_url)
+                raise
+
+        # Create target directory
+        target_dir = Path(settings.temp_dir) / 'homework_repos' / email_id
+        target_dir.mkdir(parents=True, exist_ok=True)
+
+        # Clone repository
+        logger.debug(f"Cloning {repo_url}")
+        self.git_service.clone_repository(
+            repo_url,
+            str(target_dir),
+            timeout=settings.clone_timeout
+        )
+        commit = self.git_service.get_head_commit(str(target_dir)) if self.grade_cache else None
+        return commit, self._list_sources(target_dir)
+
+    def _list_sources(self, target_dir: Path) -> List[Tuple[str, str]]:
+        """List (relative path, file path) of the Python files in a checkout."""
+        return [
+            (py_file.relative_to(target_dir).as_posix(), str(py_file))
+            for py_file in self.iter_python_files(target_dir)
+        ]
+
+    def _collect_objects(self, repo_url: str,
+                         remote_head: Optional[str] = None) -> Tuple[str, List[Tuple[str, bytes]]]:
+        """
+        Read Python sources straight from git objects.
 
-            # Analyze Python files
-            python_files = self.find_python_files(target_dir)
-            logger.debug(f"[Thread {thread_id}] Found {len(python_files)} Python files")
+        The commit's tree is fetched into a bare partial clone, Python
+        paths are taken from the tree listing and their blobs are streamed
+        out of the object store, so no working tree is ever written.
 
-            if not python_files:
-                logger.warning(f"[Thread {thread_id}] No Python files found in {repo_url}")
-                grade = 0.0
-            else:
-                grade = self.calculate_grade(python_files)
-                logger.debug(f"[Thread {thread_id}] Calculated grade: {grade:.2f}")
+        Args:
+            repo_url: Repository URL
+            remote_head: Remote HEAD commit if already resolved
 
-            return {
-                'email_id': email_id,
-                'grade': round(grade, 2),
-                'status': 'Ready'
-            }
+        Returns:
+            Tuple of (fetched commit, list of (path, blob contents))
+        """
+        git_dir = Path(settings.temp_dir) / 'homework_objects' / RepoCache.cache_key(repo_url)
+        git_dir.parent.mkdir(parents=True, exist_ok=True)
 
-        except Exception as e:
-            logger.error(f"[Thread {thread_id}] Error analyzing {email_id}: {e}")
-            return {
-                'email_id': email_id,
-                'grade': None,
-                'status': 'Missing: grade'
-            }
+        with self._object_lock(str(git_dir)):
+            commit = self.git_service.fetch_commit(
+                repo_url,
+                str(git_dir),
+                timeout=settings.clone_timeout,
+                commit=remote_head
+            )
+
+            tree_files = self.git_service.list_tree_files(str(git_dir), commit)
+            path_filter = self._make_path_filter()
+
+            if path_filter.respect_gitignore:
+                # Load .gitignore files parent-first so deeper rules take precedence
+                ignore_files = sorted(
+                    [(path, sha) for path, sha in tree_files if Path(path).name == '.gitignore'],
+                    key=lambda item: item[0].count('/')
+                )
+                contents = dict(self.git_service.iter_blobs(
+                    str(git_dir),
+                    [sha for _, sha in ignore_files],
+                    timeout=settings.clone_timeout
+                ))
+                for path, sha in ignore_files:
+                    base_dir = path.rsplit('/', 1)[0] if '/' in path else ''
+                    path_filter.add_gitignore(base_dir, contents[sha].decode('utf-8', errors='ignore'))
+
+            python_files = [
+                (path, sha)
+                for path, sha in tree_files
+                if path.endswith('.py') and not path_filter.is_path_excluded(path)
+            ]
+
+            unique_shas = list(dict.fromkeys(sha for _, sha in python_files))
+            blobs = dict(self.git_service.iter_blobs(str(git_dir), unique_shas, timeout=settings.clone_timeout))
+
+        return commit, [(path, blobs[sha]) for path, sha in python_files]
+
+    def _object_lock(self, key: str) -> threading.Lock:
+        """Get the lock serializing access to one bare repository."""
+        with self._locks_guard:
+            if key not in self._object_locks:
+                self._object_locks[key] = threading.Lock()
+            return self._object_locks[key]
+
+    def _make_path_filter(self) -> PathFilter:
+        """
+        Create the filter deciding which repository paths are graded.
+
+        Returns:
+            Fresh path filter (gitignore rules are per repository)
+        """
+        return PathFilter(
+            settings.get_analysis_exclude_globs(),
+            respect_gitignore=settings.analysis_respect_gitignore
+        )
+
+    def grading_rule_key(self) -> str:
+        """
+        Identify the grading rules, including path filter settings.
+
+        Returns:
+            Key stored with cached grades
+        """
+        config = '|'.join(settings.get_analysis_exclude_globs()) + f"|gitignore={settings.analysis_respect_gitignore}"
+        return f"{self.GRADING_RULE_VERSION}:{hashlib.sha256(config.encode()).hexdigest()[:12]}"
+
+    def iter_python_files(self, directory: Path) -> Iterator[Path]:
+        """
+        Lazily yield Python files in directory.
+
+        Excluded directories are pruned before they are descended into.
+
+        Args:
+            directory: Directory to search
+
+        Yields:
+            Python file paths
+        """
+        return iter_python_files(directory, self._make_path_filter())
 
     def find_python_files(self, directory: Path) -> List[Path]:
         """
@@ -172,15 +540,7 @@ class RepoAnalyzer:
         Returns:
             List of Python file paths
         """
-        exclude_dirs = {'__pycache__', '.venv', 'venv', 'env', '.git', 'node_modules'}
-
-        python_files = []
-        for py_file in directory.rglob('*.py'):
-            # Check if any parent directory is in exclude list
-            if not any(excluded in py_file.parts for excluded in exclude_dirs):
-                python_files.append(py_file)
-
-        return python_files
+        return list(self.iter_python_files(directory))
 
     def count_lines(self, file_path: Path) -> int:
         """
@@ -192,27 +552,37 @@ class RepoAnalyzer:
         Returns:
             Number of lines
         """
-        count = 0
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                for line in f:
-                    stripped = line.strip()
-                    # Count lines that are not empty and not comments
-                    if stripped and not stripped.startswith('#'):
-                        count += 1
+            return count_file_lines(file_path)
         except Exception as e:
             logger.warning(f"Error reading {file_path}: {e}")
+            return 0
 
-        return count
+    def count_files(self, python_files: List[Path], root: Optional[Path] = None) -> Dict[str, int]:
+        """
+        Count lines in each Python file.
 
-    def calculate_grade(self, python_files: List[Path]) -> float:
+        Args:
+            python_files: List of Python file paths
+            root: Directory the returned paths are made relative to
+
+        Returns:
+            Dictionary mapping file path to line count
         """
-        Calculate grade based on file line counts.
+        counts = {}
+        for py_file in python_files:
+            key = py_file.relative_to(root).as_posix() if root else str(py_file)
+            counts[key] = self.count_lines(py_file)
+        return counts
+
+    def grade_from_counts(self, file_counts: Dict[str, int]) -> float:
+        """
+        Calculate grade from per-file line counts.
 
         Grade = (sum of lines in files >150 lines) / (total lines) * 100
 
         Args:
-            python_files: List of Python file paths
+            file_counts: Dictionary mapping file path to line count
 
         Returns:
             Grade (0-100)
@@ -220,13 +590,12 @@ class RepoAnalyzer:
         total_lines = 0
         large_files_lines = 0
 
-        for py_file in python_files:
-            line_count = self.count_lines(py_file)
+        for path, line_count in file_counts.items():
             total_lines += line_count
 
-            if line_count > 150:
+            if line_count > self.LARGE_FILE_THRESHOLD:
                 large_files_lines += line_count
-                logger.debug(f"Large file: {py_file.name} ({line_count} lines)")
+                logger.debug(f"Large file: {Path(path).name} ({line_count} lines)")
 
         if total_lines == 0:
             return 0.0
@@ -235,3 +604,17 @@ class RepoAnalyzer:
         logger.debug(f"Grade calculation: {large_files_lines}/{total_lines} = {grade:.2f}%")
 
         return grade
+
+    def calculate_grade(self, python_files: List[Path]) -> float:
+        """
+        Calculate grade based on file line counts.
+
+        Grade = (sum of lines in files >150 lines) / (total lines) * 100
+
+        Args:
+            python_files: List of Python file paths
+
+        Returns:
+            Grade (0-100)
+        """
+        return self.grade_from_counts(self.count_files(python_files))
@@ -0,0 +1,139 @@
+"""Storage backends for the intermediate files passed between steps."""
+
+import os
+import importlib.util
+from pathlib import Path
+from typing import Dict
+
+import pandas as pd
+
+
+class StorageBackend:
+    """Reads and writes one intermediate file format."""
+
+    name = ""
+    suffix = ""
+
+    def write(self, df: pd.DataFrame, path: Path):
+        """
+        Write a DataFrame.
+
+        Args:
+            df: Data to write
+            path: Output file path
+        """
+        raise NotImplementedError
+
+    def read(self, path: Path) -> pd.DataFrame:
+        """
+        Read a DataFrame.
+
+        Args:
+            path: Input file path
+
+        Returns:
+            DataFrame with data
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def _replace(tmp_path: Path, path: Path):
+        """Move a fully written temporary file into place."""
+        os.replace(tmp_path, path)
+
+
+class ExcelBackend(StorageBackend):
+    """Excel workbooks via openpyxl (slow, but readable by hand)."""
+
+    name = "xlsx"
+    suffix = ".xlsx"
+
+    def __init__(self, sheet_name: str = 'Data'):
+        """
+        Initialize Excel backend.
+
+        Args:
+            sheet_name: Sheet holding the data
+        """
+        self.sheet_name = sheet_name
+
+    def write(self, df: pd.DataFrame, path: Path):
+        with pd.ExcelWriter(path, engine='openpyxl') as writer:
+            df.to_excel(writer, index=False, sheet_name=self.sheet_name)
+
+    def read(self, path: Path) -> pd.DataFrame:
+        return pd.read_excel(path, sheet_name=self.sheet_name)
+
+
+class ParquetBackend(StorageBackend):
+    """Compressed columnar Parquet files via pyarrow."""
+
+    name = "parquet"
+    suffix = ".parquet"
+
+    def write(self, df: pd.DataFrame, path: Path):
+        tmp_path = path.with_name(path.name + '.tmp')
+        df.to_parquet(tmp_path, engine='pyarrow', index=False)
+        self._replace(tmp_path, path)
+
+    def read(self, path: Path) -> pd.DataFrame:
+        return pd.read_parquet(path, engine='pyarrow')
+
+
+class ArrowBackend(StorageBackend):
+    """Arrow IPC (Feather v2) files, the fastest to write and read back."""
+
+    name = "arrow"
+    suffix = ".arrow"
+
+    def write(self, df: pd.DataFrame, path: Path):
+        from pyarrow import feather
+
+        tmp_path = path.with_name(path.name + '.tmp')
+        feather.write_feather(df.reset_index(drop=True), str(tmp_path))
+        self._replace(tmp_path, path)
+
+    def read(self, path: Path) -> pd.DataFrame:
+        from pyarrow import feather
+
+        return feather.read_feather(str(path))
+
+
+BACKENDS: Dict[str, type] = {
+    backend.name: backend for backend in (ExcelBackend, ParquetBackend, ArrowBackend)
+}
+
+
+def get_backend(name: str) -> StorageBackend:
+    """
+    Get the storage backend for a format name.
+
+    Args:
+        name: Format name ('xlsx', 'parquet' or 'arrow')
+
+    Returns:
+        Storage backend instance
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown storage format '{name}' (expected one of {', '.join(BACKENDS)})")
+    # pyarrow is only located here; pandas imports it when a file is read or written
+    if name != ExcelBackend.name and importlib.util.find_spec('pyarrow') is None:
+        raise ImportError(f"pyarrow package not installed (required for '{name}' storage)")
+    return BACKENDS[name]()
+
+
+def get_backend_for_path(path: str) -> StorageBackend:
+    """
+    Get the storage backend matching a file's suffix.
+
+    Args:
+        path: File path
+
+    Returns:
+        Storage backend instance
+    """
+    suffix = Path(path).suffix.lower()
+    for backend in BACKENDS.values():
+        if backend.suffix == suffix:
+            return get_backend(backend.name)
+    raise ValueError(f"No storage backend for '{suffix}' files")
@@ -1,26 +1,45 @@
 """Gemini API service wrapper."""
 
+import re
+import json
 import time
-from typing import Optional
-from tenacity import retry, stop_after_attempt, wait_exponential
+from typing import Dict, List, Optional, Tuple
 
 try:
     import google.generativeai as genai
 except ImportError:
     genai = None
 
+try:
+    from google.api_core import exceptions as google_exceptions
+except ImportError:
+    google_exceptions = None
+
+from src.utils.rate_limiter import AdaptiveRateController
 from src.utils.logger import logger
 
 
 class GeminiService:
     """Wrapper for Gemini API operations."""
 
-    def __init__(self, api_key: str):
+    # Rough size of a 3-5 sentence reply, used for token budgeting
+    EXPECTED_OUTPUT_TOKENS = 400
+
+    # Server hints such as "Please retry in 41.2s" or "retry_delay { seconds: 41 }"
+    RETRY_AFTER_PATTERNS = [
+        re.compile(r'retry in ([\d.]+)\s*s', re.IGNORECASE),
+        re.compile(r'retry_delay\s*\{\s*seconds:\s*(\d+)', re.IGNORECASE),
+    ]
+
+    def __init__(self, api_key: str, rate_controller: Optional[AdaptiveRateController] = None,
+                 max_attempts: int = 5):
         """
         Initialize Gemini service.
 
         Args:
             api_key: Gemini API key
+            rate_controller: Adaptive controller gating all requests (None for no gating)
+            max_attempts: Attempts per request when rate limited
         """
         if not genai:
             raise ImportError("google-generativeai package not installed")
@@ -50,9 +69,11 @@ class GeminiService:
             safety_settings=self.safety_settings
         )
 
+        self.rate_controller = rate_controller
+        self.max_attempts = max_attempts
+
         logger.info("Gemini service initialized")
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
     def generate_feedback(self, grade: float, style: str) -> Optional[str]:
         """
         Generate feedback based on grade and style.
@@ -64,39 +85,213 @@ class GeminiService:
         Returns:
             Generated feedback text, or None if generation failed
         """
-        prompt = self._build_prompt(grade, style)
+        logger.debug(f"Generating feedback for grade {grade:.1f} with style '{style}'")
+        response = self._request(self._build_prompt(grade, style), self.estimate_tokens(grade, style))
+        if response is None:
+            return None
+        return self._extract_text(response)
+
+    def generate_feedback_batch(self, items: List[Tuple[float, str]]) -> List[Optional[str]]:
+        """
+        Generate feedback for several students with a single request.
 
-        try:
-            logger.debug(f"Generating feedback for grade {grade:.1f} with style '{style}'")
-            response = self.model.generate_content(prompt)
+        The per-student prompts are packed into one prompt asking for a JSON
+        object keyed by item number. JSON output is requested in the prompt
+        only, since the pinned SDK's GenerationConfig has no response MIME
+        type. Items missing from the response or with invalid text are
+        returned as None, so the caller can charge its own quotas for
+        generating them individually.
 
-            # Check if response has candidates before accessing text
-            if not response.candidates or len(response.candidates) == 0:
-                logger.warning("No candidates in Gemini response (likely blocked by safety filters)")
-                return None
+        Args:
+            items: (grade, style) pairs
+
+        Returns:
+            Feedback texts aligned with items (None where the item still
+            has to be generated)
+        """
+        if len(items) <= 1:
+            return [self.generate_feedback(grade, style) for grade, style in items]
+
+        logger.debug(f"Generating feedback for {len(items)} students in one request")
+        tokens = sum(self.estimate_tokens(grade, style) for grade, style in items)
+        response = self._request(self._build_batch_prompt(items), tokens)
+
+        parsed = {}
+        text = self._extract_text(response) if response is not None else None
+        if text:
+            parsed = self._parse_batch_response(text)
+
+        results = []
+        for number, (grade, style) in enumerate(items, start=1):
+            feedback = parsed.get(str(number))
+            if isinstance(feedback, str) and feedback.strip():
+                results.append(feedback.strip())
+            else:
+                logger.warning(f"Batch item {number} missing or invalid")
+                results.append(None)
+        return results
+
+    def _request(self, prompt: str, tokens: int, generation_config: Optional[Dict] = None):
+        """
+        Send a prompt, retrying only rate limit errors.
+
+        Args:
+            prompt: Prompt text
+            tokens: Estimated tokens consumed by the request
+            generation_config: Overrides the model's generation config
 
-            # Safely access the text from the first candidate
+        Returns:
+            Gemini response, or None if the request failed
+        """
+        for attempt in range(1, self.max_attempts + 1):
             try:
-                candidate = response.candidates[0]
-                if hasattr(candidate.content, 'parts') and candidate.content.parts:
-                    feedback = candidate.content.parts[0].text.strip()
-                    if feedback:
-                        logger.debug(f"Generated feedback: {len(feedback)} characters")
-                        return feedback
-                    else:
-                        logger.warning("Empty text in Gemini response")
-                        return None
+                response = self._generate_content(prompt, tokens, generation_config)
+            except Exception as e:
+                if not self.is_rate_limit_error(e):
+                    logger.error(f"Gemini API error: {e}")
+                    return None
+
+                if self.rate_controller:
+                    self.rate_controller.on_throttle(self.get_retry_after(e))
+                else:
+                    time.sleep(self.get_retry_after(e) or 2 ** attempt)
+                logger.warning(f"Gemini rate limited (attempt {attempt}/{self.max_attempts}): {e}")
+                continue
+
+            if self.rate_controller:
+                self.rate_controller.on_success()
+            return response
+
+        logger.error(f"Gemini still rate limited after {self.max_attempts} attempts")
+        return None
+
+    def _generate_content(self, prompt: str, tokens: int, generation_config: Optional[Dict] = None):
+        """
+        Send one request, gated by the rate controller.
+
+        Args:
+            prompt: Prompt text
+            tokens: Estimated tokens consumed by the request
+            generation_config: Overrides the model's generation config
+
+        Returns:
+            Gemini response
+        """
+        kwargs = {'generation_config': generation_config} if generation_config else {}
+        if not self.rate_controller:
+            return self.model.generate_content(prompt, **kwargs)
+
+        with self.rate_controller.slot(tokens):
+            return self.model.generate_content(prompt, **kwargs)
+
+    def _extract_text(self, response) -> Optional[str]:
+        """
+        Extract the feedback text from a Gemini response.
+
+        Args:
+            response: Gemini response
+
+        Returns:
+            Feedback text, or None if the response holds no usable text
+        """
+        # Check if response has candidates before accessing text
+        if not response.candidates or len(response.candidates) == 0:
+            logger.warning("No candidates in Gemini response (likely blocked by safety filters)")
+            return None
+
+        # Safely access the text from the first candidate
+        try:
+            candidate = response.candidates[0]
+            if hasattr(candidate.content, 'parts') and candidate.content.parts:
+                feedback = candidate.content.parts[0].text.strip()
+                if feedback:
+                    logger.debug(f"Generated feedback: {len(feedback)} characters")
+                    return feedback
                 else:
-                    logger.warning("No parts in candidate content")
+                    logger.warning("Empty text in Gemini response")
                     return None
-            except (AttributeError, IndexError) as e:
-                logger.warning(f"Error accessing candidate text: {e}")
+            else:
+                logger.warning("No parts in candidate content")
                 return None
-
-        except Exception as e:
-            logger.error(f"Gemini API error: {e}")
+        except (AttributeError, IndexError) as e:
+            logger.warning(f"Error accessing candidate text: {e}")
             return None
 
+    @staticmethod
+    def is_rate_limit_error(error: Exception) -> bool:
+        """
+        Check whether an error is a 429 / quota exhaustion response.
+
+        Args:
+            error: Exception raised by the API client
+
+        Returns:
+            True if the request was rejected for rate or quota reasons
+        """
+        if google_exceptions and isinstance(error, (google_exceptions.ResourceExhausted,
+                                                    google_exceptions.TooManyRequests)):
+            return True
+        if getattr(error, 'code', None) == 429:
+            return True
+
+        message = str(error).lower()
+        return any(marker in message for marker in ('429', 'quota', 'rate limit', 'resource exhausted'))
+
+    @classmethod
+    def get_retry_after(cls, error: Exception) -> Optional[float]:
+        """
+        Extract the server's retry-after hint from a rate limit error.
+
+        Args:
+            error: Exception raised by the API client
+
+        Returns:
+            Seconds to wait, or None if the error carries no hint
+        """
+        response = getattr(error, 'response', None)
+        headers = getattr(response, 'headers', None) or {}
+        retry_after = headers.get('Retry-After') if hasattr(headers, 'get') else None
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+
+        text = f"{error} {getattr(error, 'details', '')}"
+        for pattern in cls.RETRY_AFTER_PATTERNS:
+            match = pattern.search(text)
+            if match:
+                return float(match.group(1))
+        return None
+
+    def estimate_tokens(self, grade: float, style: str) -> int:
+        """
+        Estimate the tokens a feedback request will consume.
+
+        Uses the common ~4 characters per token approximation for the prompt.
+
+        Args:
+            grade: Student grade
+            style: Feedback style
+
+        Returns:
+            Estimated prompt plus output tokens
+        """
+        return len(self._build_prompt(grade, style)) // 4 + self.EXPECTED_OUTPUT_TOKENS
+
+    def get_prompt(self, grade: float, style: str) -> str:
+        """
+        Get the prompt sent for a grade and style, e.g. to derive cache keys.
+
+        Args:
+            grade: Student grade
+            style: Feedback style
+
+        Returns:
+            Prompt string
+        """
+        return self._build_prompt(grade, style)
+
     def _build_prompt(self, grade: float, style: str) -> str:
         """
         Build prompt based on grade category.
@@ -145,6 +340,56 @@ Student grade: {grade:.1f}%"""
 
         return prompts.get(style, prompts["constructive"])
 
+    def _build_batch_prompt(self, items: List[Tuple[float, str]]) -> str:
+        """
+        Pack several feedback prompts into one JSON-output prompt.
+
+        Args:
+            items: (grade, style) pairs
+
+        Returns:
+            Prompt string
+        """
+        sections = [
+            f"### Item {number}\n{self._build_prompt(grade, style)}"
+            for number, (grade, style) in enumerate(items, start=1)
+        ]
+        return (
+            f"Write {len(items)} separate messages, one for each item below. Follow each item's "
+            "instructions independently; the messages are for different students.\n\n"
+            "Respond with a single JSON object mapping each item number (as a string) to its "
+            'message text, for example {"1": "...", "2": "..."}. Do not add any other text.\n\n'
+            + "\n\n".join(sections)
+        )
+
+    @staticmethod
+    def _parse_batch_response(text: str) -> Dict[str, str]:
+        """
+        Parse the JSON object returned for a batch prompt.
+
+        Tolerates Markdown code fences and text around the object.
+
+        Args:
+            text: Response text
+
+        Returns:
+            Item number to feedback text (empty if the text is not a JSON object)
+        """
+        start, end = text.find('{'), text.rfind('}')
+        if start == -1 or end < start:
+            logger.warning("Batch response contains no JSON object")
+            return {}
+
+        try:
+            parsed = json.loads(text[start:end + 1])
+        except ValueError as e:
+            logger.warning(f"Failed to parse batch response: {e}")
+            return {}
+
+        if not isinstance(parsed, dict):
+            return {}
+        return {str(key).strip(): value for key, value in parsed.items()}
+
     def _get_fallback_feedback(self, grade: float, style: str) -> str:
         """
         Fallback feedback if API fails.
@@ -163,36 +408,3 @@ Student grade: {grade:.1f}%"""
             "amsalem": f"A {grade:.1f}%? Really? This is unacceptable work. You need to wake up and take this seriously. Stop making excuses and actually put in the effort. Your code quality reflects your commitment - and right now, it's severely lacking!"
         }
         return fallbacks.get(style, f"You scored {grade:.1f}% on this assignment. Keep working hard!")
-
-
-class RateLimiter:
-    """Rate limiter for API calls."""
-
-    def __init__(self, max_calls: int, time_window: int):
-        """
-        Initialize rate limiter.
-
-        Args:
-            max_calls: Maximum calls allowed in time window
-            time_window: Time window in seconds
-        """
-        self.max_calls = max_calls
-        self.time_window = time_window
-        self.calls = []
-
-    def wait_if_needed(self):
-        """Wait if rate limit would be exceeded."""
-        now = time.time()
-
-        # Remove calls outside time window
-        self.calls = [call_time for call_time in self.calls
-                      if now - call_time < self.time_window]
-
-        if len(self.calls) >= self.max_calls:
-            oldest_call = min(self.calls)
-            wait_time = (oldest_call + self.time_window - now)
-            if wait_time > 0:
-                logger.info(f"Rate limit reached, waiting {wait_time:.1f} seconds")
-                time.sleep(wait_time)
-
-        self.calls.append(now)
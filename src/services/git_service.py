@@ -1,8 +1,9 @@
 """Git operations service wrapper."""
 
 import shutil
+import subprocess
 from pathlib import Path
-from typing import Optional
+from typing import Optional, List, Tuple, Iterator
 
 import git
 from tenacity import retry, stop_after_attempt, wait_exponential
@@ -13,6 +14,20 @@ from src.utils.logger import logger
 class GitService:
     """Wrapper for Git operations."""
 
+    # Clone strategies: 'full' checks out every file, 'sparse' fetches only *.py blobs
+    CLONE_STRATEGIES = ('full', 'sparse')
+
+    def __init__(self, clone_strategy: str = 'full'):
+        """
+        Initialize Git service.
+
+        Args:
+            clone_strategy: 'full' or 'sparse'
+        """
+        if clone_strategy not in self.CLONE_STRATEGIES:
+            raise ValueError(f"Unknown clone strategy: {clone_strategy}")
+        self.clone_strategy = clone_strategy
+
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=2, max=10)
@@ -21,6 +36,9 @@ class GitService:
         """
         Clone a Git repository.
 
+        With the 'sparse' strategy, a partial clone is attempted first and
+        the regular shallow clone is used if it fails.
+
         Args:
             repo_url: Repository URL
             target_dir: Target directory for cloning
@@ -37,6 +55,16 @@ class GitService:
             if target_path.exists():
                 shutil.rmtree(target_path)
 
+            if self.clone_strategy == 'sparse':
+                try:
+                    self._clone_python_only(repo_url, target_dir)
+                    logger.info(f"Successfully cloned (sparse): {repo_url}")
+                    return True
+                except git.GitCommandError as e:
+                    logger.warning(f"Sparse clone failed for {repo_url}, falling back to full clone: {e}")
+                    if target_path.exists():
+                        shutil.rmtree(target_path)
+
             # Clone with shallow depth for speed
             git.Repo.clone_from(
                 repo_url,
@@ -54,6 +82,193 @@ class GitService:
             logger.error(f"Clone failed for {repo_url}: {e}")
             raise
 
+    def _clone_python_only(self, repo_url: str, target_dir: str):
+        """
+        Partial clone that only downloads and checks out *.py files.
+
+        Blobs are omitted from the clone (--filter=blob:none) and a
+        non-cone sparse checkout limits the working tree to Python files,
+        so only their blobs are fetched when the tree is checked out.
+
+        Args:
+            repo_url: Repository URL
+            target_dir: Target directory for cloning
+        """
+        repo = git.Repo.clone_from(
+            repo_url,
+            target_dir,
+            depth=1,
+            filter='blob:none',
+            no_checkout=True
+        )
+
+        # Configure sparse checkout directly so it works on any git version
+        repo.git.config('core.sparseCheckout', 'true')
+        repo.git.config('core.sparseCheckoutCone', 'false')
+        sparse_file = Path(repo.git_dir) / 'info' / 'sparse-checkout'
+        sparse_file.parent.mkdir(parents=True, exist_ok=True)
+        sparse_file.write_text('*.py\n', encoding='utf-8')
+
+        # Populate index and working tree; missing blobs are fetched in one batch
+        repo.git.read_tree('-mu', 'HEAD')
+
+    def get_remote_head(self, repo_url: str, timeout: int = 60) -> str:
+        """
+        Resolve the commit the remote HEAD points to without cloning.
+
+        Args:
+            repo_url: Repository URL
+            timeout: Timeout in seconds
+
+        Returns:
+            Commit SHA of the remote HEAD
+        """
+        output = git.cmd.Git().ls_remote(repo_url, 'HEAD', kill_after_timeout=timeout)
+        if not output.strip():
+            raise ValueError(f"Remote HEAD not found for {repo_url}")
+        return output.split()[0]
+
+    def get_head_commit(self, target_dir: str) -> str:
+        """
+        Get the commit checked out in a local repository.
+
+        Args:
+            target_dir: Repository directory
+
+        Returns:
+            Commit SHA of HEAD
+        """
+        return git.Repo(target_dir).head.commit.hexsha
+
+    def update_repository(self, target_dir: str, timeout: int = 60) -> str:
+        """
+        Fast-forward an existing shallow clone to the remote HEAD.
+
+        Args:
+            target_dir: Repository directory
+            timeout: Timeout in seconds
+
+        Returns:
+            Commit SHA checked out after the update
+        """
+        repo = git.Repo(target_dir)
+        repo.git.fetch('--depth=1', 'origin', 'HEAD', kill_after_timeout=timeout)
+        repo.git.reset('--hard', 'FETCH_HEAD')
+        commit = repo.head.commit.hexsha
+        logger.info(f"Updated {target_dir} to {commit[:12]}")
+        return commit
+
+    def fetch_commit(self, repo_url: str, git_dir: str, timeout: int = 60,
+                     commit: Optional[str] = None) -> str:
+        """
+        Fetch the remote HEAD commit and its trees into a bare repository.
+
+        No working tree is written and no blobs are downloaded; the bare
+        repository is a partial clone that can fetch blobs on demand.
+
+        Args:
+            repo_url: Repository URL
+            git_dir: Bare repository directory (created if missing)
+            timeout: Timeout in seconds
+            commit: Expected commit; the fetch is skipped if it is already present
+
+        Returns:
+            Commit SHA of the fetched HEAD
+        """
+        if not (Path(git_dir) / 'HEAD').exists():
+            repo = git.Repo.init(git_dir, bare=True)
+            repo.git.remote('add', 'origin', repo_url)
+            repo.git.config('core.repositoryformatversion', '1')
+            repo.git.config('extensions.partialClone', 'origin')
+            repo.git.config('remote.origin.promisor', 'true')
+            repo.git.config('remote.origin.partialclonefilter', 'blob:none')
+        else:
+            repo = git.Repo(git_dir)
+
+        try:
+            if commit:
+                try:
+                    repo.git.cat_file('-e', f"{commit}^{{commit}}")
+                    logger.debug(f"Commit {commit[:12]} already fetched for {repo_url}")
+                    return commit
+                except git.GitCommandError:
+                    pass
+
+            repo.git.fetch(
+                '--depth=1', '--filter=blob:none', '--no-tags', 'origin', 'HEAD',
+                kill_after_timeout=timeout
+            )
+            fetched = repo.git.rev_parse('FETCH_HEAD')
+            logger.info(f"Fetched tree of {repo_url} @ {fetched[:12]}")
+            return fetched
+        finally:
+            repo.close()
+
+    def list_tree_files(self, git_dir: str, commit: str) -> List[Tuple[str, str]]:
+        """
+        List the files of a commit without reading any blob.
+
+        Args:
+            git_dir: Repository directory
+            commit: Commit SHA
+
+        Returns:
+            List of (path, blob SHA) tuples
+        """
+        repo = git.Repo(git_dir)
+        try:
+            output = repo.git.ls_tree('-r', '-z', '--full-tree', commit)
+        finally:
+            repo.close()
+
+        files = []
+        for entry in output.split('\0'):
+            if not entry:
+                continue
+            meta, path = entry.split('\t', 1)
+            _, object_type, sha = meta.split()
+            if object_type == 'blob':
+                files.append((path, sha))
+        return files
+
+    def iter_blobs(self, git_dir: str, blob_shas: List[str], timeout: int = 60) -> Iterator[Tuple[str, bytes]]:
+        """
+        Stream blob contents from a partial clone.
+
+        Missing blobs are requested from the promisor remote in a single
+        fetch; if that fails, git falls back to fetching them one by one.
+
+        Args:
+            git_dir: Repository directory
+            blob_shas: Blob SHAs to read
+            timeout: Timeout in seconds for the prefetch
+
+        Yields:
+            Tuples of (blob SHA, raw contents)
+        """
+        if blob_shas:
+            try:
+                subprocess.run(
+                    ['git', '-c', 'fetch.negotiationAlgorithm=noop', 'fetch', 'origin',
+                     '--no-tags', '--no-write-fetch-head', '--recurse-submodules=no',
+                     '--filter=blob:none', '--stdin'],
+                    cwd=git_dir,
+                    input='\n'.join(blob_shas).encode(),
+                    capture_output=True,
+                    timeout=timeout,
+                    check=True
+                )
+            except (subprocess.SubprocessError, OSError) as e:
+                logger.warning(f"Blob prefetch failed in {git_dir}, fetching lazily: {e}")
+
+        repo = git.Repo(git_dir)
+        try:
+            for sha in blob_shas:
+                _, _, _, data = repo.git.get_object_data(sha)
+                yield sha, data
+        finally:
+            repo.close()
+
     def cleanup_repository(self, target_dir: str):
         """
         Remove cloned repository.
@@ -4,37 +4,83 @@ import os
 import pickle
 import base64
 from email.mime.text import MIMEText
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterator, Union, Any, Tuple
 from pathlib import Path
 
+import httplib2
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
+from googleapiclient.discovery import build, build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from googleapiclient.errors import HttpError
 
+from src.services.http_pool import HttpPool
+from src.utils.rate_limiter import RateLimiter
 from src.utils.logger import logger
 
 
 class GmailService:
     """Wrapper for Gmail API operations."""
 
+    # Gmail accepts at most 100 calls per batch HTTP request
+    BATCH_LIMIT = 100
+
+    # Headers needed to classify an email before downloading its body
+    METADATA_HEADERS = ['Subject', 'From', 'Date']
+
+    # Field mask for body downloads: part types and body data only, three levels deep
+    _PART_FIELDS = 'mimeType,body(data,attachmentId)'
+    BODY_FIELDS = (
+        f"id,threadId,payload({_PART_FIELDS},parts({_PART_FIELDS},"
+        f"parts({_PART_FIELDS},parts({_PART_FIELDS}))))"
+    )
+
+    # Gmail quota units charged per method (per-user limit is 250 units/second)
+    QUOTA_UNITS = {
+        'messages.list': 5,
+        'messages.get': 5,
+        'attachments.get': 5,
+        'history.list': 2,
+        'getProfile': 1,
+        'drafts.create': 10,
+        'drafts.list': 5,
+    }
+
+    # HTTP statuses worth retrying: rate limits and transient server errors
+    RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+    # 403 reasons Gmail uses for rate limiting
+    RATE_LIMIT_REASONS = {'rateLimitExceeded', 'userRateLimitExceeded'}
+
     SCOPES = [
         'https://www.googleapis.com/auth/gmail.readonly',
         'https://www.googleapis.com/auth/gmail.compose',
         'https://www.googleapis.com/auth/gmail.modify',
     ]
 
-    def __init__(self, credentials_path: str, token_path: str):
+    def __init__(self, credentials_path: str, token_path: str,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 http_pool_size: int = 10,
+                 discovery_cache_path: Optional[str] = None):
         """
         Initialize Gmail service.
 
         Args:
             credentials_path: Path to credentials.json
             token_path: Path to token.json (will be created on first run)
+            rate_limiter: Shared limiter charged with the quota units of every call
+            http_pool_size: Maximum pooled HTTP transports (concurrent requests)
+            discovery_cache_path: Where the Gmail discovery document is cached
+                (None to use the copy bundled with googleapiclient)
         """
         self.credentials_path = credentials_path
         self.token_path = token_path
+        self.rate_limiter = rate_limiter
+        self.http_pool_size = http_pool_size
+        self.discovery_cache_path = discovery_cache_path
         self.service = None
+        self.http_pool = None
         self._authenticate()
 
     def _authenticate(self):
@@ -72,9 +118,159 @@ class GmailService:
                 pickle.dump(creds, token)
             logger.info("Token saved successfully")
 
-        self.service = build('gmail', 'v1', credentials=creds)
+        self.http_pool = HttpPool(creds, max_size=self.http_pool_size)
+        document = self._load_discovery_document()
+        if document:
+            self.service = build_from_document(document, credentials=creds)
+        else:
+            self.service = build('gmail', 'v1', credentials=creds)
         logger.info("Gmail service authenticated successfully")
 
+    def _load_discovery_document(self) -> Optional[str]:
+        """
+        Load the Gmail API discovery document without a network request.
+
+        The document is read from discovery_cache_path; on first use it is
+        copied there from googleapiclient's bundled documents, so later
+        startups read one local file and keep working across library
+        upgrades that change the bundled copy.
+
+        Returns:
+            Discovery document JSON, or None if none is available locally
+        """
+        cache_path = Path(self.discovery_cache_path) if self.discovery_cache_path else None
+        if cache_path and cache_path.exists():
+            try:
+                return cache_path.read_text(encoding='utf-8')
+            except OSError as e:
+                logger.warning(f"Failed to read cached discovery document: {e}")
+
+        document = get_static_doc('gmail', 'v1')
+        if document and cache_path:
+            try:
+                cache_path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = cache_path.with_name(cache_path.name + '.tmp')
+                tmp_path.write_text(document, encoding='utf-8')
+                os.replace(tmp_path, cache_path)
+                logger.debug(f"Cached Gmail discovery document in {cache_path}")
+            except OSError as e:
+                logger.warning(f"Failed to cache discovery document: {e}")
+        return document
+
+    def _execute(self, request: Any, method: str) -> Any:
+        """
+        Execute one API request after charging its quota units.
+
+        Args:
+            request: Prepared googleapiclient request
+            method: Key of QUOTA_UNITS for the request
+
+        Returns:
+            API response
+        """
+        if self.rate_limiter:
+            self.rate_limiter.acquire(self.QUOTA_UNITS[method])
+        with self.http_pool.connection() as http:
+            return request.execute(http=http)
+
+    def iter_messages(self, query: str, max_results: Optional[int] = None,
+                      page_size: int = 100) -> Iterator[Dict]:
+        """
+        Stream messages matching a query, following every result page.
+
+        Args:
+            query: Gmail search query
+            max_results: Maximum number of results to yield (None for all)
+            page_size: Number of messages requested per page
+
+        Yields:
+            Message dictionaries (id and threadId)
+        """
+        logger.debug(f"Searching emails with query: {query}")
+
+        page_token = None
+        yielded = 0
+        pages = 0
+
+        while True:
+            request_size = page_size
+            if max_results is not None:
+                request_size = min(page_size, max_results - yielded)
+
+            results = self._execute(self.service.users().messages().list(
+                userId='me',
+                q=query,
+                maxResults=request_size,
+                pageToken=page_token
+            ), 'messages.list')
+            pages += 1
+
+            for message in results.get('messages', []):
+                yield message
+                yielded += 1
+                if max_results is not None and yielded >= max_results:
+                    logger.debug(f"Reached result limit after {pages} page(s)")
+                    return
+
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                logger.debug(f"Listed {yielded} message(s) in {pages} page(s)")
+                return
+
+    def get_history_id(self) -> str:
+        """
+        Get the current history ID of the mailbox.
+
+        Returns:
+            Mailbox history ID
+        """
+        profile = self._execute(self.service.users().getProfile(userId='me'), 'getProfile')
+        return str(profile['historyId'])
+
+    def list_history_messages(self, start_history_id: str) -> Optional[Tuple[List[Dict], str]]:
+        """
+        List messages added to the mailbox since a history ID.
+
+        Args:
+            start_history_id: History ID recorded by a previous sync
+
+        Returns:
+            Tuple of (added messages with id, threadId and labelIds, latest
+            history ID), or None if the start ID is too old and a full
+            search is required
+        """
+        messages = {}
+        latest_history_id = start_history_id
+        page_token = None
+
+        try:
+            while True:
+                results = self._execute(self.service.users().history().list(
+                    userId='me',
+                    startHistoryId=start_history_id,
+                    historyTypes=['messageAdded'],
+                    pageToken=page_token
+                ), 'history.list')
+
+                for record in results.get('history', []):
+                    for added in record.get('messagesAdded', []):
+                        message = added['message']
+                        messages[message['id']] = message
+
+                latest_history_id = str(results.get('historyId', latest_history_id))
+                page_token = results.get('nextPageToken')
+                if not page_token:
+                    break
+
+        except HttpError as e:
+            if e.resp.status == 404:
+                logger.warning(f"History ID {start_history_id} expired, full sync required")
+                return None
+            raise
+
+        logger.info(f"Found {len(messages)} new message(s) since history ID {start_history_id}")
+        return list(messages.values()), latest_history_id
+
     def search_emails(self, query: str, max_results: Optional[int] = None) -> List[Dict]:
         """
         Search emails using Gmail query syntax.
@@ -87,15 +283,7 @@ class GmailService:
             List of message dictionaries
         """
         try:
-            logger.debug(f"Searching emails with query: {query}")
-
-            results = self.service.users().messages().list(
-                userId='me',
-                q=query,
-                maxResults=max_results
-            ).execute()
-
-            messages = results.get('messages', [])
+            messages = list(self.iter_messages(query, max_results=max_results))
             logger.info(f"Found {len(messages)} email(s)")
             return messages
 
@@ -103,27 +291,83 @@ class GmailService:
             logger.error(f"Email search failed: {e}")
             raise
 
-    def get_email_details(self, message_id: str) -> Dict:
+    def get_email_details(self, message_id: str, format: str = 'full',
+                          metadata_headers: Optional[List[str]] = None,
+                          fields: Optional[str] = None) -> Dict:
         """
-        Get full email details.
+        Get email details.
 
         Args:
             message_id: Gmail message ID
+            format: Gmail message format ('full', 'metadata', 'minimal')
+            metadata_headers: Headers to include when format is 'metadata'
+            fields: Optional partial-response field mask
 
         Returns:
-            Complete message dictionary
+            Message dictionary
         """
         try:
-            message = self.service.users().messages().get(
-                userId='me',
-                id=message_id,
-                format='full'
-            ).execute()
-            return message
+            request = self._message_get_request(message_id, format, metadata_headers, fields)
+            return self._execute(request, 'messages.get')
         except Exception as e:
             logger.error(f"Failed to get email details: {e}")
             raise
 
+    def get_email_metadata(self, message_id: str) -> Dict:
+        """
+        Get only the headers needed to classify an email.
+
+        Args:
+            message_id: Gmail message ID
+
+        Returns:
+            Message dictionary with Subject/From/Date headers and no body
+        """
+        return self.get_email_details(
+            message_id,
+            format='metadata',
+            metadata_headers=self.METADATA_HEADERS
+        )
+
+    def get_email_body(self, message_id: str) -> str:
+        """
+        Download the text/plain body of an email.
+
+        Gmail cannot return a single MIME part, so the request uses a field
+        mask that keeps only part types and body data; headers and
+        attachment metadata of every other part are left out.
+
+        Args:
+            message_id: Gmail message ID
+
+        Returns:
+            Decoded text/plain body, or empty string if none
+        """
+        message = self.get_email_details(message_id, fields=self.BODY_FIELDS)
+        return self.extract_body(message)
+
+    def _message_get_request(self, message_id: str, format: str = 'full',
+                             metadata_headers: Optional[List[str]] = None,
+                             fields: Optional[str] = None):
+        """
+        Prepare a messages.get request.
+
+        Args:
+            message_id: Gmail message ID
+            format: Gmail message format
+            metadata_headers: Headers to include when format is 'metadata'
+            fields: Optional partial-response field mask
+
+        Returns:
+            googleapiclient HttpRequest
+        """
+        kwargs = {'userId': 'me', 'id': message_id, 'format': format}
+        if metadata_headers:
+            kwargs['metadataHeaders'] = metadata_headers
+        if fields:
+            kwargs['fields'] = fields
+        return self.service.users().messages().get(**kwargs)
+
     def create_draft(self, to: str, subject: str, body: str, thread_id: Optional[str] = None) -> str:
         """
         Create a draft email.
@@ -138,20 +382,12 @@ class GmailService:
             Draft ID
         """
         try:
-            message = MIMEText(body)
-            message['to'] = to
-            message['subject'] = subject
-
-            raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode()
+            draft_body = self._build_draft_body(to, subject, body, thread_id)
 
-            draft_body = {'message': {'raw': raw_message}}
-            if thread_id:
-                draft_body['message']['threadId'] = thread_id
-
-            draft = self.service.users().drafts().create(
+            draft = self._execute(self.service.users().drafts().create(
                 userId='me',
                 body=draft_body
-            ).execute()
+            ), 'drafts.create')
 
             logger.debug(f"Draft created with ID: {draft['id']}")
             return draft['id']
@@ -160,39 +396,295 @@ class GmailService:
             logger.error(f"Draft creation failed: {e}")
             raise
 
+    def list_thread_drafts(self) -> Dict[str, str]:
+        """
+        List the drafts of the mailbox by thread.
+
+        Returns:
+            Dictionary mapping thread ID to draft ID
+        """
+        thread_drafts = {}
+        page_token = None
+
+        while True:
+            results = self._execute(self.service.users().drafts().list(
+                userId='me',
+                maxResults=500,
+                pageToken=page_token,
+                fields='drafts(id,message(threadId)),nextPageToken'
+            ), 'drafts.list')
+
+            for draft in results.get('drafts', []):
+                thread_id = draft.get('message', {}).get('threadId')
+                if thread_id:
+                    thread_drafts[thread_id] = draft['id']
+
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                logger.debug(f"Found drafts in {len(thread_drafts)} thread(s)")
+                return thread_drafts
+
+    @classmethod
+    def is_retryable_error(cls, error: Exception) -> bool:
+        """
+        Check whether a failed request may succeed when retried.
+
+        Args:
+            error: Exception raised by the API client
+
+        Returns:
+            True for rate limits, transient server errors and network errors
+        """
+        if isinstance(error, HttpError):
+            status = error.resp.status
+            if status in cls.RETRYABLE_STATUSES:
+                return True
+            return status == 403 and any(reason in str(error) for reason in cls.RATE_LIMIT_REASONS)
+        return isinstance(error, (ConnectionError, TimeoutError, httplib2.HttpLib2Error))
+
+    def _build_draft_body(self, to: str, subject: str, body: str, thread_id: Optional[str] = None) -> Dict:
+        """
+        Build the drafts.create request body.
+
+        Args:
+            to: Recipient email address
+            subject: Email subject
+            body: Email body text
+            thread_id: Optional thread ID to reply to
+
+        Returns:
+            Draft resource dictionary
+        """
+        message = MIMEText(body)
+        message['to'] = to
+        message['subject'] = subject
+
+        raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode()
+
+        draft_body = {'message': {'raw': raw_message}}
+        if thread_id:
+            draft_body['message']['threadId'] = thread_id
+        return draft_body
+
+    def get_email_details_batch(self, message_ids: List[str],
+                                batch_size: int = BATCH_LIMIT, format: str = 'full',
+                                metadata_headers: Optional[List[str]] = None,
+                                fields: Optional[str] = None) -> List[Union[Dict, Exception]]:
+        """
+        Get email details for many messages using batch HTTP requests.
+
+        Args:
+            message_ids: Gmail message IDs
+            batch_size: Calls per batch request (at most BATCH_LIMIT)
+            format: Gmail message format ('full', 'metadata', 'minimal')
+            metadata_headers: Headers to include when format is 'metadata'
+            fields: Optional partial-response field mask
+
+        Returns:
+            List aligned with message_ids holding either the message
+            dictionary or the exception raised for that message
+        """
+        requests = [
+            self._message_get_request(message_id, format, metadata_headers, fields)
+            for message_id in message_ids
+        ]
+        return self._execute_batch(requests, batch_size, 'messages.get')
+
+    def get_email_metadata_batch(self, message_ids: List[str],
+                                 batch_size: int = BATCH_LIMIT) -> List[Union[Dict, Exception]]:
+        """
+        Batch variant of get_email_metadata.
+
+        Args:
+            message_ids: Gmail message IDs
+            batch_size: Calls per batch request (at most BATCH_LIMIT)
+
+        Returns:
+            List aligned with message_ids holding message dictionaries or exceptions
+        """
+        return self.get_email_details_batch(
+            message_ids,
+            batch_size=batch_size,
+            format='metadata',
+            metadata_headers=self.METADATA_HEADERS
+        )
+
+    def get_email_body_batch(self, message_ids: List[str],
+                             batch_size: int = BATCH_LIMIT) -> List[Union[str, Exception]]:
+        """
+        Batch variant of get_email_body.
+
+        Args:
+            message_ids: Gmail message IDs
+            batch_size: Calls per batch request (at most BATCH_LIMIT)
+
+        Returns:
+            List aligned with message_ids holding decoded bodies or exceptions
+        """
+        messages = self.get_email_details_batch(message_ids, batch_size=batch_size, fields=self.BODY_FIELDS)
+
+        bodies = []
+        for message in messages:
+            if isinstance(message, Exception):
+                bodies.append(message)
+                continue
+            try:
+                bodies.append(self.extract_body(message))
+            except Exception as e:
+                bodies.append(e)
+        return bodies
+
+    def create_drafts_batch(self, drafts: List[Dict],
+                            batch_size: int = BATCH_LIMIT) -> List[Union[str, Exception]]:
+        """
+        Create many drafts using batch HTTP requests.
+
+        Args:
+            drafts: Dictionaries with 'to', 'subject', 'body' and optional 'thread_id'
+            batch_size: Calls per batch request (at most BATCH_LIMIT)
+
+        Returns:
+            List aligned with drafts holding either the draft ID or the
+            exception raised for that draft
+        """
+        requests = [
+            self.service.users().drafts().create(
+                userId='me',
+                body=self._build_draft_body(
+                    draft['to'], draft['subject'], draft['body'], draft.get('thread_id')
+                )
+            )
+            for draft in drafts
+        ]
+        results = self._execute_batch(requests, batch_size, 'drafts.create')
+        return [
+            result if isinstance(result, Exception) else result['id']
+            for result in results
+        ]
+
+    def _execute_batch(self, requests: List[Any], batch_size: int = BATCH_LIMIT,
+                       method: str = 'messages.get') -> List[Union[Any, Exception]]:
+        """
+        Execute API requests as multipart batch HTTP requests.
+
+        Every call inside a batch is charged its own quota units.
+
+        Args:
+            requests: Prepared googleapiclient requests
+            batch_size: Calls per batch request (at most BATCH_LIMIT)
+            method: Key of QUOTA_UNITS for the requests
+
+        Returns:
+            List aligned with requests holding each response, or the
+            exception raised for that item
+        """
+        batch_size = max(1, min(batch_size, self.BATCH_LIMIT))
+        results: List[Union[Any, Exception]] = [None] * len(requests)
+
+        def callback(request_id, response, exception):
+            results[int(request_id)] = exception if exception is not None else response
+
+        for start in range(0, len(requests), batch_size):
+            chunk = requests[start:start + batch_size]
+            batch = self.service.new_batch_http_request(callback=callback)
+            for offset, request in enumerate(chunk):
+                batch.add(request, request_id=str(start + offset))
+
+            if self.rate_limiter:
+                self.rate_limiter.acquire(self.QUOTA_UNITS[method] * len(chunk))
+
+            try:
+                with self.http_pool.connection() as http:
+                    batch.execute(http=http)
+                logger.debug(f"Executed batch of {len(chunk)} request(s)")
+            except Exception as e:
+                # The whole batch failed; attribute the error to every item in it
+                logger.error(f"Batch request failed: {e}")
+                for offset in range(len(chunk)):
+                    results[start + offset] = e
+
+        return results
+
     def extract_email_data(self, message: Dict) -> Dict:
         """
         Extract relevant data from Gmail message.
 
+        Works with both 'full' and 'metadata' messages; the body is empty
+        for metadata-only messages.
+
         Args:
             message: Gmail message dictionary
 
         Returns:
             Dictionary with extracted data
         """
-        headers = message['payload']['headers']
+        headers = message['payload'].get('headers', [])
         header_dict = {h['name']: h['value'] for h in headers}
 
-        # Get email body
-        body = ""
-        if 'parts' in message['payload']:
-            for part in message['payload']['parts']:
-                if part['mimeType'] == 'text/plain':
-                    body_data = part['body'].get('data', '')
-                    if body_data:
-                        body = base64.urlsafe_b64decode(body_data).decode('utf-8', errors='ignore')
-                        break
-        else:
-            body_data = message['payload']['body'].get('data', '')
-            if body_data:
-                body = base64.urlsafe_b64decode(body_data).decode('utf-8', errors='ignore')
-
         return {
             'id': message['id'],
             'thread_id': message['threadId'],
             'from': header_dict.get('From', ''),
             'subject': header_dict.get('Subject', ''),
             'date': header_dict.get('Date', ''),
-            'body': body,
+            'body': self.extract_body(message),
             'internal_date': message.get('internalDate', '')
         }
+
+    def extract_body(self, message: Dict) -> str:
+        """
+        Extract the text/plain body from a Gmail message.
+
+        Nested multipart payloads (e.g. multipart/mixed wrapping
+        multipart/alternative when attachments are present) are searched
+        depth-first. Bodies too large to be inlined are downloaded through
+        the attachments endpoint.
+
+        Args:
+            message: Gmail message dictionary
+
+        Returns:
+            Decoded body text, or empty string if none
+        """
+        payload = message.get('payload', {})
+        if 'parts' in payload:
+            body = self._find_text_plain(payload['parts'])
+        else:
+            body = payload.get('body')
+
+        if not body:
+            return ""
+
+        body_data = body.get('data', '')
+        if not body_data and body.get('attachmentId'):
+            attachment = self._execute(self.service.users().messages().attachments().get(
+                userId='me',
+                messageId=message['id'],
+                id=body['attachmentId']
+            ), 'attachments.get')
+            body_data = attachment.get('data', '')
+
+        if not body_data:
+            return ""
+        return base64.urlsafe_b64decode(body_data).decode('utf-8', errors='ignore')
+
+    def _find_text_plain(self, parts: List[Dict]) -> Optional[Dict]:
+        """
+        Find the body of the first text/plain part.
+
+        Args:
+            parts: MIME parts of a message payload
+
+        Returns:
+            Part body dictionary, or None if not found
+        """
+        for part in parts:
+            if part.get('mimeType') == 'text/plain':
+                body = part.get('body', {})
+                if body.get('data') or body.get('attachmentId'):
+                    return body
+            elif 'parts' in part:
+                body = self._find_text_plain(part['parts'])
+                if body:
+                    return body
+        return None
@@ -0,0 +1,99 @@
+"""Thread-safe pool of authorized HTTP transports."""
+
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+import httplib2
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.errors import HttpError
+
+from src.utils.logger import logger
+
+
+class HttpPool:
+    """
+    Pool of authorized httplib2 transports shared by all worker threads.
+
+    An httplib2.Http object is not thread-safe, but it keeps its TLS
+    connections open between requests (HTTP/1.1 keep-alive). Each transport
+    is lent to one thread at a time and returned afterwards, so connections
+    stay warm across requests, worker threads and thread pools instead of
+    being re-established per thread. The most recently returned transport
+    is lent first. At most max_size transports exist; further callers wait
+    for one to be returned.
+    """
+
+    def __init__(self, credentials, max_size: int = 10, timeout: float = 60):
+        """
+        Initialize HTTP pool.
+
+        Args:
+            credentials: Google credentials used to authorize requests
+            max_size: Maximum number of transports (and concurrent requests)
+            timeout: Socket timeout in seconds
+        """
+        self.credentials = credentials
+        self.max_size = max(1, max_size)
+        self.timeout = timeout
+
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.max_size)
+        self._lock = threading.Lock()
+        self._created = 0
+
+    @contextmanager
+    def connection(self) -> Iterator[AuthorizedHttp]:
+        """
+        Borrow a transport for one request or batch.
+
+        A transport whose request failed without a complete HTTP response
+        is dropped, since its connection may be left in an unknown state.
+
+        Yields:
+            Authorized HTTP transport, exclusive to the caller until returned
+        """
+        self._slots.acquire()
+        try:
+            try:
+                http = self._idle.get_nowait()
+            except queue.Empty:
+                http = self._create()
+
+            try:
+                yield http
+            except HttpError:
+                # Gmail answered with an error status; the connection is intact
+                self._idle.put(http)
+                raise
+            except BaseException:
+                self._discard(http)
+                raise
+            self._idle.put(http)
+        finally:
+            self._slots.release()
+
+    def _create(self) -> AuthorizedHttp:
+        """Create a new transport."""
+        with self._lock:
+            self._created += 1
+            logger.debug(f"Opening HTTP transport {self._created} (pool size {self.max_size})")
+        return AuthorizedHttp(self.credentials, http=httplib2.Http(timeout=self.timeout))
+
+    @staticmethod
+    def _discard(http: AuthorizedHttp):
+        """Close a transport's connections."""
+        for connection in list(http.http.connections.values()):
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    def close(self):
+        """Close the connections of all idle transports."""
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                return
@@ -0,0 +1,211 @@
+"""Persistent cache of cloned repositories."""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from src.services.git_service import GitService
+from src.utils.logger import logger
+
+
+class RepoCache:
+    """
+    Local clone cache keyed by repository URL and remote HEAD commit.
+
+    Each repository is checked out once under a directory derived from its
+    URL. On later requests the remote HEAD is resolved with ls-remote: an
+    unchanged commit reuses the checkout as-is, a new commit is fetched
+    incrementally. Least recently used checkouts are evicted when the cache
+    grows beyond its disk budget.
+
+    Every checkout() takes a lease on its entry that lasts until release():
+    leased entries are never evicted, and a checkout that has to move the
+    tree to another commit waits until the other leases are released.
+    Callers sharing an unchanged commit read the tree concurrently.
+    """
+
+    INDEX_FILE = 'index.json'
+
+    def __init__(self, cache_dir: str, max_size_mb: int, git_service: Optional[GitService] = None):
+        """
+        Initialize repository cache.
+
+        Args:
+            cache_dir: Directory holding cached checkouts
+            max_size_mb: Disk budget in megabytes
+            git_service: Git service used for clone/fetch operations
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_size_bytes = max_size_mb * 1024 * 1024
+        self.git_service = git_service or GitService()
+
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._leases: Dict[str, int] = {}
+        self._index = self._load_index()
+
+    def checkout(self, repo_url: str, timeout: int = 60,
+                 remote_head: Optional[str] = None) -> Tuple[Path, str]:
+        """
+        Get an up-to-date checkout of a repository.
+
+        The entry is leased to the caller, who must call release() once it
+        has finished reading the files.
+
+        Args:
+            repo_url: Repository URL
+            timeout: Timeout in seconds for git network operations
+            remote_head: Remote HEAD commit if already resolved by the caller
+
+        Returns:
+            Tuple of (checkout directory, checked out commit SHA)
+        """
+        key = self.cache_key(repo_url)
+        entry_dir = self.cache_dir / key
+
+        with self._key_lock(key):
+            if remote_head is None:
+                remote_head = self.git_service.get_remote_head(repo_url, timeout=timeout)
+
+            with self._lock:
+                entry = self._index.get(key)
+
+            commit = None
+            if entry and entry_dir.exists() and entry['commit'] == remote_head:
+                logger.debug(f"Clone cache hit: {repo_url} @ {remote_head[:12]}")
+                commit = remote_head
+            else:
+                # Wait until nobody is still reading the tree that is about to change
+                with self._lock:
+                    while self._leases.get(key):
+                        self._released.wait()
+
+                if entry and entry_dir.exists():
+                    try:
+                        commit = self.git_service.update_repository(str(entry_dir), timeout=timeout)
+                    except Exception as e:
+                        logger.warning(f"Incremental fetch failed for {repo_url}, recloning: {e}")
+
+            if commit is None:
+                self.git_service.clone_repository(repo_url, str(entry_dir), timeout=timeout)
+                commit = self.git_service.get_head_commit(str(entry_dir))
+
+            size = self._directory_size(entry_dir)
+            with self._lock:
+                self._index[key] = {
+                    'repo_url': repo_url,
+                    'commit': commit,
+                    'size': size,
+                    'last_used': time.time()
+                }
+                self._leases[key] = self._leases.get(key, 0) + 1
+                self._save_index()
+
+        self._evict(keep=key)
+        return entry_dir, commit
+
+    def release(self, repo_url: str):
+        """
+        Release the lease taken by checkout().
+
+        Args:
+            repo_url: Repository URL passed to checkout()
+        """
+        key = self.cache_key(repo_url)
+        with self._lock:
+            remaining = self._leases.get(key, 0) - 1
+            if remaining > 0:
+                self._leases[key] = remaining
+            else:
+                self._leases.pop(key, None)
+            self._released.notify_all()
+
+    @staticmethod
+    def cache_key(repo_url: str) -> str:
+        """
+        Derive the cache directory name for a repository URL.
+
+        Args:
+            repo_url: Repository URL
+
+        Returns:
+            Hex digest identifying the repository
+        """
+        normalized = repo_url.strip().lower()
+        if normalized.endswith('.git'):
+            normalized = normalized[:-4]
+        return hashlib.sha256(normalized.rstrip('/').encode()).hexdigest()[:32]
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        """Get the lock serializing operations on one cache entry."""
+        with self._lock:
+            if key not in self._key_locks:
+                self._key_locks[key] = threading.Lock()
+            return self._key_locks[key]
+
+    def _evict(self, keep: str):
+        """
+        Remove least recently used entries until the cache fits its budget.
+
+        Args:
+            keep: Cache key that must not be evicted
+        """
+        with self._lock:
+            total = sum(entry['size'] for entry in self._index.values())
+            if total <= self.max_size_bytes:
+                return
+
+            by_age = sorted(self._index.items(), key=lambda item: item[1]['last_used'])
+            for key, entry in by_age:
+                if total <= self.max_size_bytes:
+                    break
+                key_lock = self._key_locks.get(key)
+                if key == keep or self._leases.get(key) or (key_lock and key_lock.locked()):
+                    continue
+
+                shutil.rmtree(self.cache_dir / key, ignore_errors=True)
+                total -= entry['size']
+                del self._index[key]
+                logger.debug(f"Evicted from clone cache: {entry['repo_url']}")
+
+            self._save_index()
+
+    def _load_index(self) -> Dict[str, Dict]:
+        """Load the cache index from disk."""
+        index_path = self.cache_dir / self.INDEX_FILE
+        if not index_path.exists():
+            return {}
+
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"Failed to load clone cache index, starting empty: {e}")
+            return {}
+
+    def _save_index(self):
+        """Atomically write the cache index to disk (caller holds the lock)."""
+        index_path = self.cache_dir / self.INDEX_FILE
+        tmp_path = index_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, index_path)
+
+    @staticmethod
+    def _directory_size(directory: Path) -> int:
+        """Get the total size of files in a directory in bytes."""
+        total = 0
+        for root, _, files in os.walk(directory):
+            for name in files:
+                try:
+                    total += os.lstat(os.path.join(root, name)).st_size
+                except OSError:
+                    pass
+        return total
@@ -0,0 +1,113 @@
+"""Append-only checkpoint journal for resuming interrupted steps."""
+
+import os
+import json
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from src.utils.logger import logger
+
+
+class CheckpointJournal:
+    """
+    Durable journal of per-row results keyed by email_id.
+
+    Every result is appended as one JSON line and fsynced, so a crash or
+    Ctrl-C loses at most the rows being written. Later records for the same
+    email_id supersede earlier ones. The journal is compacted (rewritten
+    with the latest record per email_id and atomically swapped in with
+    os.replace) when it is loaded and every compact_every appends.
+    """
+
+    def __init__(self, path: str, compact_every: int = 500):
+        """
+        Initialize checkpoint journal.
+
+        Args:
+            path: Journal file path
+            compact_every: Appends between compactions (0 to only compact on load)
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.compact_every = compact_every
+        self._lock = threading.Lock()
+        self._records: Dict[str, Dict] = {}
+        self._appends = 0
+        self._file = None
+
+    def load(self, status: Optional[str] = None) -> Dict[str, Dict]:
+        """
+        Load the records of an interrupted run and compact the journal.
+
+        Args:
+            status: Only return records with this status (e.g. 'Ready')
+
+        Returns:
+            Latest record per email_id
+        """
+        with self._lock:
+            self._records = {}
+            if self.path.exists():
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            # A torn final line from a crash mid-write
+                            continue
+                        self._records[record['email_id']] = record
+                self._compact()
+            return {
+                email_id: record for email_id, record in self._records.items()
+                if status is None or record.get('status') == status
+            }
+
+    def append(self, records: Iterable[Dict]):
+        """
+        Durably append results with a single fsync.
+
+        Args:
+            records: Rows with 'email_id'
+        """
+        records = list(records)
+        lines = ''.join(json.dumps(record, default=str) + '\n' for record in records)
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write(lines)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+            for record in records:
+                self._records[record['email_id']] = record
+            self._appends += len(records)
+            if self.compact_every and self._appends >= self.compact_every:
+                self._compact()
+
+    def _compact(self):
+        """Rewrite the journal with the latest record per email_id (lock held)."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for record in self._records.values():
+                f.write(json.dumps(record, default=str) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+        self._appends = 0
+        logger.debug(f"Compacted checkpoint {self.path} to {len(self._records)} record(s)")
+
+    def remove(self):
+        """Delete the journal once the step's output is safely written."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._records = {}
+            if self.path.exists():
+                self.path.unlink()
@@ -0,0 +1,211 @@
+"""Directory walking and path filtering for repository analysis."""
+
+import os
+import re
+import fnmatch
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+
+def _translate_gitignore_glob(pattern: str) -> str:
+    """
+    Translate a gitignore glob into a regular expression.
+
+    Args:
+        pattern: Glob without leading/trailing slashes or '!' prefix
+
+    Returns:
+        Regular expression matching the whole path
+    """
+    regex = ''
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith('**/', i):
+            regex += '(?:.*/)?'
+            i += 3
+        elif pattern.startswith('/**', i) and i + 3 == len(pattern):
+            regex += '/.*'
+            i += 3
+        elif pattern.startswith('**', i):
+            regex += '.*'
+            i += 2
+        elif pattern[i] == '*':
+            regex += '[^/]*'
+            i += 1
+        elif pattern[i] == '?':
+            regex += '[^/]'
+            i += 1
+        elif pattern[i] == '[':
+            end = pattern.find(']', i + 2)
+            if end == -1:
+                regex += re.escape('[')
+                i += 1
+            else:
+                content = pattern[i + 1:end]
+                if content.startswith('!'):
+                    content = '^' + content[1:]
+                regex += f"[{content}]"
+                i = end + 1
+        elif pattern[i] == '\\' and i + 1 < len(pattern):
+            regex += re.escape(pattern[i + 1])
+            i += 2
+        else:
+            regex += re.escape(pattern[i])
+            i += 1
+    return regex
+
+
+class PathFilter:
+    """
+    Decides which repository paths are skipped during analysis.
+
+    A path is skipped when it matches one of the exclude globs, or, if
+    gitignore support is enabled, when the .gitignore files loaded so far
+    ignore it. Globs without '/' match any single path component (e.g.
+    'venv', '*.egg-info'); globs with '/' match the path relative to the
+    repository root.
+    """
+
+    def __init__(self, exclude_globs: Iterable[str] = (), respect_gitignore: bool = False):
+        """
+        Initialize path filter.
+
+        Args:
+            exclude_globs: Glob patterns of excluded files and directories
+            respect_gitignore: Apply .gitignore rules added with add_gitignore
+        """
+        self.name_globs = [glob for glob in exclude_globs if '/' not in glob.strip('/')]
+        self.path_globs = [glob.strip('/') for glob in exclude_globs if '/' in glob.strip('/')]
+        self.respect_gitignore = respect_gitignore
+        # (base directory, compiled regex, negated, directories only, match basename only)
+        self._rules: List[Tuple[str, 're.Pattern', bool, bool, bool]] = []
+
+    def add_gitignore(self, base_dir: str, content: str):
+        """
+        Load the rules of one .gitignore file.
+
+        Files must be added parent-first so deeper rules take precedence.
+
+        Args:
+            base_dir: Directory of the .gitignore relative to the root ('' for the root)
+            content: File contents
+        """
+        if not self.respect_gitignore:
+            return
+
+        base = f"{base_dir.strip('/')}/" if base_dir.strip('/') else ''
+        for line in content.splitlines():
+            line = line.rstrip()
+            if not line or line.startswith('#'):
+                continue
+
+            negated = line.startswith('!')
+            if negated:
+                line = line[1:]
+            elif line.startswith('\\'):
+                line = line[1:]
+
+            dir_only = line.endswith('/')
+            line = line.rstrip('/')
+            if not line:
+                continue
+
+            # Patterns containing a slash are anchored to the .gitignore directory
+            basename_only = '/' not in line
+            regex = re.compile(_translate_gitignore_glob(line.lstrip('/')) + r'\Z')
+            self._rules.append((base, regex, negated, dir_only, basename_only))
+
+    def is_excluded(self, rel_path: str, is_dir: bool) -> bool:
+        """
+        Check one path, assuming its parent directories are not excluded.
+
+        Args:
+            rel_path: Path relative to the root, '/'-separated
+            is_dir: Whether the path is a directory
+
+        Returns:
+            True if the path should be skipped
+        """
+        name = rel_path.rsplit('/', 1)[-1]
+        if any(fnmatch.fnmatchcase(name, glob) for glob in self.name_globs):
+            return True
+        if any(fnmatch.fnmatchcase(rel_path, glob) for glob in self.path_globs):
+            return True
+
+        ignored = False
+        for base, regex, negated, dir_only, basename_only in self._rules:
+            if not rel_path.startswith(base) or (dir_only and not is_dir):
+                continue
+            subject = name if basename_only else rel_path[len(base):]
+            if regex.match(subject):
+                ignored = not negated
+        return ignored
+
+    def is_path_excluded(self, rel_path: str) -> bool:
+        """
+        Check a file path including all of its parent directories.
+
+        Args:
+            rel_path: File path relative to the root, '/'-separated
+
+        Returns:
+            True if the file or any parent directory should be skipped
+        """
+        parts = rel_path.split('/')
+        for depth in range(1, len(parts)):
+            if self.is_excluded('/'.join(parts[:depth]), is_dir=True):
+                return True
+        return self.is_excluded(rel_path, is_dir=False)
+
+
+def iter_python_files(root: Path, path_filter: Optional[PathFilter] = None) -> Iterator[Path]:
+    """
+    Lazily yield Python files below a directory.
+
+    Uses os.scandir and prunes excluded directories before descending into
+    them, so large trees such as committed virtualenvs are never walked.
+    Symlinked directories are not followed.
+
+    Args:
+        root: Directory to search
+        path_filter: Filter deciding which paths are skipped
+
+    Yields:
+        Paths of Python files
+    """
+    path_filter = path_filter or PathFilter()
+    stack = [(str(root), '')]
+
+    while stack:
+        dir_path, rel_dir = stack.pop()
+
+        if path_filter.respect_gitignore:
+            gitignore = os.path.join(dir_path, '.gitignore')
+            if os.path.isfile(gitignore):
+                with open(gitignore, 'r', encoding='utf-8', errors='ignore') as f:
+                    path_filter.add_gitignore(rel_dir, f.read())
+
+        try:
+            entries = os.scandir(dir_path)
+        except OSError:
+            continue
+
+        subdirs = []
+        with entries:
+            for entry in entries:
+                rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    continue
+
+                if path_filter.is_excluded(rel_path, is_dir):
+                    continue
+
+                if is_dir:
+                    subdirs.append((entry.path, rel_path))
+                elif entry.name.endswith('.py') and entry.is_file():
+                    yield Path(entry.path)
+
+        # Reverse so directories are visited in listing order
+        stack.extend(reversed(subdirs))
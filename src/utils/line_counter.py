@@ -0,0 +1,123 @@
+"""Source line counting utilities."""
+
+import re
+import mmap
+import os
+from pathlib import Path
+from typing import Dict, List, Tuple, Union
+
+# Whitespace as str.strip() sees it within ASCII text, excluding line breaks
+_ASCII_BLANK = rb' \t\x0b\x0c\x1c-\x1f'
+
+# A code line is one whose first non-blank character exists and is not '#'.
+# Every line but the first is found by its preceding '\n': the literal prefix
+# lets the regex engine jump between newlines in C, and findall() returns the
+# cached one-character '\n' object per match, so no per-line objects are built.
+_ASCII_CODE_LINE = rb'[' + _ASCII_BLANK + rb']*[^' + _ASCII_BLANK + rb'\r\n#]'
+_ASCII_FIRST_LINE = re.compile(_ASCII_CODE_LINE)
+_ASCII_NEXT_LINES = re.compile(rb'\n(?=' + _ASCII_CODE_LINE + rb')')
+
+_TEXT_CODE_LINE = r'[^\S\n]*[^\s#]'
+_TEXT_FIRST_LINE = re.compile(_TEXT_CODE_LINE)
+_TEXT_NEXT_LINES = re.compile(r'\n(?=' + _TEXT_CODE_LINE + r')')
+
+_NON_ASCII = re.compile(rb'[\x80-\xff]')
+
+# Files at least this large are scanned through a memory map
+MMAP_THRESHOLD = 1024 * 1024
+
+
+def count_source_lines(data: bytes) -> int:
+    """
+    Count non-blank, non-comment lines in Python source.
+
+    Results match reading the file in text mode with UTF-8 (errors
+    ignored) and universal newlines, then counting lines whose stripped
+    text is non-empty and does not start with '#'. Pure-ASCII input is
+    counted on the raw bytes; anything else is decoded first so Unicode
+    whitespace is treated exactly as str.strip() treats it.
+
+    Args:
+        data: Raw file contents
+
+    Returns:
+        Number of lines
+    """
+    if _NON_ASCII.search(data) is None:
+        if b'\r' in data:
+            data = data.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+        return _count_code_lines(data, _ASCII_FIRST_LINE, _ASCII_NEXT_LINES)
+
+    text = data.decode('utf-8', errors='ignore')
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return _count_code_lines(text, _TEXT_FIRST_LINE, _TEXT_NEXT_LINES)
+
+
+def _count_code_lines(data, first_line, next_lines) -> int:
+    """
+    Count code lines in newline-normalized bytes or text.
+
+    Args:
+        data: Source with '\n' line endings (bytes, str or mmap)
+        first_line: Pattern matching a code line at the start of data
+        next_lines: Pattern matching the newline before each later code line
+
+    Returns:
+        Number of lines
+    """
+    count = len(next_lines.findall(data))
+    if first_line.match(data):
+        count += 1
+    return count
+
+
+def count_file_lines(file_path: Path) -> int:
+    """
+    Count non-blank, non-comment lines in a Python file.
+
+    The file is read once; large files are memory-mapped and, when they
+    are plain ASCII with '\\n' line endings, scanned in place without
+    copying.
+
+    Args:
+        file_path: Path to Python file
+
+    Returns:
+        Number of lines
+    """
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < MMAP_THRESHOLD:
+            return count_source_lines(f.read())
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if _NON_ASCII.search(mapped) is None and mapped.find(b'\r') == -1:
+                return _count_code_lines(mapped, _ASCII_FIRST_LINE, _ASCII_NEXT_LINES)
+            return count_source_lines(mapped[:])
+
+
+def count_sources(sources: List[Tuple[str, Union[str, bytes]]]) -> Tuple[Dict[str, int], List[str]]:
+    """
+    Count lines for a batch of sources.
+
+    Module-level so it can run in a process pool.
+
+    Args:
+        sources: List of (key, source) tuples where source is either a
+            file path or the raw file contents
+
+    Returns:
+        Tuple of (line count per key, descriptions of unreadable sources)
+    """
+    counts = {}
+    errors = []
+    for key, source in sources:
+        try:
+            if isinstance(source, bytes):
+                counts[key] = count_source_lines(source)
+            else:
+                counts[key] = count_file_lines(Path(source))
+        except Exception as e:
+            errors.append(f"{source}: {e}")
+            counts[key] = 0
+    return counts, errors
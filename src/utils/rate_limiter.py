@@ -0,0 +1,361 @@
+"""Rate limiting utilities shared by API clients."""
+
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Optional
+
+from src.utils.logger import logger
+
+
+class RateLimiter:
+    """
+    Thread-safe sliding-window limiter: at most max_calls units per time_window.
+
+    Admitted calls are kept in a deque ordered by time, so expiring old
+    calls pops from the left and each acquire costs O(1) amortized, even
+    for large windows such as a daily quota. One instance can be shared
+    by all threads (and coroutines) calling the same API.
+    """
+
+    def __init__(self, max_calls: int, time_window: float, name: str = "API"):
+        """
+        Initialize rate limiter.
+
+        Args:
+            max_calls: Maximum units allowed in time window
+            time_window: Time window in seconds
+            name: API name used in log messages
+        """
+        self.max_calls = max_calls
+        self.time_window = time_window
+        self.name = name
+        self._lock = threading.Lock()
+        # (admission time, units) of the calls inside the window
+        self._calls = deque()
+        self._used = 0
+
+    def _try_acquire(self, units: int) -> float:
+        """
+        Admit the units if they fit the window.
+
+        Args:
+            units: Units requested (already capped at max_calls)
+
+        Returns:
+            0 if admitted, otherwise seconds until enough units expire
+        """
+        with self._lock:
+            now = time.monotonic()
+            cutoff = now - self.time_window
+            while self._calls and self._calls[0][0] <= cutoff:
+                self._used -= self._calls.popleft()[1]
+
+            if self._used + units <= self.max_calls:
+                self._calls.append((now, units))
+                self._used += units
+                return 0.0
+
+            # Only walked while throttled, and stops at the first calls freeing enough units
+            excess = self._used + units - self.max_calls
+            for timestamp, call_units in self._calls:
+                excess -= call_units
+                if excess <= 0:
+                    return max(timestamp - cutoff, 0.001)
+            return self.time_window
+
+    def acquire(self, units: int = 1) -> float:
+        """
+        Block until the units fit the window.
+
+        Args:
+            units: Units consumed by the call (e.g. API quota units)
+
+        Returns:
+            Seconds spent waiting
+        """
+        units = min(units, self.max_calls)
+        start = time.monotonic()
+        while True:
+            wait = self._try_acquire(units)
+            if wait <= 0:
+                break
+            if wait >= 1:
+                logger.info(f"{self.name} rate limit reached, waiting {wait:.1f} seconds")
+            time.sleep(wait)
+        return time.monotonic() - start
+
+    async def acquire_async(self, units: int = 1) -> float:
+        """
+        Async variant of acquire() that sleeps without blocking the event loop.
+
+        Args:
+            units: Units consumed by the call
+
+        Returns:
+            Seconds spent waiting
+        """
+        # Imported here so synchronous users do not pay for asyncio at startup
+        import asyncio
+
+        units = min(units, self.max_calls)
+        start = time.monotonic()
+        while True:
+            wait = self._try_acquire(units)
+            if wait <= 0:
+                break
+            if wait >= 1:
+                logger.info(f"{self.name} rate limit reached, waiting {wait:.1f} seconds")
+            await asyncio.sleep(wait)
+        return time.monotonic() - start
+
+    def wait_if_needed(self):
+        """Wait if rate limit would be exceeded (single-unit acquire)."""
+        self.acquire()
+
+
+class _Bucket:
+    """Single token bucket refilled continuously at a fixed rate."""
+
+    def __init__(self, rate_per_second: float, capacity: float):
+        """
+        Initialize a full bucket.
+
+        Args:
+            rate_per_second: Refill rate
+            capacity: Maximum level
+        """
+        self.rate_per_second = rate_per_second
+        self.capacity = capacity
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        """Add the budget accumulated since the last refill."""
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate_per_second)
+        self.updated = now
+
+    def time_until(self, amount: float) -> float:
+        """Seconds until the bucket holds the given amount."""
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate_per_second
+
+
+class TokenBucketLimiter:
+    """
+    Thread-safe limiter enforcing requests-per-minute and tokens-per-minute budgets.
+
+    Each acquire() takes one request and an estimated number of tokens.
+    Callers block until both buckets hold enough budget, so concurrent
+    workers share the quota instead of sleeping a fixed delay each.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: Optional[float] = None,
+                 burst_seconds: float = 10.0):
+        """
+        Initialize token bucket limiter.
+
+        Args:
+            requests_per_minute: Request budget per minute
+            tokens_per_minute: Token budget per minute (None for no token limit)
+            burst_seconds: Seconds of budget that may be spent at once
+        """
+        self._cond = threading.Condition()
+        self.burst_seconds = burst_seconds
+        self._requests = _Bucket(requests_per_minute / 60, max(1.0, requests_per_minute * burst_seconds / 60))
+        self._tokens = None
+        if tokens_per_minute:
+            self._tokens = _Bucket(tokens_per_minute / 60, tokens_per_minute * burst_seconds / 60)
+
+    @property
+    def requests_per_minute(self) -> float:
+        """Current request budget per minute."""
+        return self._requests.rate_per_second * 60
+
+    def set_rate(self, requests_per_minute: float):
+        """
+        Change the request budget, e.g. from an adaptive controller.
+
+        Args:
+            requests_per_minute: New request budget per minute
+        """
+        with self._cond:
+            self._requests.refill(time.monotonic())
+            self._requests.rate_per_second = requests_per_minute / 60
+            self._requests.capacity = max(1.0, requests_per_minute * self.burst_seconds / 60)
+            self._requests.level = min(self._requests.level, self._requests.capacity)
+            self._cond.notify_all()
+
+    def acquire(self, tokens: int = 0) -> float:
+        """
+        Block until one request and the given tokens fit the budgets.
+
+        Args:
+            tokens: Estimated tokens consumed by the request
+
+        Returns:
+            Seconds spent waiting
+        """
+        start = time.monotonic()
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._requests.refill(now)
+                wait = self._requests.time_until(1)
+
+                token_cost = 0.0
+                if self._tokens:
+                    self._tokens.refill(now)
+                    # A single request larger than the burst only waits for a full bucket
+                    token_cost = min(tokens, self._tokens.capacity)
+                    wait = max(wait, self._tokens.time_until(token_cost))
+
+                if wait <= 0:
+                    self._requests.level -= 1
+                    if self._tokens:
+                        self._tokens.level -= token_cost
+                    break
+
+                self._cond.wait(wait)
+
+        waited = time.monotonic() - start
+        if waited >= 1:
+            logger.debug(f"Rate limiter waited {waited:.1f} seconds")
+        return waited
+
+
+class AdaptiveRateController:
+    """
+    AIMD controller that tunes request rate and concurrency from API feedback.
+
+    Successful calls raise the request rate additively and, after a full
+    round of successes, allow one more concurrent call. A quota or 429
+    error halves both and pauses all callers until the server's retry-after
+    hint (or an exponential backoff) has passed. The request rate is applied
+    to the wrapped TokenBucketLimiter, which also keeps enforcing its token
+    budget.
+    """
+
+    def __init__(self, limiter: TokenBucketLimiter, min_rpm: float, max_rpm: float,
+                 max_concurrency: int, increase_rpm: float = 1.0, decrease_factor: float = 0.5,
+                 base_backoff: float = 5.0, max_backoff: float = 120.0):
+        """
+        Initialize adaptive rate controller.
+
+        Args:
+            limiter: Token bucket whose request rate is controlled (its
+                current rate is the starting point)
+            min_rpm: Lowest request rate the controller backs off to
+            max_rpm: Highest request rate the controller ramps up to
+            max_concurrency: Upper bound for concurrent calls
+            increase_rpm: Rate added per successful call
+            decrease_factor: Multiplier applied to rate and concurrency on throttling
+            base_backoff: Pause after the first throttle without a retry-after hint
+            max_backoff: Longest pause without a retry-after hint
+        """
+        self.limiter = limiter
+        self.min_rpm = min_rpm
+        self.max_rpm = max_rpm
+        self.max_concurrency = max_concurrency
+        self.increase_rpm = increase_rpm
+        self.decrease_factor = decrease_factor
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self._cond = threading.Condition()
+        self._rpm = min(max(limiter.requests_per_minute, min_rpm), max_rpm)
+        self._concurrency = max(1, max_concurrency // 2)
+        self._active = 0
+        self._successes = 0
+        self._consecutive_throttles = 0
+        self._paused_until = 0.0
+        self.limiter.set_rate(self._rpm)
+
+    @property
+    def current_rate(self) -> float:
+        """Current request rate in requests per minute."""
+        return self._rpm
+
+    @property
+    def current_concurrency(self) -> int:
+        """Current number of allowed concurrent calls."""
+        return self._concurrency
+
+    def describe(self) -> str:
+        """Summarize the controller state for logging."""
+        return f"{self._rpm:.1f} req/min, concurrency {self._concurrency}/{self.max_concurrency}"
+
+    def acquire(self, tokens: int = 0):
+        """
+        Block until a call may start.
+
+        Args:
+            tokens: Estimated tokens consumed by the call
+        """
+        with self._cond:
+            while True:
+                pause = self._paused_until - time.monotonic()
+                if pause <= 0 and self._active < self._concurrency:
+                    self._active += 1
+                    break
+                self._cond.wait(pause if pause > 0 else None)
+
+        try:
+            self.limiter.acquire(tokens)
+        except BaseException:
+            self.release()
+            raise
+
+    def release(self):
+        """Mark a call started with acquire() as finished."""
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, tokens: int = 0):
+        """
+        Context manager wrapping acquire() and release().
+
+        Args:
+            tokens: Estimated tokens consumed by the call
+        """
+        self.acquire(tokens)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def on_success(self):
+        """Record a successful call and ramp up."""
+        with self._cond:
+            self._consecutive_throttles = 0
+            self._rpm = min(self.max_rpm, self._rpm + self.increase_rpm)
+            self._successes += 1
+            if self._successes >= self._concurrency and self._concurrency < self.max_concurrency:
+                self._concurrency += 1
+                self._successes = 0
+            self._cond.notify_all()
+        self.limiter.set_rate(self._rpm)
+
+    def on_throttle(self, retry_after: Optional[float] = None):
+        """
+        Record a quota/429 error and back off.
+
+        Args:
+            retry_after: Seconds the server asked to wait, if provided
+        """
+        with self._cond:
+            self._consecutive_throttles += 1
+            self._successes = 0
+            self._rpm = max(self.min_rpm, self._rpm * self.decrease_factor)
+            self._concurrency = max(1, int(self._concurrency * self.decrease_factor))
+
+            if retry_after is None:
+                retry_after = min(self.max_backoff, self.base_backoff * 2 ** (self._consecutive_throttles - 1))
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+
+        self.limiter.set_rate(self._rpm)
+        logger.warning(f"Rate limited, pausing {retry_after:.1f}s and backing off to {self.describe()}")
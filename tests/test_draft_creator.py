@@ -0,0 +1,212 @@
+"""Tests for the duplicate guard of draft creation."""
+
+import time
+import threading
+
+import pytest
+
+pytest.importorskip('colorama')
+pytest.importorskip('pandas')
+pytest.importorskip('pydantic_settings')
+pytest.importorskip('googleapiclient')
+
+from config.settings import settings
+from src.modules.draft_creator import DraftCreator
+from src.modules.ledger import SubmissionLedger
+
+
+class FakeGmailService:
+    """Gmail service keeping drafts in memory."""
+
+    def __init__(self, drafts=None, failures=None):
+        self.drafts = dict(drafts or {})
+        # Errors raised by the next create_draft calls; 'landed' ones still create the draft
+        self.failures = list(failures or [])
+        self.list_calls = 0
+        self.create_calls = 0
+        self._lock = threading.Lock()
+
+    def list_thread_drafts(self):
+        with self._lock:
+            self.list_calls += 1
+            return dict(self.drafts)
+
+    def create_draft(self, to, subject, body, thread_id=None):
+        with self._lock:
+            self.create_calls += 1
+            draft_id = f'draft-{self.create_calls}'
+            if self.failures:
+                error, landed = self.failures.pop(0)
+                if landed:
+                    self.drafts[thread_id] = draft_id
+                raise error
+            self.drafts[thread_id] = draft_id
+            return draft_id
+
+    def create_drafts_batch(self, drafts, batch_size=100):
+        results = []
+        for draft in drafts:
+            try:
+                results.append(self.create_draft(draft['to'], draft['subject'], draft['body'], draft['thread_id']))
+            except Exception as e:
+                results.append(e)
+        return results
+
+
+def make_draft(thread_id='thread-1'):
+    return {
+        'email_id': 'email-1',
+        'to': 'student@example.com',
+        'subject': 'Re: self check of homework 1',
+        'body': 'Well done',
+        'thread_id': thread_id,
+        'student_name': 'Student',
+    }
+
+
+@pytest.fixture
+def make_creator():
+    def make(gmail):
+        creator = DraftCreator(gmail)
+        creator.RETRY_BASE_SECONDS = 0.001
+        creator.RETRY_MAX_SECONDS = 0.001
+        creator.max_attempts = 4
+        return creator
+    return make
+
+
+def test_existing_draft_is_not_created_again(make_creator):
+    gmail = FakeGmailService(drafts={'thread-1': 'draft-old'})
+
+    assert make_creator(gmail).create_draft(make_draft()) == 'draft-old'
+    assert gmail.create_calls == 0
+
+
+def test_retry_after_landed_request_does_not_duplicate(make_creator):
+    # The first request reached Gmail but the response was lost
+    gmail = FakeGmailService(failures=[(ConnectionError('reset'), True)])
+
+    draft_id = make_creator(gmail).create_draft(make_draft())
+
+    assert draft_id == 'draft-1'
+    assert gmail.create_calls == 1
+    assert gmail.list_calls == 2
+
+
+def test_retry_after_failed_request_creates_draft(make_creator):
+    gmail = FakeGmailService(failures=[(ConnectionError('reset'), False)])
+
+    draft_id = make_creator(gmail).create_draft(make_draft())
+
+    assert draft_id == 'draft-2'
+    assert gmail.create_calls == 2
+    assert list(gmail.drafts.values()) == ['draft-2']
+
+
+def test_non_retryable_error_is_returned(make_creator):
+    gmail = FakeGmailService(failures=[(ValueError('bad request'), False)])
+
+    result = make_creator(gmail).create_draft(make_draft())
+
+    assert isinstance(result, ValueError)
+    assert gmail.create_calls == 1
+
+
+def test_gives_up_after_max_attempts(make_creator):
+    gmail = FakeGmailService(failures=[(ConnectionError('reset'), False)] * 4)
+
+    result = make_creator(gmail).create_draft(make_draft())
+
+    assert isinstance(result, ConnectionError)
+    assert gmail.create_calls == 4
+
+
+def test_drafts_are_listed_once_per_run(make_creator):
+    gmail = FakeGmailService()
+    creator = make_creator(gmail)
+
+    first = creator.create_draft(make_draft('thread-1'))
+    creator.create_draft(make_draft('thread-2'))
+
+    # The index is updated with created drafts instead of listed again
+    assert creator.create_draft(make_draft('thread-1')) == first
+    assert gmail.list_calls == 1
+    assert gmail.create_calls == 2
+
+
+def test_listing_is_shared_within_a_backoff_window(make_creator):
+    gmail = FakeGmailService()
+    creator = make_creator(gmail)
+    failed_at = time.monotonic()
+
+    creator.find_existing_draft('thread-1', listed_after=failed_at)
+    creator.find_existing_draft('thread-2', listed_after=failed_at)
+    assert gmail.list_calls == 1
+
+    creator.find_existing_draft('thread-1', listed_after=time.monotonic())
+    assert gmail.list_calls == 2
+
+
+def test_draft_outside_thread_skips_lookup(make_creator):
+    gmail = FakeGmailService()
+
+    assert make_creator(gmail).find_existing_draft(None) is None
+    assert gmail.list_calls == 0
+
+
+def pending_draft_rows(ledger, rows):
+    ledger.record_emails([
+        {
+            'email_id': email_id,
+            'email_datetime': '2026-01-01T10:00:00',
+            'email_subject': 'self check of homework 1',
+            'repo_url': 'https://github.com/student/hw',
+            'hashed_email_address': 'hash',
+            'sender_email': f'{email_id}@example.com',
+            'thread_id': thread_id,
+            'status': 'Ready',
+        }
+        for email_id, thread_id in rows
+    ])
+    ledger.record_grades([{'email_id': email_id, 'grade': 80.0, 'status': 'Ready'} for email_id, _ in rows])
+    ledger.record_feedback([{'email_id': email_id, 'reply': 'Well done', 'status': 'Ready'} for email_id, _ in rows])
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    ledger = SubmissionLedger(str(tmp_path / 'ledger.db'))
+    yield ledger
+    ledger.close()
+
+
+@pytest.mark.parametrize('batch_mode', [False, True])
+def test_rows_sharing_a_thread_get_one_draft(make_creator, ledger, monkeypatch, batch_mode):
+    monkeypatch.setattr(settings, 'gmail_batch_mode', batch_mode)
+    pending_draft_rows(ledger, [('a', 'thread-1'), ('b', 'thread-1'), ('c', 'thread-2')])
+    gmail = FakeGmailService()
+    creator = make_creator(gmail)
+    creator.ledger = ledger
+    creator.data_manager.load_student_mapping = lambda path: {}
+
+    result = creator.create_all_drafts('file_3_4', 'file_1_2', 'mapping')
+
+    assert gmail.create_calls == 2
+    assert result == {'created': 3, 'failed': 0}
+    assert ledger.get('a')['draft_id'] == ledger.get('b')['draft_id']
+
+
+def test_batch_retries_retryable_items_without_duplicates(make_creator, ledger, monkeypatch):
+    monkeypatch.setattr(settings, 'gmail_batch_mode', True)
+    pending_draft_rows(ledger, [('a', 'thread-1'), ('b', 'thread-2')])
+    # Item 'a' landed but its response was lost, item 'b' failed outright
+    gmail = FakeGmailService(failures=[(ConnectionError('reset'), True), (ConnectionError('reset'), False)])
+    creator = make_creator(gmail)
+    creator.ledger = ledger
+    creator.data_manager.load_student_mapping = lambda path: {}
+
+    result = creator.create_all_drafts('file_3_4', 'file_1_2', 'mapping')
+
+    assert result == {'created': 2, 'failed': 0}
+    assert gmail.create_calls == 3
+    assert ledger.get('a')['draft_id'] == 'draft-1'
+    assert ledger.pending('draft') == []
@@ -0,0 +1,158 @@
+"""Tests for the submission ledger and the checkpoint journal."""
+
+import json
+
+import pytest
+
+pytest.importorskip('colorama')
+
+from src.modules.ledger import SubmissionLedger
+from src.utils.checkpoint import CheckpointJournal
+
+
+def email_row(email_id, status='Ready', thread_id=None):
+    return {
+        'email_id': email_id,
+        'email_datetime': '2026-01-01T10:00:00',
+        'email_subject': 'self check of homework 1',
+        'repo_url': f'https://github.com/student/{email_id}',
+        'hashed_email_address': 'hash',
+        'sender_email': f'{email_id}@example.com',
+        'thread_id': thread_id or f'thread-{email_id}',
+        'status': status,
+    }
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    ledger = SubmissionLedger(str(tmp_path / 'ledger.db'))
+    yield ledger
+    ledger.close()
+
+
+def pending_ids(ledger, step):
+    return [row['email_id'] for row in ledger.pending(step)]
+
+
+def test_rows_move_through_the_steps(ledger):
+    ledger.record_emails([email_row('a'), email_row('b'), email_row('c', status='Missing: repo')])
+    assert pending_ids(ledger, 'grade') == ['a', 'b']
+
+    ledger.record_grades([
+        {'email_id': 'a', 'grade': 80.0, 'status': 'Ready'},
+        {'email_id': 'b', 'grade': None, 'status': 'Missing: grade'},
+    ])
+    assert pending_ids(ledger, 'grade') == ['b']
+    assert pending_ids(ledger, 'feedback') == ['a']
+
+    ledger.record_feedback([{'email_id': 'a', 'reply': 'Well done', 'status': 'Ready'}])
+    assert pending_ids(ledger, 'feedback') == []
+    assert pending_ids(ledger, 'draft') == ['a']
+
+    ledger.record_draft('a', 'draft-1')
+    assert pending_ids(ledger, 'draft') == []
+    assert ledger.is_draft_created('a')
+
+
+def test_failed_draft_stays_pending(ledger):
+    ledger.record_emails([email_row('a')])
+    ledger.record_grades([{'email_id': 'a', 'grade': 80.0, 'status': 'Ready'}])
+    ledger.record_feedback([{'email_id': 'a', 'reply': 'Well done', 'status': 'Ready'}])
+
+    ledger.record_draft('a', None, RuntimeError('quota exceeded'))
+
+    assert not ledger.is_draft_created('a')
+    assert pending_ids(ledger, 'draft') == ['a']
+    assert ledger.get('a')['draft_status'] == 'Failed: quota exceeded'
+
+
+def test_re_recording_an_email_keeps_later_steps(ledger):
+    ledger.record_emails([email_row('a')])
+    ledger.record_grades([{'email_id': 'a', 'grade': 80.0, 'status': 'Ready'}])
+
+    ledger.record_emails([email_row('a')])
+
+    state = ledger.get('a')
+    assert state['grade'] == 80.0
+    assert state['grade_status'] == 'Ready'
+    assert pending_ids(ledger, 'grade') == []
+
+
+def test_step_rows_and_get(ledger):
+    ledger.record_emails([email_row('a'), email_row('b')])
+    ledger.record_grades([{'email_id': 'a', 'grade': 80.0, 'status': 'Ready'}])
+
+    assert ledger.step_rows('grade') == [{'email_id': 'a', 'grade': 80.0, 'status': 'Ready'}]
+    assert ledger.step_rows('feedback') == []
+    assert ledger.get('missing') is None
+
+
+def test_ledger_survives_reopening(tmp_path):
+    path = str(tmp_path / 'ledger.db')
+    first = SubmissionLedger(path)
+    first.record_emails([email_row('a')])
+    first.record_grades([{'email_id': 'a', 'grade': 70.0, 'status': 'Ready'}])
+    first.close()
+
+    second = SubmissionLedger(path)
+    try:
+        assert pending_ids(second, 'grade') == []
+        assert pending_ids(second, 'feedback') == ['a']
+    finally:
+        second.close()
+
+
+def test_journal_resumes_latest_record_per_email(tmp_path):
+    path = tmp_path / 'grade.jsonl'
+    journal = CheckpointJournal(str(path))
+    journal.append([{'email_id': 'a', 'grade': None, 'status': 'Missing: grade'}])
+    journal.append([
+        {'email_id': 'a', 'grade': 90.0, 'status': 'Ready'},
+        {'email_id': 'b', 'grade': 50.0, 'status': 'Ready'},
+    ])
+
+    resumed = CheckpointJournal(str(path))
+
+    assert resumed.load(status='Ready') == {
+        'a': {'email_id': 'a', 'grade': 90.0, 'status': 'Ready'},
+        'b': {'email_id': 'b', 'grade': 50.0, 'status': 'Ready'},
+    }
+
+
+def test_journal_ignores_torn_last_line(tmp_path):
+    path = tmp_path / 'grade.jsonl'
+    path.write_text(
+        json.dumps({'email_id': 'a', 'grade': 90.0, 'status': 'Ready'}) + '\n'
+        + '{"email_id": "b", "gra',
+        encoding='utf-8'
+    )
+
+    journal = CheckpointJournal(str(path))
+
+    assert list(journal.load()) == ['a']
+    # Loading compacts the journal, dropping the torn line
+    assert path.read_text(encoding='utf-8').count('\n') == 1
+
+
+def test_journal_compacts_after_appends(tmp_path):
+    path = tmp_path / 'feedback.jsonl'
+    journal = CheckpointJournal(str(path), compact_every=3)
+    journal.load()
+
+    for attempt in range(3):
+        journal.append([{'email_id': 'a', 'reply': f'try {attempt}', 'status': 'Ready'}])
+
+    lines = path.read_text(encoding='utf-8').splitlines()
+    assert [json.loads(line)['reply'] for line in lines] == ['try 2']
+    assert not path.with_name(path.name + '.tmp').exists()
+
+
+def test_journal_remove(tmp_path):
+    path = tmp_path / 'grade.jsonl'
+    journal = CheckpointJournal(str(path))
+    journal.append([{'email_id': 'a', 'status': 'Ready'}])
+
+    journal.remove()
+
+    assert not path.exists()
+    assert CheckpointJournal(str(path)).load() == {}
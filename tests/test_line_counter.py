@@ -0,0 +1,78 @@
+"""Tests for source line counting."""
+
+import pytest
+
+from src.utils import line_counter
+from src.utils.line_counter import count_file_lines, count_source_lines, count_sources
+
+
+def reference_count(data: bytes) -> int:
+    """Count lines the way the original text-mode implementation did."""
+    text = data.decode('utf-8', errors='ignore')
+    # Universal newlines, unlike str.splitlines(), only split on \n, \r\n and \r
+    lines = text.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    return sum(1 for line in lines if line.strip() and not line.strip().startswith('#'))
+
+
+SAMPLES = [
+    b'',
+    b'\n\n\n',
+    b'import os\n',
+    b'import os',
+    b'# comment\n    # indented comment\nx = 1\n',
+    b'def f():\n    return 1\n\n\n# end\n',
+    b'x = 1\r\ny = 2\r\n\r\n# c\r\n',
+    b'x = 1\ry = 2\r\r',
+    b'\t\x0b\x0c\n  \t x = "#"\n',
+    b'a = 1\x0c# form feed is not a line break\n',
+    'name = "café"\n　# ideographic space comment\n'.encode('utf-8'),
+    '  y = 2\n \n'.encode('utf-8'),
+    b'\xff\xfe broken = 1\n#x\n',
+]
+
+
+@pytest.mark.parametrize('data', SAMPLES)
+def test_count_source_lines_matches_text_mode_reference(data):
+    assert count_source_lines(data) == reference_count(data)
+
+
+@pytest.mark.parametrize('data', SAMPLES)
+def test_count_file_lines_matches_in_memory_count(tmp_path, data):
+    path = tmp_path / 'module.py'
+    path.write_bytes(data)
+    assert count_file_lines(path) == count_source_lines(data)
+
+
+@pytest.mark.parametrize('data', [
+    b'x = 1\n# comment\n\n' * 1000,
+    b'x = 1\r\n# comment\r\n' * 1000,
+    'y = "é"\n# c\n'.encode('utf-8') * 1000,
+])
+def test_count_file_lines_memory_mapped(tmp_path, monkeypatch, data):
+    monkeypatch.setattr(line_counter, 'MMAP_THRESHOLD', 1)
+    path = tmp_path / 'big.py'
+    path.write_bytes(data)
+    assert count_file_lines(path) == reference_count(data)
+
+
+def test_count_sources_mixes_paths_and_blobs(tmp_path):
+    path = tmp_path / 'a.py'
+    path.write_bytes(b'a = 1\nb = 2\n')
+
+    counts, errors = count_sources([
+        ('a.py', str(path)),
+        ('b.py', b'# only a comment\nc = 3\n'),
+    ])
+
+    assert counts == {'a.py': 2, 'b.py': 1}
+    assert errors == []
+
+
+def test_count_sources_reports_unreadable_files(tmp_path):
+    missing = tmp_path / 'missing.py'
+
+    counts, errors = count_sources([('missing.py', str(missing))])
+
+    assert counts == {'missing.py': 0}
+    assert len(errors) == 1
+    assert str(missing) in errors[0]
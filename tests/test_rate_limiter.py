@@ -0,0 +1,182 @@
+"""Tests for the API rate limiters."""
+
+import time
+import asyncio
+import threading
+
+import pytest
+
+pytest.importorskip('colorama')
+
+from src.utils.rate_limiter import AdaptiveRateController, RateLimiter, TokenBucketLimiter
+
+
+def test_rate_limiter_admits_calls_within_window():
+    limiter = RateLimiter(max_calls=5, time_window=60)
+
+    waited = [limiter.acquire() for _ in range(5)]
+
+    assert waited == pytest.approx([0] * 5, abs=0.05)
+
+
+def test_rate_limiter_blocks_until_oldest_call_expires():
+    limiter = RateLimiter(max_calls=2, time_window=0.3)
+    limiter.acquire()
+    limiter.acquire()
+
+    waited = limiter.acquire()
+
+    assert 0.2 <= waited < 1.0
+
+
+def test_rate_limiter_counts_units():
+    limiter = RateLimiter(max_calls=10, time_window=0.3)
+    limiter.acquire(units=8)
+
+    assert limiter.acquire(units=2) < 0.05
+    assert limiter.acquire(units=1) >= 0.2
+
+
+def test_rate_limiter_caps_oversized_requests():
+    limiter = RateLimiter(max_calls=3, time_window=60)
+
+    # A request larger than the whole window would otherwise never be admitted
+    assert limiter.acquire(units=10) < 0.05
+
+
+def test_rate_limiter_is_shared_between_threads():
+    limiter = RateLimiter(max_calls=4, time_window=0.4)
+    start = time.monotonic()
+    admitted = []
+    lock = threading.Lock()
+
+    def call():
+        limiter.acquire()
+        with lock:
+            admitted.append(time.monotonic() - start)
+
+    threads = [threading.Thread(target=call) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    admitted.sort()
+    assert all(t < 0.2 for t in admitted[:4])
+    assert all(t >= 0.35 for t in admitted[4:])
+
+
+def test_rate_limiter_acquire_async():
+    limiter = RateLimiter(max_calls=1, time_window=0.2)
+
+    async def run():
+        await limiter.acquire_async()
+        return await limiter.acquire_async()
+
+    assert asyncio.run(run()) >= 0.15
+
+
+def test_token_bucket_spends_burst_then_refills():
+    # 600 req/min = 10 req/s with a 0.5 s burst of 5 requests
+    limiter = TokenBucketLimiter(requests_per_minute=600, burst_seconds=0.5)
+
+    burst = [limiter.acquire() for _ in range(5)]
+    waited = limiter.acquire()
+
+    assert burst == pytest.approx([0] * 5, abs=0.05)
+    assert 0.05 <= waited < 0.5
+
+
+def test_token_bucket_enforces_token_budget():
+    # 6000 tokens/min = 100 tokens/s, burst of 100 tokens
+    limiter = TokenBucketLimiter(requests_per_minute=6000, tokens_per_minute=6000, burst_seconds=1)
+    limiter.acquire(tokens=100)
+
+    waited = limiter.acquire(tokens=30)
+
+    assert 0.2 <= waited < 0.8
+
+
+def test_token_bucket_set_rate_lowers_budget():
+    limiter = TokenBucketLimiter(requests_per_minute=6000, burst_seconds=1)
+
+    limiter.set_rate(60)
+
+    assert limiter.requests_per_minute == pytest.approx(60)
+    limiter.acquire()
+    assert limiter.acquire() >= 0.5
+
+
+def make_controller(**kwargs):
+    limiter = TokenBucketLimiter(requests_per_minute=600)
+    options = dict(min_rpm=60, max_rpm=1200, max_concurrency=8, base_backoff=0.1, max_backoff=0.2)
+    options.update(kwargs)
+    return AdaptiveRateController(limiter, **options)
+
+
+def test_adaptive_controller_ramps_up_on_success():
+    controller = make_controller(increase_rpm=10)
+    rate = controller.current_rate
+    concurrency = controller.current_concurrency
+
+    for _ in range(concurrency):
+        controller.on_success()
+
+    assert controller.current_rate == pytest.approx(rate + 10 * concurrency)
+    assert controller.current_concurrency == concurrency + 1
+    assert controller.limiter.requests_per_minute == pytest.approx(controller.current_rate)
+
+
+def test_adaptive_controller_backs_off_and_pauses_on_throttle():
+    controller = make_controller()
+    rate = controller.current_rate
+    concurrency = controller.current_concurrency
+
+    controller.on_throttle(retry_after=0.3)
+
+    assert controller.current_rate == pytest.approx(max(60, rate / 2))
+    assert controller.current_concurrency == max(1, concurrency // 2)
+
+    start = time.monotonic()
+    with controller.slot():
+        pass
+    assert time.monotonic() - start >= 0.25
+
+
+def test_adaptive_controller_respects_rate_bounds():
+    controller = make_controller(min_rpm=100, max_rpm=700, increase_rpm=500)
+
+    controller.on_success()
+    assert controller.current_rate == pytest.approx(700)
+
+    for _ in range(5):
+        controller.on_throttle(retry_after=0)
+    assert controller.current_rate == pytest.approx(100)
+    assert controller.current_concurrency == 1
+
+
+def test_adaptive_controller_limits_concurrency():
+    controller = make_controller(max_concurrency=2)
+    assert controller.current_concurrency == 1
+
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def call():
+        nonlocal active, peak
+        with controller.slot():
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.05)
+            with lock:
+                active -= 1
+
+    threads = [threading.Thread(target=call) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert peak == 1
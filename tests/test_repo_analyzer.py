@@ -0,0 +1,77 @@
+"""Tests for concurrent repository analysis."""
+
+import threading
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip('colorama')
+pytest.importorskip('pandas')
+pytest.importorskip('pydantic_settings')
+pytest.importorskip('git')
+pytest.importorskip('tenacity')
+
+from config.settings import settings
+from src.modules.repo_analyzer import RepoAnalyzer
+
+
+class MovingHeadGitService:
+    """Git service whose remote HEAD moves on every ls-remote, like a student pushing."""
+
+    def __init__(self):
+        self.pushes = 0
+        self._lock = threading.Lock()
+
+    def get_remote_head(self, repo_url, timeout=60):
+        with self._lock:
+            self.pushes += 1
+            return f'{self.pushes:040x}'
+
+    def clone_repository(self, repo_url, target_dir, timeout=60):
+        path = Path(target_dir)
+        path.mkdir(parents=True, exist_ok=True)
+        (path / 'main.py').write_text('x = 1\ny = 2\n')
+        (path / 'HEAD').write_text(f'{self.pushes:040x}')
+
+    def update_repository(self, target_dir, timeout=60):
+        (Path(target_dir) / 'main.py').write_text('x = 1\ny = 2\nz = 3\n')
+        return f'{self.pushes:040x}'
+
+    def get_head_commit(self, target_dir):
+        return (Path(target_dir) / 'HEAD').read_text()
+
+
+@pytest.fixture
+def analyzer(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'analysis_mode', 'worktree')
+    monkeypatch.setattr(settings, 'repo_cache_enabled', True)
+    monkeypatch.setattr(settings, 'repo_cache_dir', str(tmp_path / 'repo_cache'))
+    monkeypatch.setattr(settings, 'grade_cache_enabled', False)
+
+    analyzer = RepoAnalyzer()
+    analyzer.git_service = analyzer.repo_cache.git_service = MovingHeadGitService()
+    return analyzer
+
+
+def run_with_timeout(func, timeout=30):
+    outcome = {}
+    thread = threading.Thread(target=lambda: outcome.update(result=func()), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "analysis did not finish"
+    return outcome['result']
+
+
+@pytest.mark.parametrize('analysis_workers', [1, 2])
+def test_same_repository_twice_with_moving_head(analyzer, monkeypatch, analysis_workers):
+    monkeypatch.setattr(settings, 'analysis_workers', analysis_workers)
+    repos = [
+        {'email_id': 'first', 'repo_url': 'https://github.com/student/hw'},
+        {'email_id': 'second', 'repo_url': 'https://github.com/student/hw'},
+    ]
+
+    results = run_with_timeout(lambda: analyzer._clone_and_analyze_parallel(repos, max_workers=2))
+
+    assert results['successful'] == 2
+    assert sorted(row['email_id'] for row in results['data']) == ['first', 'second']
+    assert analyzer.repo_cache._leases == {}
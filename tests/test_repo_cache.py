@@ -0,0 +1,153 @@
+"""Tests for the persistent clone cache."""
+
+import time
+import threading
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip('colorama')
+pytest.importorskip('git')
+pytest.importorskip('tenacity')
+
+from src.services.repo_cache import RepoCache
+
+
+class FakeGitService:
+    """Git service serving a configurable remote HEAD without network access."""
+
+    def __init__(self):
+        self.heads = {}
+        self.calls = []
+
+    def get_remote_head(self, repo_url, timeout=60):
+        return self.heads[repo_url]
+
+    def clone_repository(self, repo_url, target_dir, timeout=60):
+        self.calls.append(('clone', repo_url))
+        path = Path(target_dir)
+        path.mkdir(parents=True, exist_ok=True)
+        (path / 'main.py').write_text('x = 1\n' * 100)
+        (path / 'HEAD').write_text(self.heads[repo_url])
+
+    def update_repository(self, target_dir, timeout=60):
+        self.calls.append(('update', target_dir))
+        url = next(url for url in self.heads if RepoCache.cache_key(url) == Path(target_dir).name)
+        (Path(target_dir) / 'HEAD').write_text(self.heads[url])
+        return self.heads[url]
+
+    def get_head_commit(self, target_dir):
+        return (Path(target_dir) / 'HEAD').read_text()
+
+
+@pytest.fixture
+def git_service():
+    service = FakeGitService()
+    service.heads = {'https://github.com/a/one': 'a' * 40, 'https://github.com/a/two': 'b' * 40}
+    return service
+
+
+def test_checkout_reuses_unchanged_commit(tmp_path, git_service):
+    cache = RepoCache(str(tmp_path), max_size_mb=100, git_service=git_service)
+    url = 'https://github.com/a/one'
+
+    first_dir, first_commit = cache.checkout(url)
+    cache.release(url)
+    second_dir, second_commit = cache.checkout(url)
+    cache.release(url)
+
+    assert first_dir == second_dir
+    assert first_commit == second_commit == 'a' * 40
+    assert git_service.calls == [('clone', url)]
+
+
+def test_checkout_updates_new_commit(tmp_path, git_service):
+    cache = RepoCache(str(tmp_path), max_size_mb=100, git_service=git_service)
+    url = 'https://github.com/a/one'
+    cache.checkout(url)
+    cache.release(url)
+
+    git_service.heads[url] = 'c' * 40
+    _, commit = cache.checkout(url)
+    cache.release(url)
+
+    assert commit == 'c' * 40
+    assert [call[0] for call in git_service.calls] == ['clone', 'update']
+
+
+def test_cache_key_normalizes_urls():
+    assert RepoCache.cache_key('https://github.com/A/One.git') == RepoCache.cache_key('https://github.com/a/one/')
+
+
+def test_index_persists_between_instances(tmp_path, git_service):
+    url = 'https://github.com/a/one'
+    cache = RepoCache(str(tmp_path), max_size_mb=100, git_service=git_service)
+    cache.checkout(url)
+    cache.release(url)
+
+    reopened = RepoCache(str(tmp_path), max_size_mb=100, git_service=git_service)
+    reopened.checkout(url)
+    reopened.release(url)
+
+    assert git_service.calls == [('clone', url)]
+
+
+def test_eviction_skips_leased_entries(tmp_path, git_service):
+    # A zero budget evicts every entry that may be evicted
+    cache = RepoCache(str(tmp_path), max_size_mb=0, git_service=git_service)
+    one, two = 'https://github.com/a/one', 'https://github.com/a/two'
+
+    one_dir, _ = cache.checkout(one)
+    cache.checkout(two)
+    assert one_dir.exists()
+
+    cache.release(one)
+    cache.release(two)
+    cache.checkout(two)
+    assert not one_dir.exists()
+    cache.release(two)
+
+
+def test_new_commit_waits_for_readers_of_old_tree(tmp_path, git_service):
+    cache = RepoCache(str(tmp_path), max_size_mb=100, git_service=git_service)
+    url = 'https://github.com/a/one'
+    cache.checkout(url)
+
+    git_service.heads[url] = 'c' * 40
+    updated = threading.Event()
+
+    def checkout_new_commit():
+        cache.checkout(url)
+        updated.set()
+
+    thread = threading.Thread(target=checkout_new_commit)
+    thread.start()
+    time.sleep(0.2)
+    assert not updated.is_set()
+    assert [call[0] for call in git_service.calls] == ['clone']
+
+    cache.release(url)
+    thread.join(timeout=5)
+    assert updated.is_set()
+    assert [call[0] for call in git_service.calls] == ['clone', 'update']
+    cache.release(url)
+
+
+def test_same_commit_is_shared_by_readers(tmp_path, git_service):
+    cache = RepoCache(str(tmp_path), max_size_mb=100, git_service=git_service)
+    url = 'https://github.com/a/one'
+    cache.checkout(url)
+
+    done = threading.Event()
+
+    def checkout_same_commit():
+        cache.checkout(url)
+        done.set()
+
+    thread = threading.Thread(target=checkout_same_commit)
+    thread.start()
+    thread.join(timeout=5)
+
+    assert done.is_set()
+    cache.release(url)
+    cache.release(url)